@@ -0,0 +1,95 @@
+"""Dynamic micro-batching for the detection endpoint.
+
+Concurrent requests each submit one text; a single worker task collects whatever is
+pending (up to ``max_batch_size`` items, waiting at most ``max_wait_ms`` after the first
+one arrives), runs one batched inference call off the event loop and hands each caller
+its own result. While a batch is running new requests queue up and form the next one,
+so batches grow with load and stay at size 1 when traffic is light.
+"""
+from typing import Any, Callable, List, Optional, Union
+from concurrent.futures import Executor
+import asyncio
+import time
+
+from backend.app import metrics
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_DELAY_BUCKETS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32,
+                 max_wait_ms: float = 2.0,
+                 executor: Union[Executor, Callable[[], Executor], None] = None, name: str = "detect"):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        # an executor, or a zero-argument callable returning one (resolved per batch)
+        self.executor = executor
+        self.batch_size = metrics.histogram(
+            f"{name}_batch_size", "Items per batched inference call", BATCH_SIZE_BUCKETS
+        )
+        self.queue_delay = metrics.histogram(
+            f"{name}_queue_delay_seconds", "Time a request waited before its batch started", QUEUE_DELAY_BUCKETS
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        # The worker is bound to the loop that first submits. A new loop (e.g. a fresh
+        # TestClient portal, or a restarted server) gets a fresh queue and worker.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result from the next batch."""
+        self._ensure_worker()
+        fut = self._loop.create_future()
+        self._queue.put_nowait((item, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self, queue: asyncio.Queue) -> list:
+        batch = [await queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._collect(queue)
+            # drop callers that gave up (e.g. client disconnected) before running
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_delay.observe(started - enqueued)
+            self.batch_size.observe(len(batch))
+
+            items = [item for item, _, _ in batch]
+            try:
+                executor = self.executor() if callable(self.executor) else self.executor
+                results = await self._loop.run_in_executor(executor, self.fn, items)
+            except Exception as exc:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+            for (_, fut, _), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
@@ -0,0 +1,247 @@
+"""Content-addressed caches for predictions and OCR results.
+
+Repeated snippets and screenshots are common, so the API keeps two caches:
+
+- predictions, keyed by a hash of the text being classified plus the model version
+- OCR text, keyed by a hash of the image bytes
+
+Both are bounded (entries and serialized bytes), evict least-recently-used entries
+first and expire entries after a TTL. Values are stored as JSON, so a hit always hands
+back a fresh copy. The default backend is in memory; ``SQLiteCache`` keeps entries in a
+file so they survive restarts. A cache bound to a model version with
+``bind_version`` drops its entries when that version changes.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from backend.app import metrics
+
+
+def content_key(data: Any, namespace: str = "") -> str:
+    """sha256 of ``namespace`` plus ``data`` (text is hashed as UTF-8)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    h = hashlib.sha256(namespace.encode("utf-8"))
+    h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+class Cache:
+    """Shared bookkeeping: JSON (de)serialization, hit/miss counters, version binding."""
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl: float,
+                 clock: Callable[[], float] = time.time):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # 0 or less: entries never expire
+        self.ttl = ttl
+        self.clock = clock
+        self.version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = metrics.counter(f"{name}_cache_hits_total", f"{name} cache hits")
+        self.misses = metrics.counter(f"{name}_cache_misses_total", f"{name} cache misses")
+        self.evictions = metrics.counter(f"{name}_cache_evictions_total", f"{name} cache LRU evictions")
+
+    def _expires(self) -> float:
+        return self.clock() + self.ttl if self.ttl > 0 else float("inf")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for ``key``, or None on a miss or an expired entry."""
+        raw = self._get(key)
+        if raw is None:
+            self.misses.inc()
+            return None
+        self.hits.inc()
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, separators=(",", ":"))
+        if len(raw) > self.max_bytes:
+            # never let one oversized value flush the whole cache
+            return
+        self._set(key, raw)
+
+    def bind_version(self, version: str) -> None:
+        """Clear the cache when ``version`` differs from the one it was filled under."""
+        if version != self.version:
+            self.clear()
+            self._store_version(version)
+            self.version = version
+
+    def stats(self) -> Dict[str, Any]:
+        hits, misses = self.hits.value, self.misses.value
+        entries, size = self._usage()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "evictions": self.evictions.value,
+        }
+
+    def _store_version(self, version: str) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache with TTL; entries are kept in an ``OrderedDict``."""
+
+    def __init__(self, name: str, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600.0, clock: Callable[[], float] = time.time):
+        super().__init__(name, max_entries, max_bytes, ttl, clock)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                self._bytes -= len(raw)
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key: str, raw: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (raw, self._expires())
+            self._bytes += len(raw)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions.inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _usage(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class SQLiteCache(Cache):
+    """LRU cache with TTL stored in a SQLite file, so entries survive restarts.
+
+    Several caches can share one file; each uses its own table named after the cache.
+    The connection is opened per process: a worker forked from a process that already
+    used the cache (gunicorn's preloading master) opens its own on first use.
+    """
+
+    def __init__(self, name: str, path: str, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600.0, clock: Callable[[], float] = time.time):
+        super().__init__(name, max_entries, max_bytes, ttl, clock)
+        self.table = f"cache_{name}"
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # connections inherited over fork(); never used again, nor closed (that would
+        # touch the parent's locks and WAL)
+        self._inherited = []
+        with self._lock:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, used REAL NOT NULL)"
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_used ON {self.table} (used)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, version TEXT)")
+            row = self._db.execute("SELECT version FROM cache_meta WHERE name = ?", (name,)).fetchone()
+        # entries on disk were filled under this version; bind_version clears them on a change
+        self.version = row[0] if row else None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """This process's connection (call with ``_lock`` held)."""
+        if self._pid != os.getpid():
+            if self._connection is not None:
+                self._inherited.append(self._connection)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def _get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute(f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._db.execute(f"UPDATE {self.table} SET used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set(self, key: str, raw: str) -> None:
+        now = self.clock()
+        expires = self._expires()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                (key, raw, min(expires, 1e300), now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (self.clock(),))
+        entries, size = self._db.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}"
+        ).fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        # walk from least to most recently used until both bounds hold
+        evict = []
+        for key, length in self._db.execute(f"SELECT key, LENGTH(value) FROM {self.table} ORDER BY used"):
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            evict.append((key,))
+            entries -= 1
+            size -= length
+        self._db.executemany(f"DELETE FROM {self.table} WHERE key = ?", evict)
+        self.evictions.inc(len(evict))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table}")
+
+    def _store_version(self, version: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_meta (name, version) VALUES (?, ?)", (self.name, version)
+            )
+
+    def _usage(self) -> Tuple[int, int]:
+        with self._lock:
+            entries, size = self._db.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}"
+            ).fetchone()
+        return entries, size
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = self._pid = None
+
+
+def make_cache(name: str, path: Optional[str] = None, **kwargs: Any) -> Cache:
+    """A ``SQLiteCache`` at ``path`` when given, otherwise a ``MemoryCache``."""
+    if path:
+        return SQLiteCache(name, path, **kwargs)
+    return MemoryCache(name, **kwargs)
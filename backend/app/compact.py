@@ -0,0 +1,238 @@
+"""Compact, NumPy-only form of the calibrated TF-IDF + LogisticRegression model.
+
+``train.py`` saves a ``CalibratedClassifierCV`` holding one fitted pipeline per CV fold,
+so sklearn tokenizes every text once per fold and dispatches each class's isotonic
+calibrator separately. ``export_compact`` flattens that into plain arrays:
+
+- one vocabulary (the union of the fold vocabularies) and a (folds x vocab) IDF array
+- the fold coefficient matrices with their IDF folded in, stacked column-wise
+- per-class isotonic lookup tables (thresholds and values)
+
+``CompactModel`` tokenizes each text once and scores every fold with two sparse matrix
+products (one for the decision values, one for each fold's L2 norm). It exposes
+``classes_`` and ``predict_proba`` like the sklearn model, so ``LanguageDetector`` can
+use either. The artifact sits next to the joblib model, as a ``.mmap`` directory that
+worker processes map and share (a ``.npz`` file is also supported, see
+``mmap_store.py``); it records the sha256 of the joblib it was exported from so a
+stale export is never loaded.
+"""
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import re
+
+import numpy as np
+from scipy import sparse
+
+from backend.app import metrics
+from backend.app.mmap_store import load_arrays, read_meta, save_arrays
+
+
+def analyze(text: str, token_re: "re.Pattern", config: Dict[str, Any]) -> List[str]:
+    """Terms of ``text``: the TfidfVectorizer(analyzer="word") analyzer without stop words."""
+    if config["lowercase"]:
+        text = text.lower()
+    tokens = token_re.findall(text)
+    min_n, max_n = config["ngram_range"]
+    terms = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+        terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return terms
+
+
+class CompactModel:
+    def __init__(self, classes: np.ndarray, vocabulary: Sequence[str], idf: np.ndarray, coef: np.ndarray,
+                 intercept: np.ndarray, fold_offsets: np.ndarray, fold_classes: np.ndarray,
+                 iso_x: np.ndarray, iso_y: np.ndarray, iso_offsets: np.ndarray,
+                 config: Dict[str, Any], source: str = ""):
+        self.classes_ = classes
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.coef = coef
+        self.intercept = intercept
+        # columns fold_offsets[k]:fold_offsets[k + 1] of coef belong to fold k
+        self.fold_offsets = fold_offsets
+        # global class index of each coef column
+        self.fold_classes = fold_classes
+        # isotonic table of column j: iso_x / iso_y[iso_offsets[j]:iso_offsets[j + 1]]
+        self.iso_x = iso_x
+        self.iso_y = iso_y
+        self.iso_offsets = iso_offsets
+        self.config = config
+        self.source = source
+        self._token_re = re.compile(config["token_pattern"])
+        self._idf_sq = idf.T ** 2
+
+    def _counts(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        vocab = self.vocabulary
+        for text in texts:
+            counts = Counter(vocab[t] for t in analyze(text, self._token_re, self.config) if t in vocab)
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        counts = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.intp), np.asarray(indptr)),
+            shape=(len(texts), len(vocab)),
+        )
+        if self.config["binary"]:
+            counts.data[:] = 1.0
+        elif self.config["sublinear_tf"]:
+            np.log(counts.data, counts.data)
+            counts.data += 1.0
+        return counts
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        """Decision values of every fold, as (texts x coef columns)."""
+        with metrics.span("tfidf"):
+            counts = self._counts(texts)
+            norms = np.sqrt(np.asarray(counts.multiply(counts) @ self._idf_sq))
+        scores = np.asarray(counts @ self.coef)
+        # TF-IDF rows with no known term stay zero, as with sklearn's normalize()
+        norms[norms == 0.0] = 1.0
+        for k in range(len(self.fold_offsets) - 1):
+            scores[:, self.fold_offsets[k]:self.fold_offsets[k + 1]] /= norms[:, k:k + 1]
+        return scores + self.intercept
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        n_classes = len(self.classes_)
+        mean = np.zeros((len(texts), n_classes))
+        for k in range(len(self.fold_offsets) - 1):
+            proba = np.zeros_like(mean)
+            for j in range(self.fold_offsets[k], self.fold_offsets[k + 1]):
+                lo, hi = self.iso_offsets[j], self.iso_offsets[j + 1]
+                proba[:, self.fold_classes[j]] = np.interp(scores[:, j], self.iso_x[lo:hi], self.iso_y[lo:hi])
+            total = proba.sum(axis=1, keepdims=True)
+            # all calibrators at zero: sklearn falls back to the uniform distribution
+            proba = np.divide(proba, total, out=np.full_like(proba, 1.0 / n_classes), where=total != 0)
+            proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+            mean += proba
+        return mean / (len(self.fold_offsets) - 1)
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+
+def _vectorizer_config(vectorizer) -> Dict[str, Any]:
+    if vectorizer.analyzer != "word" or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+        raise ValueError("only the default word analyzer can be exported")
+    if vectorizer.stop_words is not None or vectorizer.strip_accents is not None:
+        raise ValueError("stop words and accent stripping are not supported")
+    if vectorizer.norm != "l2" or not vectorizer.use_idf:
+        raise ValueError("only L2-normalized TF-IDF can be exported")
+    return {
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": [int(n) for n in vectorizer.ngram_range],
+        "binary": bool(vectorizer.binary),
+        "sublinear_tf": bool(vectorizer.sublinear_tf),
+    }
+
+
+def export_compact(model, source: str = "") -> CompactModel:
+    """Build a ``CompactModel`` from a fitted ``CalibratedClassifierCV``.
+
+    The calibrated estimators must be ``TfidfVectorizer`` + ``LogisticRegression``
+    pipelines calibrated with ``method="isotonic"``, over more than two classes.
+    Raises ``ValueError`` for anything else.
+    """
+    folds = getattr(model, "calibrated_classifiers_", None)
+    if not folds or getattr(model, "method", None) != "isotonic":
+        raise ValueError("expected a CalibratedClassifierCV fitted with method='isotonic'")
+    classes = np.asarray(model.classes_)
+    if len(classes) <= 2:
+        raise ValueError("binary models are not supported")
+    class_index = {c: i for i, c in enumerate(classes.tolist())}
+
+    config = None
+    pipelines = []
+    for fold in folds:
+        steps = getattr(fold.estimator, "steps", None)
+        if not steps or len(steps) != 2:
+            raise ValueError("expected (TfidfVectorizer, LogisticRegression) pipelines")
+        vectorizer, clf = steps[0][1], steps[1][1]
+        if not hasattr(vectorizer, "idf_") or not hasattr(clf, "coef_") or len(clf.classes_) <= 2:
+            raise ValueError("expected (TfidfVectorizer, LogisticRegression) pipelines")
+        fold_config = _vectorizer_config(vectorizer)
+        if config is not None and fold_config != config:
+            raise ValueError("folds use different vectorizer settings")
+        config = fold_config
+        pipelines.append((vectorizer, clf, fold.calibrators))
+
+    vocabulary = sorted({term for vectorizer, _, _ in pipelines for term in vectorizer.vocabulary_})
+    position = {term: i for i, term in enumerate(vocabulary)}
+
+    idf = np.zeros((len(pipelines), len(vocabulary)))
+    coef_blocks, intercepts, fold_classes = [], [], []
+    iso_x, iso_y, iso_offsets, fold_offsets = [], [], [0], [0]
+    for k, (vectorizer, clf, calibrators) in enumerate(pipelines):
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        cols = np.array([position[t] for t in terms], dtype=np.intp)
+        idf[k, cols] = vectorizer.idf_
+        block = np.zeros((len(vocabulary), clf.coef_.shape[0]))
+        # fold the IDF weights into the coefficients; norms use idf separately
+        block[cols] = clf.coef_.T * vectorizer.idf_[:, None]
+        coef_blocks.append(block)
+        intercepts.append(np.broadcast_to(clf.intercept_, (clf.coef_.shape[0],)))
+        fold_classes.extend(class_index[c] for c in clf.classes_.tolist())
+        for calibrator in calibrators:
+            iso_x.append(np.asarray(calibrator.X_thresholds_, dtype=np.float64))
+            iso_y.append(np.asarray(calibrator.y_thresholds_, dtype=np.float64))
+            iso_offsets.append(iso_offsets[-1] + len(iso_x[-1]))
+        fold_offsets.append(fold_offsets[-1] + clf.coef_.shape[0])
+
+    return CompactModel(
+        classes=classes,
+        vocabulary=vocabulary,
+        idf=idf,
+        coef=np.hstack(coef_blocks),
+        intercept=np.concatenate(intercepts),
+        fold_offsets=np.asarray(fold_offsets, dtype=np.intp),
+        fold_classes=np.asarray(fold_classes, dtype=np.intp),
+        iso_x=np.concatenate(iso_x),
+        iso_y=np.concatenate(iso_y),
+        iso_offsets=np.asarray(iso_offsets, dtype=np.intp),
+        config=config,
+        source=source,
+    )
+
+
+def save_compact(model: CompactModel, filepath: Path) -> None:
+    """Save as a ``.npz`` file or, for a ``.mmap`` path, a memory-mapped directory."""
+    arrays = {
+        "classes": model.classes_.astype(str),
+        "vocabulary": np.array(sorted(model.vocabulary, key=model.vocabulary.get), dtype=str),
+        "idf": model.idf,
+        "coef": model.coef,
+        "intercept": model.intercept,
+        "fold_offsets": model.fold_offsets,
+        "fold_classes": model.fold_classes,
+        "iso_x": model.iso_x,
+        "iso_y": model.iso_y,
+        "iso_offsets": model.iso_offsets,
+    }
+    save_arrays(filepath, arrays, {"family": "compact", "config": model.config, "source": model.source})
+
+
+def load_compact(filepath: Path, source: Optional[str] = None) -> Optional[CompactModel]:
+    """Load a compact artifact; None if missing or not exported from ``source``."""
+    if not filepath.exists():
+        return None
+    if source is not None and read_meta(filepath).get("source") != source:
+        return None
+    data, meta = load_arrays(filepath)
+    return CompactModel(
+        classes=data["classes"],
+        vocabulary=data["vocabulary"].tolist(),
+        idf=data["idf"],
+        coef=data["coef"],
+        intercept=data["intercept"],
+        fold_offsets=data["fold_offsets"],
+        fold_classes=data["fold_classes"],
+        iso_x=data["iso_x"],
+        iso_y=data["iso_y"],
+        iso_offsets=data["iso_offsets"],
+        config=meta["config"],
+        source=meta["source"],
+    )
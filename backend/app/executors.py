@@ -0,0 +1,138 @@
+"""Dedicated executors for CPU-bound work.
+
+OCR (EasyOCR / Tesseract, seconds per image) runs in a pool of warm worker processes
+(see ``ocr_pool``) so it neither blocks the event loop nor competes for the GIL with
+request handling. sklearn inference runs in a small thread pool. Configuration:
+
+- ``OCR_PROCESSES``: OCR worker processes (default 2; 0 runs OCR in a single
+  background thread of this process instead)
+- ``OCR_BACKEND``: ``auto`` (EasyOCR, then Tesseract), ``easyocr`` or ``tesseract``
+- ``OCR_PREPROCESS``: ``fast`` (reduced-resolution decode, crop to the text) or
+  ``full`` (decode and filter the whole image); see ``ocr``
+- ``OCR_MAX_PIXELS``: images with more pixels are not decoded and give no OCR text
+- ``OCR_TILE_HEIGHT``: when > 0 (and there are OCR worker processes), images are
+  preprocessed in this process and split into bands of about this many rows that the
+  workers read in parallel (``OCRWorkerPool.run_tiled``); ``OCR_TILE_OVERLAP`` rows
+  overlap between bands
+- ``OCR_MAX_JOBS`` / ``OCR_MAX_RSS_MB``: recycle a worker after this many images or
+  once its RSS exceeds this many MiB
+- ``OCR_JOB_TIMEOUT``: seconds before a stuck worker is replaced
+- ``OCR_ACQUIRE_TIMEOUT``: seconds a request waits for an idle worker before it is
+  answered 503 (``OCRUnavailable``)
+- ``INFERENCE_THREADS``: inference threads (default 2)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import contextvars
+import os
+import threading
+
+from backend.app import metrics, ocr
+from backend.app.ocr_pool import OCRWorkerPool
+
+OCR_PROCESSES = int(os.environ.get("OCR_PROCESSES", "2"))
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+OCR_PREPROCESS = os.environ.get("OCR_PREPROCESS", "fast")
+OCR_MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", str(ocr.MAX_PIXELS)))
+OCR_TILE_HEIGHT = int(os.environ.get("OCR_TILE_HEIGHT", "0"))
+OCR_TILE_OVERLAP = int(os.environ.get("OCR_TILE_OVERLAP", "64"))
+OCR_MAX_JOBS = int(os.environ.get("OCR_MAX_JOBS", "500"))
+OCR_MAX_RSS_MB = float(os.environ.get("OCR_MAX_RSS_MB", "2048"))
+OCR_JOB_TIMEOUT = float(os.environ.get("OCR_JOB_TIMEOUT", "60"))
+OCR_ACQUIRE_TIMEOUT = float(os.environ.get("OCR_ACQUIRE_TIMEOUT", "30"))
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "2"))
+
+ocr_backend = metrics.counter("ocr_backend_total", "Images by the OCR backend that answered", ("backend",))
+
+_lock = threading.Lock()
+_ocr_pool: Optional[OCRWorkerPool] = None
+# threads that hand images to the OCR pool (or run OCR in-process when it is disabled)
+_ocr_executor: Optional[ThreadPoolExecutor] = None
+_inference_executor: Optional[ThreadPoolExecutor] = None
+
+
+def ocr_pool() -> Optional[OCRWorkerPool]:
+    """The OCR worker pool, started on first use (None when ``OCR_PROCESSES=0``)."""
+    global _ocr_pool
+    if OCR_PROCESSES <= 0:
+        return None
+    with _lock:
+        if _ocr_pool is None:
+            _ocr_pool = OCRWorkerPool(
+                size=OCR_PROCESSES,
+                backend=OCR_BACKEND,
+                preprocess=OCR_PREPROCESS,
+                max_pixels=OCR_MAX_PIXELS,
+                max_jobs=OCR_MAX_JOBS,
+                max_rss_mb=OCR_MAX_RSS_MB,
+                job_timeout=OCR_JOB_TIMEOUT,
+                acquire_timeout=OCR_ACQUIRE_TIMEOUT,
+            )
+            _ocr_pool.start()
+        return _ocr_pool
+
+
+def ocr_executor() -> ThreadPoolExecutor:
+    global _ocr_executor
+    with _lock:
+        if _ocr_executor is None:
+            _ocr_executor = ThreadPoolExecutor(max_workers=max(1, OCR_PROCESSES), thread_name_prefix="ocr")
+        return _ocr_executor
+
+
+def inference_executor() -> ThreadPoolExecutor:
+    """Executor used for model inference, created on first use."""
+    global _inference_executor
+    with _lock:
+        if _inference_executor is None:
+            _inference_executor = ThreadPoolExecutor(
+                max_workers=max(1, INFERENCE_THREADS), thread_name_prefix="inference"
+            )
+        return _inference_executor
+
+
+def _ocr(file_bytes: bytes) -> str:
+    timings: Dict[str, Any] = {}
+    pool = ocr_pool()
+    if pool is None:
+        text = ocr.image_to_text(file_bytes, timings=timings, preprocess=OCR_PREPROCESS,
+                                 max_pixels=OCR_MAX_PIXELS)
+    elif OCR_TILE_HEIGHT > 0:
+        text = pool.run_tiled(file_bytes, OCR_TILE_HEIGHT, OCR_TILE_OVERLAP, timings)
+    else:
+        text = pool.run(file_bytes, timings=timings)
+    # stage times measured where OCR ran (possibly a worker process), recorded here
+    ocr_backend.labels(backend=timings.pop("backend", "none")).inc()
+    for stage, seconds in timings.items():
+        metrics.record_stage(f"ocr_{stage}", seconds)
+    return text
+
+
+# Both run the call in a copy of the caller's context, so stage timings recorded on the
+# executor thread reach the request's Server-Timing header.
+async def run_ocr(file_bytes: bytes) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ocr_executor(), contextvars.copy_context().run, _ocr, file_bytes)
+
+
+async def run_inference(fn: Callable[..., Any], *args: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor(), contextvars.copy_context().run, fn, *args)
+
+
+def ocr_worker_stats() -> List[Dict[str, Any]]:
+    pool = _ocr_pool
+    return pool.stats() if pool is not None else []
+
+
+def shutdown() -> None:
+    global _ocr_pool, _ocr_executor, _inference_executor
+    with _lock:
+        pool, _ocr_pool = _ocr_pool, None
+        executors = [e for e in (_ocr_executor, _inference_executor) if e is not None]
+        _ocr_executor = _inference_executor = None
+    if pool is not None:
+        pool.shutdown()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
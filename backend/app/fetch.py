@@ -0,0 +1,159 @@
+"""Streaming, verified, resumable download of the model artifact into a shared cache.
+
+``fetch_model(url, dest)`` makes ``dest`` a copy of the artifact at ``url``:
+
+- the body is streamed to ``<cache>/partial/<key>.part`` in chunks, so the artifact
+  is never held in memory. An interrupted download resumes where it stopped with an
+  HTTP ``Range`` request, guarded by ``If-Range`` so a changed artifact starts over.
+- the finished file is checked against the expected SHA-256 (when one is given) and
+  renamed into ``<cache>/sha256/<digest>``, a content-addressed store: an artifact
+  already there is not downloaded again, whatever URL it came from
+- ``<cache>/urls/<key>.json`` remembers the digest each URL gave, so a URL is fetched
+  once even without an expected digest
+- ``dest`` is written beside itself and renamed into place, never half-written
+
+Processes sharing the cache directory (the workers of one host, or containers that
+mount it) take a per-URL file lock: one downloads, the others wait and then use the
+cached file.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import hashlib
+import json
+import os
+import shutil
+
+from backend.app import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+# an interrupted download keeps everything up to the last full chunk
+CHUNK_SIZE = 64 * 1024
+
+fetches = metrics.counter("model_fetch_total", "MODEL_URL fetches by outcome", ("result",))
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _validator(headers) -> Optional[str]:
+    """Value for ``If-Range``: a strong ETag, else Last-Modified."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _download(url: str, part: Path, timeout: float) -> str:
+    """Fetch ``url`` into ``part``, continuing a previous partial download if possible.
+
+    Returns ``"downloaded"`` or ``"resumed"``.
+    """
+    import requests
+
+    state = part.with_suffix(".json")
+    offset = part.stat().st_size if part.exists() else 0
+    validator = json.loads(state.read_text())["validator"] if offset and state.exists() else None
+    headers = {"Range": f"bytes={offset}-", "If-Range": validator} if validator else {}
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+        if resp.status_code == 416 and resp.headers.get("Content-Range", "").endswith(f"/{offset}"):
+            return "resumed"  # the partial file was already complete
+        resp.raise_for_status()
+        resumed = resp.status_code == 206 and validator is not None
+        if not resumed:
+            # no partial file, no validator, or the artifact changed: start from zero
+            state.write_text(json.dumps({"url_key": part.stem, "validator": _validator(resp.headers)}))
+        with open(part, "ab" if resumed else "wb") as fh:
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                fh.write(chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+    return "resumed" if resumed else "downloaded"
+
+
+def _place(src: Path, dest: Path) -> None:
+    # a copy, not a hard link: save_detector rewrites the model file in place
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def fetch_model(url: str, dest: Path, cache_dir: Path, sha256: Optional[str] = None,
+                timeout: float = 30.0, attempts: int = 3) -> Path:
+    """Make ``dest`` the artifact at ``url``, downloading it only if the cache lacks it.
+
+    With ``sha256`` an existing ``dest`` with that digest is kept as is, and a download
+    with another digest raises ``ValueError`` (nothing is cached or placed). Without it
+    an existing ``dest`` is kept. Network errors are retried ``attempts`` times, each
+    retry resuming the partial file.
+    """
+    expected = sha256.lower() if sha256 else None
+    if dest.exists() and (expected is None or file_sha256(dest) == expected):
+        return dest
+    key = _url_key(url)
+    remembered = cache_dir / "urls" / f"{key}.json"
+    with _locked(cache_dir / "locks" / f"{key}.lock"):
+        digest = expected
+        if digest is None and remembered.exists():
+            digest = json.loads(remembered.read_text())["sha256"]
+        cached = cache_dir / "sha256" / digest if digest else None
+        if cached is not None and cached.exists():
+            fetches.labels(result="cache_hit").inc()
+        else:
+            part = cache_dir / "partial" / f"{key}.part"
+            part.parent.mkdir(parents=True, exist_ok=True)
+            for attempt in range(attempts):
+                try:
+                    outcome = _download(url, part, timeout)
+                    break
+                except (OSError, ValueError) as exc:
+                    # requests' exceptions are OSErrors; JSON errors in the state file are ValueErrors
+                    if attempt == attempts - 1:
+                        raise
+                    print(f"Model download interrupted ({exc!r}), resuming")
+            actual = file_sha256(part)
+            if expected is not None and actual != expected:
+                part.unlink()
+                part.with_suffix(".json").unlink(missing_ok=True)
+                fetches.labels(result="digest_mismatch").inc()
+                raise ValueError(f"sha256 of {url} is {actual}, expected {expected}")
+            cached = cache_dir / "sha256" / actual
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, cached)
+            part.with_suffix(".json").unlink(missing_ok=True)
+            remembered.parent.mkdir(parents=True, exist_ok=True)
+            remembered.write_text(json.dumps({"url": url, "sha256": actual}))
+            fetches.labels(result=outcome).inc()
+        _place(cached, dest)
+    return dest
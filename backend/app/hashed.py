@@ -0,0 +1,171 @@
+"""Vocabulary-free model family: hashed n-gram features with float32 weights.
+
+Terms are produced by the same word analyzer as the TF-IDF model and mapped to one of
+``n_features`` columns with CRC-32, so there is no vocabulary to pickle or hold in
+memory. Each column has an IDF weight learned at training time; rows are L2-normalized
+and scored by a multinomial logistic regression. Everything is stored as plain float32
+arrays in a ``.npz`` file (or a shared ``.mmap`` directory, see ``mmap_store.py``) and
+evaluated with NumPy / SciPy only, like ``CompactModel``. Columns never seen in training
+have zero weights and the same IDF, so the ``.npz`` keeps only the seen columns: the
+coefficients as a sparse matrix and the IDF as overrides of one default value.
+
+``HashedModel`` exposes ``classes_`` and ``predict_proba`` so ``LanguageDetector`` can
+use it directly. Its probabilities are the logistic regression's softmax (no isotonic
+calibration step).
+"""
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+import re
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+from backend.app import metrics
+from backend.app.compact import analyze
+from backend.app.mmap_store import is_mmap, load_arrays, save_arrays
+
+DEFAULT_CONFIG = {
+    "lowercase": True,
+    "token_pattern": r"(?u)\b\w\w+\b",
+    "ngram_range": [1, 3],
+    "n_features": 2 ** 18,
+}
+
+
+class HashedModel:
+    def __init__(self, classes: np.ndarray, idf: np.ndarray, coef: sparse.csr_matrix, intercept: np.ndarray,
+                 config: Dict[str, Any]):
+        n_features = config["n_features"]
+        if n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.classes_ = classes
+        self.idf = idf
+        # sparse (n_features x classes), IDF folded in
+        self.coef = coef
+        self.intercept = intercept
+        self.config = config
+        self._token_re = re.compile(config["token_pattern"])
+        self._mask = n_features - 1
+
+    def counts(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """Hashed term counts, (texts x n_features)."""
+        indptr, indices, data = [0], [], []
+        mask = self._mask
+        for text in texts:
+            terms = analyze(text, self._token_re, self.config)
+            counts = Counter(zlib.crc32(t.encode("utf-8")) & mask for t in terms)
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.intp), np.asarray(indptr)),
+            shape=(len(texts), self.config["n_features"]),
+        )
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        with metrics.span("tfidf"):
+            counts = self.counts(texts)
+            # row norms of counts * idf, without a per-process copy of idf ** 2
+            squares = sparse.csr_matrix(((counts.data * self.idf[counts.indices]) ** 2, counts.indices,
+                                         counts.indptr), shape=counts.shape)
+            norms = np.sqrt(np.asarray(squares.sum(axis=1)))
+        norms[norms == 0.0] = 1.0
+        return (counts @ self.coef).toarray().astype(np.float64) / norms + self.intercept
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+
+def train_hashed(texts: Sequence[str], labels: Sequence[str], C: float = 10.0,
+                 config: Optional[Dict[str, Any]] = None) -> HashedModel:
+    """Fit IDF weights and a multinomial logistic regression on hashed features."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import normalize
+
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    # IDF only: coef and intercept are filled in below
+    model = HashedModel(np.array([]), np.ones(config["n_features"], dtype=np.float32),
+                        sparse.csr_matrix((config["n_features"], 0), dtype=np.float32), np.zeros(0), config)
+    counts = model.counts(texts).astype(np.float64)
+    df = np.bincount(counts.indices, minlength=config["n_features"])
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+    X = normalize(counts @ sparse.diags(idf))
+    # fit on the columns that occur: unseen ones would stay at zero weight anyway, and
+    # lbfgs keeps several copies of the full (classes x n_features) parameter vector
+    seen = np.flatnonzero(df)
+    clf = LogisticRegression(C=C, max_iter=1000).fit(X[:, seen], labels)
+    weights = clf.coef_.T * idf[seen, None]
+    intercept = clf.intercept_
+    if len(clf.classes_) == 2:
+        # binary: one column for the positive class; score the negative class as its opposite
+        weights = np.hstack([-weights / 2, weights / 2])
+        intercept = np.array([-intercept[0] / 2, intercept[0] / 2])
+    coef = sparse.coo_matrix(weights.astype(np.float32))
+    coef = sparse.csr_matrix((coef.data, (seen[coef.row], coef.col)), shape=(config["n_features"], weights.shape[1]))
+    return HashedModel(clf.classes_, idf.astype(np.float32), coef, intercept, config)
+
+
+def save_hashed(model: HashedModel, filepath: Path) -> None:
+    """Save as a ``.npz`` file or, for a ``.mmap`` path, a memory-mapped directory.
+
+    The ``.npz`` keeps only the columns seen in training, column-major, and is rebuilt
+    on load. The ``.mmap`` layout stores the arrays exactly as they are used, so loading
+    maps them without copies.
+    """
+    meta = {"family": "hashed", "config": model.config}
+    arrays = {"classes": model.classes_.astype(str), "intercept": model.intercept}
+    if is_mmap(filepath):
+        coef = model.coef.tocsr()
+        arrays.update(
+            idf=model.idf.astype(np.float32),
+            coef_data=coef.data.astype(np.float32),
+            coef_indices=coef.indices.astype(np.int32),
+            coef_indptr=coef.indptr.astype(np.int32),
+        )
+        save_arrays(filepath, arrays, meta)
+        return
+    # unseen columns all share the largest IDF value
+    idf_default = model.idf.max() if len(model.idf) else 1.0
+    idf_rows = np.flatnonzero(model.idf != idf_default).astype(np.int32)
+    # column-major: the index arrays scale with the non-zero weights, not with n_features
+    coef = model.coef.tocsc()
+    arrays.update(
+        idf_rows=idf_rows,
+        idf_values=model.idf[idf_rows],
+        idf_default=np.float32(idf_default),
+        coef_data=coef.data.astype(np.float32),
+        coef_rows=coef.indices.astype(np.int32),
+        coef_colptr=coef.indptr.astype(np.int32),
+    )
+    save_arrays(filepath, arrays, meta)
+
+
+def load_hashed(filepath: Path) -> HashedModel:
+    """Load a ``save_hashed`` artifact; ValueError if the path holds another kind of model."""
+    data, meta = load_arrays(filepath)
+    if meta.get("family") != "hashed":
+        raise ValueError(f"{filepath} is not a hashed model")
+    n_features = meta["config"]["n_features"]
+    shape = (n_features, len(data["classes"]))
+    if "coef_indptr" in data:
+        idf = data["idf"]
+        coef = sparse.csr_matrix((data["coef_data"], data["coef_indices"], data["coef_indptr"]), shape=shape)
+    else:
+        idf = np.full(n_features, data["idf_default"], dtype=np.float32)
+        idf[data["idf_rows"]] = data["idf_values"]
+        coef = sparse.csc_matrix((data["coef_data"], data["coef_rows"], data["coef_colptr"]), shape=shape).tocsr()
+    return HashedModel(
+        classes=data["classes"],
+        idf=idf,
+        coef=coef,
+        intercept=data["intercept"],
+        config=meta["config"],
+    )
@@ -1,18 +1,216 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-import io
-from PIL import Image, ImageFilter, ImageOps, ImageEnhance
+from typing import Optional, Dict, Any, List, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import json
+import os
+import threading
+import time
 
-from backend.app.model import LanguageDetector, load_detector
+from backend.app import cache, executors, metrics, model
+from backend.app.batching import MicroBatcher
+from backend.app.model import MODEL_PATH, LanguageDetector, load_detector, self_test
+from backend.app.ocr_pool import OCRUnavailable
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
-app = FastAPI(title="AI Code Recognizer (MVP)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load the model in the background: /health answers at once, /ready once it is warm
+    loading = asyncio.get_running_loop().run_in_executor(None, ensure_detector)
+    # failures are reported by /ready; requests retry the load themselves
+    loading.add_done_callback(lambda f: f.exception())
+    # start OCR workers now so they load and warm up before the first image arrives
+    executors.ocr_pool()
+    stop_watching = threading.Event()
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(target=_watch_model, args=(stop_watching,), name="model-watch", daemon=True).start()
+    yield
+    stop_watching.set()
+    executors.shutdown()
 
-detector: LanguageDetector = load_detector()
+
+app = FastAPI(title="AI Code Recognizer (MVP)", lifespan=lifespan)
+
+# Limits for the batch / streaming endpoints
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "64"))
+# longer stream lines get an error result and are skipped without being buffered
+STREAM_MAX_LINE_BYTES = int(os.environ.get("STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+# Micro-batching of concurrent /detect-language calls (MICROBATCH_MAX_SIZE=1 disables it)
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", "2"))
+# Prediction / OCR caches (a size of 0 disables a cache; CACHE_PATH persists both in SQLite)
+CACHE_PATH = os.environ.get("CACHE_PATH") or None
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", "1000"))
+OCR_CACHE_TTL = float(os.environ.get("OCR_CACHE_TTL", "86400"))
+CACHE_MAX_MB = float(os.environ.get("CACHE_MAX_MB", "64"))
+# Retry-After (seconds) of the 503 answered when no OCR worker read an image in time
+OCR_RETRY_AFTER = int(os.environ.get("OCR_RETRY_AFTER", "5"))
+# Hot reload: poll MODEL_PATH every MODEL_WATCH_INTERVAL seconds (0: off), and/or enable
+# POST /admin/reload-model for requests carrying ADMIN_TOKEN in an X-Admin-Token header
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or None
+
+# loaded by ensure_detector(), from the lifespan hook or the first request that needs it
+detector: Optional[LanguageDetector] = None
+_detector_lock = threading.Lock()
+# held while a replacement model loads; a second reload request is refused meanwhile
+_reload_lock = threading.Lock()
+_startup: Dict[str, Any] = {"status": "loading"}
+WARMUP_TEXT = "def warmup(x):\n    return x"
+
+model_info = metrics.gauge("model_info", "Version of the model being served (value 1)", ("version",))
+model_reloads = metrics.counter("model_reload_total", "Model reload attempts by outcome", ("result",))
+
+
+def _set_model_info(version: str) -> None:
+    model_info.clear()
+    model_info.labels(version=version).set(1)
+
+
+def ensure_detector() -> LanguageDetector:
+    """Load the model and run a warm-up prediction once; later calls return it."""
+    global detector, _startup
+    if detector is not None:
+        return detector
+    with _detector_lock:
+        if detector is None:
+            started = time.perf_counter()
+            try:
+                loaded = load_detector(MODEL_PATH)
+                loaded.predict_batch([WARMUP_TEXT])
+            except Exception as exc:
+                _startup = {"status": "error", "error": repr(exc)}
+                raise
+            _startup = {
+                "status": "ready",
+                "model_version": loaded.version,
+                "load_seconds": round(time.perf_counter() - started, 3),
+            }
+            detector = loaded
+            _set_model_info(loaded.version)
+    return detector
+
+
+def reload_detector() -> Dict[str, Any]:
+    """Load, warm up and self-test the model at MODEL_PATH, then swap it in.
+
+    Requests already running keep the detector they started with and finish on it; the
+    OCR workers and caches are untouched (the prediction cache is keyed by model
+    version). If loading or the self-test fails, the current model stays in place.
+    """
+    global detector, _startup
+    if not _reload_lock.acquire(blocking=False):
+        return {"status": "busy"}
+    try:
+        current = detector
+        started = time.perf_counter()
+        try:
+            if not MODEL_PATH.exists():
+                raise FileNotFoundError(f"no model at {MODEL_PATH}")
+            candidate = load_detector(MODEL_PATH)
+            candidate.predict_batch([WARMUP_TEXT])
+            problem = self_test(candidate)
+        except Exception as exc:
+            problem = repr(exc)
+        result: Dict[str, Any] = {"model_version": current.version if current is not None else None}
+        if problem is not None:
+            model_reloads.labels(result="failed").inc()
+            return {"status": "failed", "error": problem, **result}
+        # same file, same kind of model (a compact sidecar written after the joblib
+        # turns a sklearn detector into a compact one: that is a change)
+        if (current is not None and candidate.version == current.version
+                and type(candidate.pipeline) is type(current.pipeline)):
+            model_reloads.labels(result="unchanged").inc()
+            return {"status": "unchanged", **result}
+        seconds = round(time.perf_counter() - started, 3)
+        with _detector_lock:
+            detector = candidate
+            _startup = {"status": "ready", "model_version": candidate.version, "load_seconds": seconds}
+        _set_model_info(candidate.version)
+        model_reloads.labels(result="reloaded").inc()
+        return {"status": "reloaded", "previous_version": result["model_version"],
+                "model_version": candidate.version, "load_seconds": seconds}
+    finally:
+        _reload_lock.release()
+
+
+def _model_files() -> List[Path]:
+    """MODEL_PATH's files, plus its compact ``.mmap`` sidecar for a joblib model."""
+    files = sorted(MODEL_PATH.iterdir()) if MODEL_PATH.is_dir() else [MODEL_PATH]
+    sidecar = model.compact_path(MODEL_PATH)
+    if model.COMPACT_MODEL and sidecar != MODEL_PATH and sidecar.is_dir():
+        # save_detector writes it after the joblib; wait until both have settled
+        files += sorted(sidecar.iterdir())
+    return files
+
+
+def _model_signature() -> Optional[tuple]:
+    """(mtime, size) of the files making up MODEL_PATH; None while it is missing."""
+    try:
+        return tuple((str(f), f.stat().st_mtime_ns, f.stat().st_size) for f in _model_files())
+    except OSError:
+        return None
+
+
+def _watch_model(stop: threading.Event) -> None:
+    """Reload when MODEL_PATH changes and has then stayed the same for one interval."""
+    loaded = seen = _model_signature()
+    while not stop.wait(MODEL_WATCH_INTERVAL):
+        signature = _model_signature()
+        if signature is not None and signature == seen and signature != loaded:
+            # a failed self-test is not retried until the file changes again
+            loaded = signature
+            outcome = reload_detector()
+            if outcome["status"] == "busy":
+                loaded = None
+            else:
+                detail = outcome.get("error") or outcome["model_version"]
+                print(f"Model file changed: reload {outcome['status']} ({detail})")
+        seen = signature
+
+
+async def _detector() -> LanguageDetector:
+    if detector is not None:
+        return detector
+    # not loaded yet: wait for the load off the event loop (joins one already running)
+    return await asyncio.get_running_loop().run_in_executor(None, ensure_detector)
+
+
+def _make_cache(name: str, size: int, ttl: float) -> Optional[cache.Cache]:
+    if size <= 0:
+        return None
+    return cache.make_cache(name, CACHE_PATH, max_entries=size, max_bytes=int(CACHE_MAX_MB * 1024 * 1024), ttl=ttl)
+
+
+prediction_cache = _make_cache("prediction", PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+ocr_cache = _make_cache("ocr", OCR_CACHE_SIZE, OCR_CACHE_TTL)
+
+
+def _tag(results: List[Dict[str, Any]], current: LanguageDetector) -> List[Dict[str, Any]]:
+    # responses say which model produced them (cached results carry it too)
+    return [dict(result, model_version=current.version) for result in results]
+
+
+def _predict_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    # look up the global on every call so the batcher always uses the current detector
+    current = ensure_detector()
+    return _tag(current.predict_batch(texts), current)
+
+
+batcher = MicroBatcher(
+    _predict_batch,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+    executor=executors.inference_executor,
+)
 
 # Development CORS: allow mobile & local UI to access the API while testing.
 # NOTE: In production, restrict origins appropriately!
@@ -23,6 +221,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# per-request stage breakdown for the detection endpoints (see metrics.span)
+app.add_middleware(metrics.ServerTimingMiddleware, path_prefixes=("/detect-language",))
+
+SIZE_BUCKETS = [16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+input_chars = metrics.histogram("detect_input_chars", "Characters per classified text", SIZE_BUCKETS)
+image_bytes = metrics.histogram("detect_image_bytes", "Bytes per uploaded image", SIZE_BUCKETS)
+languages = metrics.counter("detect_language_total", "Detections by winning language", ("language",))
 
 # Serve the lightweight demo frontend under the project frontend/ folder
 FRONTEND_DIR = Path(__file__).resolve().parents[1].parents[0] / 'frontend'
@@ -42,71 +247,96 @@ def serve_index():
     raise HTTPException(status_code=404, detail="Demo frontend not found")
 
 
-class DetectResponse(BaseModel):
-    language: str
-    confidence: float
-    indicators: List[str]
-    raw_text: str
+def _cacheable(version: str) -> bool:
+    """Bind the prediction cache to ``version`` if it is the live model's.
 
+    Results of a model that was swapped out while they were computed (or looked up)
+    are neither cached nor served from the cache, so the cache is only ever cleared
+    forwards, from one live version to the next.
+    """
+    current = detector
+    if current is None or version != current.version:
+        return False
+    prediction_cache.bind_version(version)
+    return True
 
-def _preprocess_image(pil_image: Image.Image) -> Image.Image:
-    try:
-        # convert to RGB then grayscale if necessary
-        img = pil_image.convert('L')
-        # Resize to reasonable width while maintaining aspect ratio
-        max_w = 1024
-        if img.width > max_w:
-            ratio = max_w / float(img.width)
-            new_h = int(img.height * ratio)
-            img = img.resize((max_w, new_h), Image.LANCZOS)
 
-        # Increase contrast + sharpen
-        img = ImageOps.autocontrast(img)
-        img = img.filter(ImageFilter.SHARPEN)
-        img = ImageEnhance.Contrast(img).enhance(1.2)
-        return img
-    except Exception:
-        return pil_image
+def _prediction_key(text: str, version: str) -> str:
+    # keys include the model version, and the cache is cleared when the detector changes
+    return cache.content_key(text, version)
 
 
-_easyocr_reader = None
+def _cache_result(text: str, result: Dict[str, Any]) -> None:
+    # keyed by the model that produced the result, which for a batched call may be
+    # newer than the one the request saw
+    version = result["model_version"]
+    if _cacheable(version):
+        prediction_cache.set(_prediction_key(text, version), result)
 
 
-def _image_to_text(file_bytes: bytes) -> str:
-    # Try EasyOCR if available, then fall back to pytesseract. If no OCR available
-    # user can still supply `text` form field.
-    global _easyocr_reader
+def _record_results(texts: List[str], results: List[Dict[str, Any]]) -> None:
+    for text, result in zip(texts, results):
+        input_chars.observe(len(text))
+        languages.labels(language=result["language"]).inc()
 
-    try:
-        pil_image = Image.open(io.BytesIO(file_bytes))
-    except Exception:
-        return ""
 
-    # preprocessing
-    pil_image = _preprocess_image(pil_image)
+async def _predict_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    """Classify ``texts`` in one batch, serving repeats from the prediction cache."""
+    current = await _detector()
+    if prediction_cache is None:
+        results = _tag(await executors.run_inference(current.predict_batch, texts), current)
+    else:
+        results = [None] * len(texts)
+        if _cacheable(current.version):
+            results = [prediction_cache.get(_prediction_key(t, current.version)) for t in texts]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            fresh = _tag(await executors.run_inference(current.predict_batch, [texts[i] for i in missing]), current)
+            for i, result in zip(missing, fresh):
+                _cache_result(texts[i], result)
+                results[i] = result
+    _record_results(texts, results)
+    return results
 
-    # try EasyOCR first
-    try:
-        import easyocr
-        if _easyocr_reader is None:
-            # only init once (may be heavy)
-            _easyocr_reader = easyocr.Reader(['en'], gpu=False)
-        # easyocr works on numpy arrays
-        import numpy as np
-        arr = np.array(pil_image)
-        res = _easyocr_reader.readtext(arr, detail=0)
-        if res:
-            return "\n".join(res).strip()
-    except Exception:
-        # fallthrough to pytesseract
-        _easyocr_reader = None
 
-    try:
-        import pytesseract
-        text = pytesseract.image_to_string(pil_image)
-        return text.strip()
-    except Exception:
-        return ""
+async def _predict_one(text: str) -> Dict[str, Any]:
+    current = await _detector()
+    result = None
+    if prediction_cache is not None and _cacheable(current.version):
+        result = prediction_cache.get(_prediction_key(text, current.version))
+
+    if result is None:
+        if MICROBATCH_MAX_SIZE > 1:
+            result = await batcher.submit(text)
+        else:
+            result = _tag([await executors.run_inference(current.predict_text, text)], current)[0]
+        if prediction_cache is not None:
+            _cache_result(text, result)
+    _record_results([text], [result])
+    return result
+
+
+async def _image_text(contents: bytes) -> str:
+    """OCR text for an image, served from the OCR cache for repeated images."""
+    key = cache.content_key(contents, "ocr") if ocr_cache is not None else None
+    if key is not None:
+        text = ocr_cache.get(key)
+        if text is not None:
+            return text
+    # OCR can take seconds; run it off the event loop in the OCR worker pool
+    text = await executors.run_ocr(contents)
+    # empty text may be a transient OCR failure, so only real text is cached
+    if key is not None and text:
+        ocr_cache.set(key, text)
+    return text
+
+
+class DetectResponse(BaseModel):
+    language: str
+    confidence: float
+    indicators: List[str]
+    raw_text: str
+    model_version: Optional[str] = None
 
 
 @app.post("/detect-language", response_model=DetectResponse)
@@ -114,10 +344,22 @@ async def detect_language(file: Optional[UploadFile] = File(None), text: Optiona
     if not file and not text:
         raise HTTPException(status_code=400, detail="Either 'file' (image) or 'text' form-field is required")
 
+    # routing and multipart parsing happen before the handler runs
+    parse_seconds = metrics.request_elapsed()
+    if parse_seconds is not None:
+        metrics.record_stage("parse", parse_seconds)
+
     ocr_text = ""
     if file:
         contents = await file.read()
-        ocr_text = _image_to_text(contents)
+        image_bytes.observe(len(contents))
+        with metrics.span("ocr"):
+            try:
+                ocr_text = await _image_text(contents)
+            except OCRUnavailable as exc:
+                # overload, not a bad image: tell the client to come back
+                raise HTTPException(status_code=503, detail=f"OCR is busy, retry later ({exc})",
+                                    headers={"Retry-After": str(OCR_RETRY_AFTER)})
 
     final_text = (text or "") + "\n" + (ocr_text or "")
     final_text = final_text.strip()
@@ -125,11 +367,142 @@ async def detect_language(file: Optional[UploadFile] = File(None), text: Optiona
     if len(final_text) == 0:
         raise HTTPException(status_code=400, detail="No text could be extracted from the input. If using images, ensure Tesseract OCR is installed or pass 'text' field.")
 
-    result = detector.predict_text(final_text)
-
+    with metrics.span("inference"):
+        result = await _predict_one(final_text)
     return JSONResponse(content=result)
 
 
+@app.post("/detect-language/batch", response_model=List[DetectResponse])
+async def detect_language_batch(texts: List[str] = Body(...)):
+    """Classify a JSON array of texts; results come back in the same order."""
+    if len(texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} texts per batch")
+
+    results = await _predict_texts([t.strip() for t in texts])
+    return JSONResponse(content=results)
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """StreamingResponse that does not listen for disconnects while streaming.
+
+    Starlette normally reads ``receive`` in the background to notice client
+    disconnects, which would swallow the request body the NDJSON endpoint is still
+    consuming while it writes results.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _parse_ndjson_item(line: bytes) -> Optional[str]:
+    # each line is either a JSON string or an object with a "text" field
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(item, dict):
+        item = item.get("text")
+    return item.strip() if isinstance(item, str) else None
+
+
+def _line_too_long() -> str:
+    return json.dumps({"error": f"line longer than {STREAM_MAX_LINE_BYTES} bytes"}) + "\n"
+
+
+async def _classify_lines(lines: List[bytes]) -> AsyncIterator[str]:
+    errors: List[Optional[str]] = []
+    texts = []
+    for line in lines:
+        if len(line) > STREAM_MAX_LINE_BYTES:
+            errors.append(f"line longer than {STREAM_MAX_LINE_BYTES} bytes")
+        elif not line.strip():
+            errors.append("empty line")
+        else:
+            text = _parse_ndjson_item(line)
+            errors.append(None if text is not None else "expected a JSON string or an object with a 'text' field")
+            if text is not None:
+                texts.append(text)
+    results = iter(await _predict_texts(texts) if texts else [])
+    for error in errors:
+        out = {"error": error} if error is not None else next(results)
+        yield json.dumps(out) + "\n"
+
+
+async def _stream_predictions(request: Request) -> AsyncIterator[str]:
+    buf = bytearray()
+    # the rest of a line already answered as too long is dropped up to its newline
+    skipping = False
+    async for chunk in request.stream():
+        buf.extend(chunk)
+        end = buf.rfind(b"\n")
+        if end >= 0:
+            # classify every complete line received so far, in chunks
+            lines = bytes(buf[:end]).split(b"\n")
+            del buf[:end + 1]
+            if skipping:
+                lines, skipping = lines[1:], False
+            for start in range(0, len(lines), STREAM_CHUNK_SIZE):
+                async for out in _classify_lines(lines[start:start + STREAM_CHUNK_SIZE]):
+                    yield out
+        if len(buf) > STREAM_MAX_LINE_BYTES:
+            if not skipping:
+                yield _line_too_long()
+            skipping = True
+            buf.clear()
+    if not skipping and bytes(buf).strip():
+        async for out in _classify_lines([bytes(buf)]):
+            yield out
+
+
+@app.post("/detect-language/stream")
+async def detect_language_stream(request: Request):
+    """Classify an NDJSON request body, writing one NDJSON result per input line.
+
+    Results are written as each chunk of lines is classified, without buffering the
+    whole request body.
+    """
+    return NDJSONStreamingResponse(_stream_predictions(request), media_type="application/x-ndjson")
+
+
+@app.post("/admin/reload-model")
+async def reload_model(request: Request) -> JSONResponse:
+    """Load the model file again and swap it in if it passes the self-test.
+
+    200 when reloaded (or unchanged), 409 while another reload runs, 422 when the new
+    model failed to load or failed the self-test (the old one keeps serving). Disabled
+    (404) unless ADMIN_TOKEN is set.
+    """
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    outcome = await asyncio.get_running_loop().run_in_executor(None, reload_detector)
+    status_code = {"busy": 409, "failed": 422}.get(outcome["status"], 200)
+    return JSONResponse(content=outcome, status_code=status_code)
+
+
 @app.get("/health")
 def health() -> Dict[str, Any]:
     return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """200 once the model is loaded and a warm-up prediction has run, 503 until then."""
+    body = dict(_startup)
+    return JSONResponse(content=body, status_code=200 if body["status"] == "ready" else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> PlainTextResponse:
+    """This worker's metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/stats")
+def stats() -> Dict[str, Any]:
+    """In-process metrics (batch sizes, queueing delay, OCR workers, caches) for this worker."""
+    caches = {c.name: c.stats() for c in (prediction_cache, ocr_cache) if c is not None}
+    return {**metrics.snapshot(), "ocr_workers": executors.ocr_worker_stats(), "caches": caches}
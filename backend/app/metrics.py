@@ -0,0 +1,282 @@
+"""Small in-process metrics registry.
+
+Counters, gauges and histograms are kept in memory per worker process and exposed by the API
+as a JSON snapshot (``/stats``) and in the Prometheus text format (``/metrics``). Kept
+dependency-free on purpose. Metrics created with ``labelnames`` are families: call
+``.labels(...)`` to get the child series to update.
+
+``span(stage)`` times one stage of a request into the ``detect_stage_seconds``
+histogram. Inside ``ServerTimingMiddleware`` the stage durations of the current request
+are also collected and returned in a ``Server-Timing`` response header.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+
+
+class _Family:
+    """Label handling shared by Counter, Gauge and Histogram."""
+
+    def _init_family(self, labelnames: Sequence[str]) -> None:
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._children_lock = threading.Lock()
+
+    def labels(self, **labels: object):
+        """The child series for these label values, created on first use."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._children_lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def clear(self) -> None:
+        """Drop every child series (e.g. an info metric whose label value changed)."""
+        with self._children_lock:
+            self._children.clear()
+
+    def series(self) -> List[Tuple[Tuple[Tuple[str, str], ...], object]]:
+        """(label pairs, metric) for every series of this metric."""
+        if not self.labelnames:
+            return [((), self)]
+        with self._children_lock:
+            children = sorted(self._children.items())
+        return [(tuple(zip(self.labelnames, key)), child) for key, child in children]
+
+    def snapshot(self):
+        if not self.labelnames:
+            return self._snapshot()
+        return {",".join(f"{k}={v}" for k, v in labels): child._snapshot() for labels, child in self.series()}
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+        self._lock = threading.Lock()
+        self._init_family(labelnames)
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.help)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _snapshot(self) -> float:
+        return self.value
+
+    def _prometheus(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+        self._lock = threading.Lock()
+        self._init_family(labelnames)
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.help)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = float(value)
+
+    def _snapshot(self) -> float:
+        return self.value
+
+    def _prometheus(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets: List[float] = sorted(buckets)
+        # one slot per bucket plus the +Inf overflow slot
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+        self._init_family(labelnames)
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.help, self.buckets)
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+            self.count += 1
+
+    def _cumulative(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        with self._lock:
+            counts = list(self.counts)
+            total, n = self.sum, self.count
+        cumulative = []
+        running = 0
+        for bound, c in zip(self.buckets + [float("inf")], counts):
+            running += c
+            cumulative.append((bound, running))
+        return cumulative, total, n
+
+    def _snapshot(self) -> Dict[str, object]:
+        """Cumulative bucket counts keyed by upper bound, plus sum and count."""
+        cumulative, total, n = self._cumulative()
+        buckets = {"+Inf" if bound == float("inf") else repr(bound): c for bound, c in cumulative}
+        return {"buckets": buckets, "sum": total, "count": n}
+
+    def _prometheus(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        cumulative, total, n = self._cumulative()
+        lines = [
+            f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {c}"
+            for bound, c in cumulative
+        ]
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {n}")
+        return lines
+
+
+_REGISTRY: Dict[str, object] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Return the counter registered under ``name``, creating it on first use."""
+    with _REGISTRY_LOCK:
+        if name not in _REGISTRY:
+            _REGISTRY[name] = Counter(name, help, labelnames)
+        return _REGISTRY[name]
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Return the gauge registered under ``name``, creating it on first use."""
+    with _REGISTRY_LOCK:
+        if name not in _REGISTRY:
+            _REGISTRY[name] = Gauge(name, help, labelnames)
+        return _REGISTRY[name]
+
+
+def histogram(name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+    """Return the histogram registered under ``name``, creating it on first use."""
+    with _REGISTRY_LOCK:
+        if name not in _REGISTRY:
+            _REGISTRY[name] = Histogram(name, help, buckets, labelnames)
+        return _REGISTRY[name]
+
+
+def snapshot() -> Dict[str, object]:
+    """JSON-friendly view of every registered metric."""
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+    return {m.name: m.snapshot() for m in metrics}
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    with _REGISTRY_LOCK:
+        metrics = sorted(_REGISTRY.values(), key=lambda m: m.name)
+    lines = []
+    for m in metrics:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        for labels, series in m.series():
+            lines.extend(series._prometheus(m.name, labels))
+    return "\n".join(lines) + "\n"
+
+
+STAGE_BUCKETS = [0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+stage_seconds = histogram("detect_stage_seconds", "Time spent per detection stage", STAGE_BUCKETS, ("stage",))
+
+# stage -> seconds for the request being handled (set by ServerTimingMiddleware)
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    stage_seconds.labels(stage=stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def request_elapsed() -> Optional[float]:
+    """Seconds since ServerTimingMiddleware received the current request, if any."""
+    timings = _request_timings.get()
+    if timings is None:
+        return None
+    return time.perf_counter() - timings["_start"]
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a ``Server-Timing`` header with the request's stage times.
+
+    Only stages timed in the request's own context are included; work done on executor
+    threads (e.g. model stages inside a micro-batch) shows up in ``/metrics`` only.
+    """
+
+    def __init__(self, app, path_prefixes: Sequence[str] = ("/",)):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+        timings = {"_start": time.perf_counter()}
+        token = _request_timings.set(timings)
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()
+                           if not stage.startswith("_")]
+                entries.append(f"total;dur={(time.perf_counter() - timings['_start']) * 1000:.2f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,89 @@
+"""Storage for the NumPy model families: a ``.npz`` file or a memory-mapped directory.
+
+``np.load`` reads every member of a ``.npz`` into private memory, so N worker processes
+hold N copies of the weights. A path ending in ``.mmap`` is instead a directory with one
+``.npy`` file per array (the ``.npy`` header pads the data to a 64-byte boundary) and a
+``meta.json``; ``load_arrays`` maps those files read-only. Their pages live in the OS
+page cache, shared by every process that maps the same files, and are read from disk
+only when touched.
+
+A directory is written next to its final path and renamed into place, so a process
+loading it never sees a half-written model; processes that already mapped the old files
+keep reading them until they reload.
+"""
+from pathlib import Path
+from typing import Any, Dict, Tuple
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+MMAP_SUFFIX = ".mmap"
+META_FILE = "meta.json"
+
+
+def is_mmap(path: Path) -> bool:
+    return path.suffix == MMAP_SUFFIX
+
+
+def save_arrays(path: Path, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> None:
+    """Write ``arrays`` and ``meta`` as a ``.npz`` file or, for a ``.mmap`` path, a directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not is_mmap(path):
+        with open(path, "wb") as fh:
+            np.savez(fh, **arrays, meta=np.array(json.dumps(meta)))
+        return
+    tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+    try:
+        for name, array in arrays.items():
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(array), allow_pickle=False)
+        (tmp / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        if path.exists():
+            old = Path(tempfile.mkdtemp(prefix=f".{path.name}.old.", dir=path.parent))
+            os.replace(path, old / path.name)
+            os.replace(tmp, path)
+            shutil.rmtree(old)
+        else:
+            os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_arrays(path: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """(arrays, meta) from ``save_arrays``; arrays of a ``.mmap`` directory are read-only maps."""
+    if path.is_dir():
+        files = sorted(path.glob("*.npy"))
+        return {file.stem: np.load(file, mmap_mode="r", allow_pickle=False) for file in files}, read_meta(path)
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"])) if "meta" in data else {}
+        return {name: data[name] for name in data.files if name != "meta"}, meta
+
+
+def read_meta(path: Path) -> Dict[str, Any]:
+    """``meta`` alone, without reading the arrays of a ``.npz``."""
+    if path.is_dir():
+        return json.loads((path / META_FILE).read_text(encoding="utf-8"))
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data["meta"])) if "meta" in data else {}
+
+
+def remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def digest(path: Path) -> str:
+    """sha256 of a model file, or of a ``.mmap`` directory's file names and contents."""
+    if not path.is_dir():
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    h = hashlib.sha256()
+    for file in sorted(path.iterdir()):
+        h.update(file.name.encode("utf-8") + b"\0")
+        h.update(file.read_bytes())
+    return h.hexdigest()
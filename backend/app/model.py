@@ -1,17 +1,92 @@
+import hashlib
+import io
 import json
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
 import os
+import time
 from pathlib import Path
 
-import joblib
-from backend.app.syntax_rules import detect_by_syntax
-from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import numpy as np
+from backend.app import metrics
+from backend.app.compact import export_compact, load_compact, save_compact
+from backend.app.fetch import fetch_model
+from backend.app.hashed import load_hashed
+from backend.app.mmap_store import MMAP_SUFFIX, digest as file_digest, read_meta, remove
+from backend.app.syntax_rules import DEFAULT_RULESET
 
-MODEL_PATH = Path(__file__).resolve().parents[1] / "models" / "lang_detector.joblib"
+# joblib and sklearn are imported where they are used: the compact model needs neither,
+# and importing sklearn alone takes about a second
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+# MODEL_PATH can point at a joblib model, or at a NumPy model saved as .npz or as a
+# memory-mapped .mmap directory (see compact.py, hashed.py and mmap_store.py)
+MODEL_PATH = Path(
+    os.environ.get("MODEL_PATH") or Path(__file__).resolve().parents[1] / "models" / "lang_detector.joblib"
+)
 MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+# Downloads of MODEL_URL, shared by every process on the host that uses the same directory
+MODEL_CACHE_DIR = Path(os.environ.get("MODEL_CACHE_DIR") or MODEL_PATH.parent / "cache")
+# NumPy-only export of MODEL_PATH (see compact.py); COMPACT_MODEL=0 always uses sklearn
+COMPACT_MODEL = os.environ.get("COMPACT_MODEL", "1") != "0"
+# Windowed classification of large inputs (WINDOW_THRESHOLD=0 turns it off)
+WINDOW_THRESHOLD = int(os.environ.get("WINDOW_THRESHOLD", "32768")) or None
+WINDOW_CHARS = int(os.environ.get("WINDOW_CHARS", "4096"))
+MAX_WINDOWS = int(os.environ.get("MAX_WINDOWS", "32"))
+WINDOW_ROUND = 4
+WINDOW_PATIENCE = 2
+WINDOW_TOLERANCE = 0.02
+# Syntax-first cascade: skip the ML model when the top language leads the runner-up by
+# at least this much summed rule weight (unset or empty: always run the model)
+CASCADE_MARGIN = float(os.environ["CASCADE_MARGIN"]) if os.environ.get("CASCADE_MARGIN") else None
+# rule weight counted against the rules in a rules-only confidence, so a single weak match
+# is not reported as certain
+CASCADE_PRIOR_WEIGHT = 1.0
+
+cascade_stage = metrics.counter("detect_cascade_total", "Predictions decided by each cascade stage", ("stage",))
+
+
+# (minimum top syntax score, beta, alpha): the stronger the syntax signal, the more
+# weight it gets against the calibrated ML probability.
+_FUSION_WEIGHTS = [(0.95, 0.85, 0.15), (0.7, 0.6, 0.4), (0.4, 0.35, 0.65)]
+_DEFAULT_BETA, _DEFAULT_ALPHA = 0.15, 0.85
+
+
+def _fusion_weights(top_syntax_score: float) -> Tuple[float, float]:
+    """Return (alpha, beta) for the ML and syntax parts of the fused score."""
+    for threshold, beta, alpha in _FUSION_WEIGHTS:
+        if top_syntax_score >= threshold:
+            return alpha, beta
+    return _DEFAULT_ALPHA, _DEFAULT_BETA
+
+
+def _heuristic_indicators(text: str) -> List[str]:
+    # rule-based indicators (simple heuristics)
+    indicators = []
+    lowered = text.lower()
+    if "def " in lowered or ("import " in lowered and "def" in lowered):
+        indicators.append("def / indentation -> likely Python")
+    if "console.log" in lowered or "=>" in lowered or "function(" in lowered:
+        indicators.append("JS specific constructs -> likely JavaScript/TypeScript")
+    if "#include" in lowered or "printf(" in lowered:
+        indicators.append("C/C++ preprocessor / printf -> likely C/C++")
+    if "package main" in lowered or "func main(" in lowered:
+        indicators.append("Go-like main() / package main -> likely Go")
+    if "using " in lowered and "namespace" in lowered:
+        indicators.append("C# / using + namespace patterns")
+    if "class " in lowered and "public static void main" in lowered:
+        indicators.append("Java style main -> likely Java")
+    return indicators
+
+
+def _empty_result(text: str) -> Dict[str, Any]:
+    return {
+        "language": "unknown",
+        "confidence": 0.0,
+        "indicators": [],
+        "raw_text": text,
+    }
 
 
 @dataclass
@@ -23,56 +98,78 @@ class PredictResult:
 
 
 class LanguageDetector:
-    def __init__(self, pipeline: Pipeline):
+    def __init__(self, pipeline: "Pipeline", version: Optional[str] = None,
+                 window_threshold: Optional[int] = WINDOW_THRESHOLD, window_chars: int = WINDOW_CHARS,
+                 max_windows: int = MAX_WINDOWS, cascade_margin: Optional[float] = CASCADE_MARGIN):
         self.pipeline = pipeline
+        self._version = version
+        # texts longer than window_threshold go through predict_windowed (None: never)
+        self.window_threshold = window_threshold
+        # a window never exceeds the threshold, so it is never windowed again
+        if window_threshold is not None:
+            window_chars = min(window_chars, window_threshold)
+        self.window_chars = window_chars
+        self.max_windows = max_windows
+        # syntax lead (in rule weight) at which the ML model is skipped (None: never)
+        self.cascade_margin = cascade_margin
+        # label-alignment tables for predict_batch, built on first use
+        self._fusion_tables = None
+
+    @property
+    def version(self) -> str:
+        """Content hash identifying the model (used to key and invalidate caches)."""
+        if self._version is None:
+            import joblib
+
+            buf = io.BytesIO()
+            joblib.dump(self.pipeline, buf)
+            self._version = hashlib.sha256(buf.getvalue()).hexdigest()[:16]
+        return self._version
+
+    def _class_labels(self):
+        # Safely obtain class labels from the pipeline (works for calibrated wrappers too)
+        if hasattr(self.pipeline, "classes_"):
+            return self.pipeline.classes_
+        base = getattr(self.pipeline, "base_estimator", None)
+        if base is not None and hasattr(base, "classes_"):
+            return base.classes_
+        return None
 
     def predict_text(self, text: str) -> Dict[str, Any]:
         # pipeline.predict_proba returns array; index of maximum probability
         if not text or text.strip() == "":
-            return {
-                "language": "unknown",
-                "confidence": 0.0,
-                "indicators": [],
-                "raw_text": text,
-            }
+            return _empty_result(text)
+        if self._use_windows(text):
+            return self.predict_windowed(text)
+        return self._predict_whole(text)
 
-        probs = self.pipeline.predict_proba([text])[0]
-        # Safely obtain class labels from the pipeline (works for calibrated wrappers too)
-        labels = None
-        if hasattr(self.pipeline, "classes_"):
-            labels = self.pipeline.classes_
-        else:
-            base = getattr(self.pipeline, "base_estimator", None)
-            if base is not None and hasattr(base, "classes_"):
-                labels = base.classes_
+    def _predict_whole(self, text: str) -> Dict[str, Any]:
+        """``predict_text`` for a non-blank text, classified in one piece."""
+        with metrics.span("syntax"):
+            syntax_totals = DEFAULT_RULESET.raw_scores(text)
+        decided = self._cascade(text, syntax_totals)
+        if decided is not None:
+            return decided
+
+        with metrics.span("predict_proba"):
+            probs = self.pipeline.predict_proba([text])[0]
+        labels = self._class_labels()
 
+        best_idx = int(probs.argmax())
         # Fallback: if labels are still not available, infer by predicting a label
+        # (the other probability columns stay unnamed)
         if labels is None:
-            preds = self.pipeline.predict([text])
-            labels = [preds[0]]
-        best_idx = int(probs.argmax())
+            labels = [""] * len(probs)
+            labels[best_idx] = self.pipeline.predict([text])[0]
         language = labels[best_idx]
         confidence = float(probs[best_idx])
 
         # syntax-based scores (regex rules from syntax.md)
-        syntax_scores = detect_by_syntax(text)
-
-        # rule-based indicators (simple heuristics)
-        indicators = []
-        lowered = text.lower()
-        if "def " in lowered or ("import " in lowered and "def" in lowered):
-            indicators.append("def / indentation -> likely Python")
-        if "console.log" in lowered or "=>" in lowered or "function(" in lowered:
-            indicators.append("JS specific constructs -> likely JavaScript/TypeScript")
-        if "#include" in lowered or "printf(" in lowered:
-            indicators.append("C/C++ preprocessor / printf -> likely C/C++")
-        if "package main" in lowered or "func main(" in lowered:
-            indicators.append("Go-like main() / package main -> likely Go")
-        if "using " in lowered and "namespace" in lowered:
-            indicators.append("C# / using + namespace patterns")
-        if "class " in lowered and "public static void main" in lowered:
-            indicators.append("Java style main -> likely Java")
+        syntax_scores = DEFAULT_RULESET.normalize(syntax_totals)
 
+        with metrics.span("indicators"):
+            indicators = _heuristic_indicators(text)
+        fusion_started = time.perf_counter()
 
         # Add syntax indicators from the syntax detector
         syntax_indicator = None
@@ -86,7 +183,7 @@ class LanguageDetector:
         # compute a combined probability that fuses calibrated ML proba and syntax strength
         # Ensure labels and probs line up
         try:
-            ml_sorted = sorted(list(zip(labels, probs)), key=lambda kv: kv[1], reverse=True)
+            ml_sorted = sorted(list(zip(labels, probs.tolist())), key=lambda kv: kv[1], reverse=True)
         except Exception:
             # final defensive fallback: predict label only
             ml_label = self.pipeline.predict([text])[0]
@@ -103,18 +200,7 @@ class LanguageDetector:
                     break
 
         # choose weights depending on syntax signal strength
-        if top_syntax_score >= 0.95:
-            beta = 0.85
-            alpha = 0.15
-        elif top_syntax_score >= 0.7:
-            beta = 0.6
-            alpha = 0.4
-        elif top_syntax_score >= 0.4:
-            beta = 0.35
-            alpha = 0.65
-        else:
-            beta = 0.15
-            alpha = 0.85
+        alpha, beta = _fusion_weights(top_syntax_score)
 
         # compute fused scores for ML top and syntax top
         fused_ml_top = alpha * ml_top_prob + beta * (syntax_scores.get(ml_top_lang, 0) if syntax_scores else 0)
@@ -130,6 +216,7 @@ class LanguageDetector:
 
         # Add ML top indicators for debug / transparency
         indicators.append(f"ml_top={ml_top_lang}({round(ml_top_prob,3)})")
+        metrics.record_stage("fusion", time.perf_counter() - fusion_started)
 
         # return the fused language decision and combined confidence
         return {
@@ -139,39 +226,320 @@ class LanguageDetector:
             "raw_text": text,
         }
 
+    def _get_fusion_tables(self, labels) -> Tuple[np.ndarray, np.ndarray]:
+        """Map model classes onto the syntax language index.
+
+        Returns ``class_to_lang`` (syntax index whose name equals each class, or -1) and
+        ``lang_matches`` (languages x classes), true where predict_text would treat the
+        class as the ML counterpart of a syntax language.
+        """
+        key = tuple(labels)
+        if self._fusion_tables is None or self._fusion_tables[0] != key:
+            langs = DEFAULT_RULESET.languages
+            class_to_lang = np.array([DEFAULT_RULESET.index.get(l, -1) for l in key], dtype=np.intp)
+            lang_matches = np.array(
+                [[l.lower() == lang.lower() or l.startswith(lang) for l in key] for lang in langs],
+                dtype=bool,
+            )
+            self._fusion_tables = (key, class_to_lang, lang_matches)
+        return self._fusion_tables[1], self._fusion_tables[2]
+
+    def _fuse(self, probs: np.ndarray, syntax: np.ndarray, labels) -> List[Dict[str, Any]]:
+        """Vectorized alpha/beta fusion of ML probabilities and syntax scores, per row.
+
+        Returns, for each row, the winning ``language`` and ``confidence`` plus the
+        indicators that go before (``syntax_indicators``) and after (``ml_indicators``)
+        the heuristic ones.
+        """
+        class_to_lang, lang_matches = self._get_fusion_tables(labels)
+        rows = np.arange(len(probs))
+
+        ml_top = probs.argmax(axis=1)
+        ml_top_prob = probs[rows, ml_top]
+        syn_top = syntax.argmax(axis=1)
+        syn_top_score = syntax[rows, syn_top]
+        has_syntax = syn_top_score > 0
+
+        # ML probability of the best class matching the top syntax language
+        ml_for_syntax = np.where(lang_matches[syn_top], probs, 0.0).max(axis=1)
+        # syntax score of the ML top class (0 when the class has no syntax rules)
+        ml_top_lang = class_to_lang[ml_top]
+        syntax_for_ml = np.where(ml_top_lang >= 0, syntax[rows, np.maximum(ml_top_lang, 0)], 0.0)
+
+        alpha = np.full(len(probs), _DEFAULT_ALPHA)
+        beta = np.full(len(probs), _DEFAULT_BETA)
+        for threshold, b, a in reversed(_FUSION_WEIGHTS):
+            strong = syn_top_score >= threshold
+            alpha[strong] = a
+            beta[strong] = b
+
+        fused_ml_top = alpha * ml_top_prob + beta * syntax_for_ml
+        fused_syntax_top = alpha * np.where(has_syntax, ml_for_syntax, 0.0) + beta * syn_top_score
+        use_syntax = has_syntax & (fused_syntax_top > fused_ml_top + 0.03)
+        combined = np.minimum(0.999, np.where(use_syntax, fused_syntax_top, fused_ml_top))
+
+        langs = DEFAULT_RULESET.languages
+        fused = []
+        for row in rows:
+            top_label = labels[ml_top[row]]
+            syntax_indicators = []
+            if has_syntax[row]:
+                syntax_indicators.append(
+                    f"syntax pattern -> {langs[syn_top[row]]} (score={round(float(syn_top_score[row]), 3)})"
+                )
+            fused.append({
+                "language": langs[syn_top[row]] if use_syntax[row] else top_label,
+                # Python round() per item keeps results bit-identical to predict_text
+                "confidence": round(round(float(combined[row]), 4), 4),
+                "syntax_indicators": syntax_indicators,
+                "ml_indicators": [f"ml_top={top_label}({round(float(ml_top_prob[row]), 3)})"],
+            })
+        return fused
+
+    def predict_batch(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Classify many texts with one ``predict_proba`` call.
+
+        Syntax scores are built as a (texts x languages) matrix and the alpha/beta
+        fusion runs as array operations over all rows. Each item is identical to what
+        ``predict_text`` returns for it; texts longer than ``window_threshold`` are
+        classified one by one with ``predict_windowed``.
+        """
+        results: List[Dict[str, Any]] = [None] * len(texts)
+        live = []
+        for i, text in enumerate(texts):
+            if not text or text.strip() == "":
+                results[i] = _empty_result(text)
+            elif self._use_windows(text):
+                results[i] = self.predict_windowed(text)
+            else:
+                live.append(i)
+        if not live:
+            return results
+
+        labels = self._class_labels()
+        if labels is None:
+            for i in live:
+                results[i] = self.predict_text(texts[i])
+            return results
+
+        with metrics.span("syntax"):
+            totals = [DEFAULT_RULESET.raw_scores(texts[i]) for i in live]
+        undecided = []
+        for i, row_totals in zip(live, totals):
+            decided = self._cascade(texts[i], row_totals)
+            if decided is not None:
+                results[i] = decided
+            else:
+                undecided.append((i, row_totals))
+        if not undecided:
+            return results
+        live = [i for i, _ in undecided]
+
+        batch = [texts[i] for i in live]
+        with metrics.span("predict_proba"):
+            probs = np.asarray(self.pipeline.predict_proba(batch), dtype=np.float64)
+        syntax = DEFAULT_RULESET.normalize_rows([row_totals for _, row_totals in undecided])
+        with metrics.span("fusion"):
+            fused = self._fuse(probs, syntax, labels)
+
+        indicators_started = time.perf_counter()
+        for row, i in enumerate(live):
+            f = fused[row]
+            results[i] = {
+                "language": f["language"],
+                "confidence": f["confidence"],
+                "indicators": f["syntax_indicators"] + _heuristic_indicators(batch[row]) + f["ml_indicators"],
+                "raw_text": batch[row],
+            }
+        metrics.record_stage("indicators", time.perf_counter() - indicators_started)
+        return results
+
+    def score_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """One inference pass for evaluation: raw ML probabilities and fused results.
+
+        Returns the ``predict_proba`` rows (columns follow ``pipeline.classes_``) and, per
+        text, the fused ``language`` and ``confidence`` that ``predict_batch`` gives for
+        inputs that are neither windowed nor decided by the cascade.
+        """
+        labels = self._class_labels()
+        probs = np.asarray(self.pipeline.predict_proba(list(texts)), dtype=np.float64)
+        fused = self._fuse(probs, DEFAULT_RULESET.score_matrix(list(texts)), labels)
+        return probs, [{"language": f["language"], "confidence": f["confidence"]} for f in fused]
+
+    def _cascade(self, text: str, totals: List[float]) -> Optional[Dict[str, Any]]:
+        """Rules-only result when the syntax lead is decisive, else None (run the model).
+
+        The lead is the top language's summed rule weight minus the runner-up's. At or
+        above ``cascade_margin`` the ML model is skipped. The confidence is the lead over
+        the top language's weight plus ``CASCADE_PRIOR_WEIGHT``: it grows with the amount
+        of matched rule weight, not only with how little the runner-up matched.
+        """
+        if self.cascade_margin is None:
+            return None
+        top, lead = DEFAULT_RULESET.lead(totals)
+        if lead <= 0 or lead < self.cascade_margin:
+            cascade_stage.labels(stage="model").inc()
+            return None
+        cascade_stage.labels(stage="syntax").inc()
+        language = DEFAULT_RULESET.languages[top]
+        with metrics.span("indicators"):
+            indicators = _heuristic_indicators(text)
+        score = DEFAULT_RULESET.normalize(totals)[language]
+        indicators.insert(0, f"syntax pattern -> {language} (score={round(score, 3)})")
+        indicators.append(f"cascade: rule lead={round(lead, 3)}, model skipped")
+        return {
+            "language": language,
+            "confidence": round(min(0.999, lead / (totals[top] + CASCADE_PRIOR_WEIGHT)), 4),
+            "indicators": indicators,
+            "raw_text": text,
+        }
+
+    def _use_windows(self, text: str) -> bool:
+        return self.window_threshold is not None and len(text) > self.window_threshold
+
+    def predict_windowed(self, text: str) -> Dict[str, Any]:
+        """Classify a large text from bounded windows instead of the whole input.
+
+        The text is cut into ``window_chars`` slices, visited ends first and then by
+        repeated bisection, so every round covers the input more evenly. Each round
+        classifies ``WINDOW_ROUND`` windows in one batch; ML probabilities and syntax
+        scores are averaged over all windows so far and fused as in ``predict_text``.
+        It stops once the winning language and confidence have held steady (within
+        ``WINDOW_TOLERANCE``) for ``WINDOW_PATIENCE`` rounds, or after
+        ``max_windows``. ``raw_text`` holds only the first window.
+        """
+        width = self.window_chars
+        n_windows = -(-len(text) // width)
+        order = _window_order(n_windows)[:self.max_windows]
+        labels = self._class_labels()
+        if labels is None:
+            # no probability columns to average: classify the first window only
+            window = text[:width]
+            result = self._predict_whole(window) if window.strip() else _empty_result(window)
+            result["indicators"].append(f"windowed: 1 of {n_windows} windows of {width} chars")
+            return result
+
+        prob_sum = syntax_sum = None
+        sampled: List[str] = []
+        fused = previous = None
+        stable = 0
+        for start in range(0, len(order), WINDOW_ROUND):
+            windows = [text[i * width:(i + 1) * width] for i in order[start:start + WINDOW_ROUND]]
+            sampled.extend(windows)
+            with metrics.span("predict_proba"):
+                probs = np.asarray(self.pipeline.predict_proba(windows), dtype=np.float64).sum(axis=0)
+            with metrics.span("syntax"):
+                syntax = DEFAULT_RULESET.score_matrix(windows).sum(axis=0)
+            prob_sum = probs if prob_sum is None else prob_sum + probs
+            syntax_sum = syntax if syntax_sum is None else syntax_sum + syntax
+            with metrics.span("fusion"):
+                fused = self._fuse(prob_sum[None] / len(sampled), syntax_sum[None] / len(sampled), labels)[0]
+            if (previous is not None and fused["language"] == previous["language"]
+                    and abs(fused["confidence"] - previous["confidence"]) <= WINDOW_TOLERANCE):
+                stable += 1
+                if stable >= WINDOW_PATIENCE:
+                    break
+            else:
+                stable = 0
+            previous = fused
+
+        with metrics.span("indicators"):
+            # heuristics look at the sampled windows only, never the whole input
+            heuristics = _heuristic_indicators("\n".join(sampled))
+        return {
+            "language": fused["language"],
+            "confidence": fused["confidence"],
+            "indicators": fused["syntax_indicators"] + heuristics + fused["ml_indicators"]
+            + [f"windowed: {len(sampled)} of {n_windows} windows of {width} chars"],
+            "raw_text": text[:width],
+        }
+
+
+def _window_order(n: int) -> List[int]:
+    """Window indices 0..n-1, first and last first, then midpoints breadth-first."""
+    if n <= 2:
+        return list(range(n))
+    order = [0, n - 1]
+    intervals = [(0, n - 1)]
+    while intervals:
+        nxt = []
+        for lo, hi in intervals:
+            mid = (lo + hi) // 2
+            if lo < mid < hi:
+                order.append(mid)
+                nxt.extend(((lo, mid), (mid, hi)))
+        intervals = nxt
+    return order
+
+
+def compact_path(filepath: Path) -> Path:
+    # memory-mapped, so worker processes share one copy; releases before it wrote .npz
+    return filepath.with_suffix(MMAP_SUFFIX)
+
+
+def load_numpy_model(filepath: Path):
+    """A model saved by ``save_compact`` or ``save_hashed``, by its recorded family."""
+    if read_meta(filepath).get("family") == "compact":
+        return load_compact(filepath)
+    return load_hashed(filepath)
+
 
-def save_detector(pipeline: Pipeline, filepath: Path = MODEL_PATH) -> None:
+def save_detector(pipeline: "Pipeline", filepath: Optional[Path] = None) -> None:
+    """Save the model, plus its compact export when the model type supports one."""
+    import joblib
+
+    filepath = filepath or MODEL_PATH
     filepath.parent.mkdir(parents=True, exist_ok=True)
     joblib.dump(pipeline, filepath)
+    try:
+        compact = export_compact(pipeline, source=hashlib.sha256(filepath.read_bytes()).hexdigest())
+    except ValueError:
+        if compact_path(filepath).exists():
+            remove(compact_path(filepath))
+        return
+    save_compact(compact, compact_path(filepath))
 
 
-def load_detector(filepath: Path = MODEL_PATH) -> LanguageDetector:
-    # If MODEL_URL is set in the environment, try to download and overwrite the model file
+def load_detector(filepath: Optional[Path] = None) -> LanguageDetector:
+    filepath = filepath or MODEL_PATH
+    # If MODEL_URL is set, fetch the model file unless it is already there (with the
+    # MODEL_SHA256 digest, when given); see fetch.py
     model_url = os.environ.get("MODEL_URL")
-    if model_url and not filepath.exists():
+    if model_url:
         try:
-            import requests
-
-            resp = requests.get(model_url, timeout=30)
-            resp.raise_for_status()
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            filepath.write_bytes(resp.content)
-            print(f"Downloaded model from {model_url} to {filepath}")
+            fetch_model(model_url, filepath, MODEL_CACHE_DIR, sha256=os.environ.get("MODEL_SHA256") or None)
         except Exception as e:
             # log the error and continue — fallback to default model
             print(f"Warning: failed to download model from MODEL_URL={model_url}: {e}")
 
     if filepath.exists():
+        digest = file_digest(filepath)
+        if filepath.suffix in (".npz", MMAP_SUFFIX):
+            return LanguageDetector(load_numpy_model(filepath), version=digest[:16])
+        # the compact export is used only if it was made from this exact model file
+        compact = None
+        if COMPACT_MODEL:
+            compact = load_compact(compact_path(filepath), source=digest) or load_compact(
+                filepath.with_suffix(".npz"), source=digest
+            )
+        if compact is not None:
+            return LanguageDetector(compact, version=digest[:16])
+        import joblib
+
         pipeline = joblib.load(filepath)
-        return LanguageDetector(pipeline)
+        return LanguageDetector(pipeline, version=digest[:16])
 
     # if not present, create a small default pipeline with naive labels
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
     pipeline = Pipeline(
         [
             ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=5000)),
             (
                 "clf",
-                LogisticRegression(max_iter=200, solver="liblinear", multi_class="ovr"),
+                LogisticRegression(max_iter=200),
             ),
         ]
     )
@@ -193,3 +561,41 @@ def load_detector(filepath: Path = MODEL_PATH) -> LanguageDetector:
     save_detector(pipeline)
 
     return LanguageDetector(pipeline)
+
+
+# Checked on a newly loaded model before it replaces the serving one (main.reload_detector)
+SELF_TEST_SAMPLES = [
+    ("def greet(name):\n    return f'hello {name}'\n\nif __name__ == '__main__':\n    print(greet('x'))", "Python"),
+    ("const add = (a, b) => a + b;\nconsole.log(add(1, 2));", "JavaScript"),
+    ("public class Main {\n    public static void main(String[] args) {\n        System.out.println(\"hi\");\n"
+     "    }\n}", "Java"),
+    ("#include <stdio.h>\n\nint main(void) {\n    printf(\"hi\\n\");\n    return 0;\n}", "C"),
+    ("package main\n\nimport \"fmt\"\n\nfunc main() {\n    fmt.Println(\"hi\")\n}", "Go"),
+    ("SELECT name, COUNT(*) FROM users GROUP BY name ORDER BY 2 DESC;", "SQL"),
+    ("<!DOCTYPE html>\n<html>\n  <body><p>hi</p></body>\n</html>", "HTML"),
+]
+SELF_TEST_MIN_ACCURACY = float(os.environ.get("SELF_TEST_MIN_ACCURACY", "0.7"))
+
+
+def self_test(detector: LanguageDetector, min_accuracy: float = SELF_TEST_MIN_ACCURACY) -> Optional[str]:
+    """None if ``detector`` classifies the built-in samples well enough, else the reason it failed.
+
+    The model's own predictions are checked, not the fused ones: the syntax rules alone
+    get most of these samples right.
+    """
+    texts = [text for text, _ in SELF_TEST_SAMPLES]
+    probs, fused = detector.score_batch(texts)
+    if probs.shape != (len(texts), len(detector.pipeline.classes_)) or not np.allclose(probs.sum(axis=1), 1.0):
+        return f"predict_proba returned {probs.shape} rows that are not distributions"
+    for result in fused + detector.predict_batch(texts):
+        confidence = result.get("confidence")
+        # also rejects NaN, which fails every comparison
+        if not isinstance(result.get("language"), str) or not (
+            isinstance(confidence, float) and 0.0 <= confidence <= 1.0
+        ):
+            return f"malformed result: {result!r}"
+    classes = [str(c) for c in detector.pipeline.classes_]
+    hits = sum(classes[row.argmax()] == label for row, (_, label) in zip(probs, SELF_TEST_SAMPLES))
+    if hits < min_accuracy * len(SELF_TEST_SAMPLES):
+        return f"model classified {hits}/{len(SELF_TEST_SAMPLES)} self-test samples correctly"
+    return None
@@ -0,0 +1,349 @@
+"""Image preprocessing and OCR.
+
+Kept separate from the FastAPI app so the functions can run in OCR worker processes
+without importing the web app or the model.
+
+OCR backends are wrapped in small engine objects that are loaded once and reused: a
+failure while reading one image falls through to the next engine for that image but
+never discards a loaded engine.
+
+Two preprocessing modes:
+
+- ``fast`` (default): ``decode_image`` decodes JPEGs at reduced resolution straight to
+  grayscale (DCT scaling via ``Image.draft``), ``crop_to_text`` cuts the image down to
+  the text found by projection profiles, and only the crop is resized and filtered
+- ``full``: the whole image is decoded at native resolution and filtered, as before
+
+Both reject images with more than ``max_pixels`` pixels from the header, before any
+pixel is decoded. ``none`` takes an image that is already preprocessed, such as a band
+from ``split_bands``.
+
+For tiled OCR a tall preprocessed image is split by ``split_bands`` into horizontal
+bands cut on blank rows, with a few overlapping rows; each band is read on its own and
+``stitch`` joins the texts, dropping the lines repeated in the overlaps.
+"""
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import io
+import threading
+import time
+from PIL import Image, ImageDraw, ImageFilter, ImageOps, ImageEnhance
+
+# width the image is reduced to before OCR
+MAX_WIDTH = 1024
+# larger uploads are not decoded at all (a 12 MP photo is 12_000_000)
+MAX_PIXELS = 40_000_000
+PREPROCESS_MODES = ("fast", "full")
+# EXIF orientations that swap width and height
+_TRANSPOSED = (5, 6, 7, 8)
+
+
+def _enhance(img: Image.Image) -> Image.Image:
+    # Increase contrast + sharpen
+    img = ImageOps.autocontrast(img)
+    img = img.filter(ImageFilter.SHARPEN)
+    return ImageEnhance.Contrast(img).enhance(1.2)
+
+
+def preprocess_image(pil_image: Image.Image) -> Image.Image:
+    try:
+        # convert to RGB then grayscale if necessary
+        img = pil_image.convert('L')
+        # Resize to reasonable width while maintaining aspect ratio
+        max_w = MAX_WIDTH
+        if img.width > max_w:
+            ratio = max_w / float(img.width)
+            new_h = int(img.height * ratio)
+            img = img.resize((max_w, new_h), Image.LANCZOS)
+        return _enhance(img)
+    except Exception:
+        return pil_image
+
+
+def open_image(file_bytes: bytes, max_pixels: int = MAX_PIXELS) -> Image.Image:
+    """Open an image lazily, raising ``ValueError`` if it has more than ``max_pixels``."""
+    img = Image.open(io.BytesIO(file_bytes))
+    if img.width * img.height > max_pixels:
+        raise ValueError(f"image is {img.width}x{img.height}, more than {max_pixels} pixels")
+    return img
+
+
+def decode_image(file_bytes: bytes, max_width: int = MAX_WIDTH, max_pixels: int = MAX_PIXELS) -> Image.Image:
+    """Decode to grayscale at the smallest size at least ``max_width`` wide (when larger).
+
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale by the codec itself; other formats are
+    box-reduced by an integer factor after decoding. EXIF orientation is applied.
+    """
+    img = open_image(file_bytes, max_pixels)
+    transposed = img.getexif().get(0x0112, 1) in _TRANSPOSED
+    width, height = (img.height, img.width) if transposed else (img.width, img.height)
+    if img.format == "JPEG" and width > max_width:
+        scale = max_width / width
+        img.draft("L", (max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    img = ImageOps.exif_transpose(img.convert("L"))
+    factor = img.width // max_width
+    if factor > 1:
+        img = img.reduce(factor)
+    return img
+
+
+def text_bbox(img: Image.Image, sample_width: int = 512) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box of the text in a grayscale image, or None if it is (nearly) all text.
+
+    Works on a reduced copy: text strokes are short, strong horizontal intensity
+    changes, unlike flat backgrounds, gradients and shading. Rows (then columns, within
+    the row span) with enough of them are grouped into runs, bridging gaps such as blank
+    lines, and runs with at least a tenth of the largest run's strokes are kept.
+    """
+    import numpy as np
+
+    factor = max(1, img.width // sample_width)
+    small = np.asarray(img.reduce(factor) if factor > 1 else img, dtype=np.int16)
+    if small.shape[0] < 8 or small.shape[1] < 8:
+        return None
+    low, high = np.percentile(small, (2, 98))
+    edges = np.abs(np.diff(small, axis=1)) > max(12.0, (high - low) / 4)
+
+    def span(profile: "np.ndarray", min_count: float, max_gap: int) -> Optional[Tuple[int, int]]:
+        active = np.flatnonzero(profile >= min_count)
+        if not len(active):
+            return None
+        # split where consecutive active rows / columns are more than max_gap apart
+        breaks = np.flatnonzero(np.diff(active) > max_gap)
+        starts = np.concatenate(([active[0]], active[breaks + 1]))
+        ends = np.concatenate((active[breaks], [active[-1]]))
+        mass = np.array([profile[a:b + 1].sum() for a, b in zip(starts, ends)])
+        keep = np.flatnonzero(mass >= mass.max() / 10)
+        return int(starts[keep[0]]), int(ends[keep[-1]]) + 1
+
+    h, w = edges.shape
+    rows = span(edges.sum(axis=1), max(2, w // 100), max(2, h // 12))
+    if rows is None:
+        return None
+    cols = span(edges[rows[0]:rows[1]].sum(axis=0), 1, max(2, w // 20))
+    if cols is None:
+        return None
+    pad = max(2, min(h, w) // 50)
+    top, bottom = max(0, rows[0] - pad), min(h, rows[1] + pad)
+    left, right = max(0, cols[0] - pad), min(w + 1, cols[1] + 1 + pad)
+    box = (left * factor, top * factor, min(img.width, right * factor), min(img.height, bottom * factor))
+    if (box[2] - box[0]) * (box[3] - box[1]) >= 0.9 * img.width * img.height:
+        return None
+    return box
+
+
+def crop_to_text(img: Image.Image) -> Image.Image:
+    box = text_bbox(img)
+    return img.crop(box) if box is not None else img
+
+
+def preprocess_fast(img: Image.Image, max_width: int = MAX_WIDTH) -> Image.Image:
+    """Crop a grayscale image from ``decode_image`` to its text, then resize and filter."""
+    img = crop_to_text(img)
+    if img.width > max_width:
+        img = img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+    return _enhance(img)
+
+
+def prepare_image(file_bytes: bytes, preprocess: str = "fast", max_pixels: int = MAX_PIXELS) -> Image.Image:
+    """Decode and preprocess an image as ``image_to_text`` does (may raise)."""
+    if preprocess == "fast":
+        return preprocess_fast(decode_image(file_bytes, max_pixels=max_pixels))
+    img = open_image(file_bytes, max_pixels)
+    img.load()
+    return preprocess_image(img) if preprocess == "full" else img
+
+
+def encode_band(img: Image.Image) -> bytes:
+    """Uncompressed PGM bytes for an image sent to an OCR worker (no encode cost)."""
+    buf = io.BytesIO()
+    img.convert("L").save(buf, format="PPM")
+    return buf.getvalue()
+
+
+def split_bands(img: Image.Image, band_height: int = 1024, overlap: int = 64) -> List[Tuple[int, int, int]]:
+    """Split a grayscale image into horizontal bands of about ``band_height`` rows.
+
+    Returns ``(top, bottom, shared_lines)`` per band. Each cut is made on the blank row
+    (no text strokes) closest to the target height, at most a third of a band away, or
+    at the target itself when there is none. A band then extends up to ``overlap``
+    rows past its cut, ending on a blank row, so text lines near a cut are read whole
+    by one band or the other; ``shared_lines`` is the number of text lines a band
+    repeats from the previous one, for ``stitch``.
+    """
+    import numpy as np
+
+    if img.height <= band_height * 1.5:
+        return [(0, img.height, 0)]
+    a = np.asarray(img, dtype=np.int16)
+    low, high = np.percentile(a[::4, ::4], (2, 98))
+    strokes = (np.abs(np.diff(a, axis=1)) > max(12.0, (high - low) / 4)).sum(axis=1)
+    blank = strokes <= max(1, img.width // 200)
+
+    def lines(start: int, end: int) -> int:
+        # runs of text rows in [start, end)
+        ink = ~blank[start:end]
+        return int(ink[0]) + int(np.count_nonzero(ink[1:] & ~ink[:-1])) if end > start else 0
+
+    bands, top, shared = [], 0, 0
+    while img.height - top > band_height * 1.5:
+        target = top + band_height
+        window = np.flatnonzero(blank[target - band_height // 3:target + band_height // 3])
+        if len(window):
+            cut = target - band_height // 3 + int(window[np.argmin(np.abs(window - band_height // 3))])
+            tail = np.flatnonzero(blank[cut:cut + overlap + 1])
+            bottom = cut + int(tail[-1])
+        else:
+            cut = target
+            bottom = min(img.height, cut + overlap)
+        bands.append((top, bottom, shared))
+        top, shared = cut, lines(cut, bottom)
+    bands.append((top, img.height, shared))
+    return bands
+
+
+def _same_line(a: str, b: str) -> bool:
+    a, b = " ".join(a.split()), " ".join(b.split())
+    return a == b or SequenceMatcher(None, a, b, autojunk=False).ratio() >= 0.8
+
+
+def stitch(texts: Sequence[str], shared_lines: Sequence[int]) -> str:
+    """Join band texts in order, dropping the leading lines of band ``i`` that repeat
+    the end of the text so far.
+
+    ``shared_lines[i]`` repeated lines are expected; one more (OCR may split a line
+    the overlap cut through) or fewer are tried after that. Nothing is dropped where
+    the overlap held no text.
+    """
+    out: List[str] = []
+    for text, shared in zip(texts, shared_lines):
+        lines = text.splitlines()
+        nonblank = [i for i, line in enumerate(lines) if line.strip()]
+        kept = [line for line in out if line.strip()]
+        drop = 0
+        candidates = [shared, shared + 1] + list(range(shared - 1, 0, -1)) if shared else []
+        for k in candidates:
+            if k > min(len(nonblank), len(kept)):
+                continue
+            if all(_same_line(kept[-k + j], lines[nonblank[j]]) for j in range(k)):
+                drop = nonblank[k - 1] + 1
+                break
+        out.extend(lines[drop:])
+    return "\n".join(out).strip()
+
+
+class EasyOCREngine:
+    name = "easyocr"
+
+    def __init__(self):
+        import easyocr
+        self.reader = easyocr.Reader(['en'], gpu=False)
+
+    def read(self, img: Image.Image) -> str:
+        # easyocr works on numpy arrays
+        import numpy as np
+        res = self.reader.readtext(np.array(img), detail=0)
+        return "\n".join(res).strip()
+
+
+class TesseractEngine:
+    name = "tesseract"
+
+    def __init__(self):
+        import pytesseract
+        # fail at load time (not per image) when the tesseract binary is missing
+        pytesseract.get_tesseract_version()
+        self._pytesseract = pytesseract
+
+    def read(self, img: Image.Image) -> str:
+        return self._pytesseract.image_to_string(img).strip()
+
+
+ENGINES = {"easyocr": EasyOCREngine, "tesseract": TesseractEngine}
+
+
+def load_engines(backend: str = "auto") -> List[object]:
+    """Load OCR engines in preference order.
+
+    ``auto`` tries EasyOCR then Tesseract; ``easyocr`` or ``tesseract`` load only that
+    backend. Backends that cannot be loaded are skipped.
+    """
+    names = list(ENGINES) if backend == "auto" else [backend]
+    engines = []
+    for name in names:
+        try:
+            engines.append(ENGINES[name]())
+        except Exception:
+            continue
+    return engines
+
+
+def warmup_image() -> bytes:
+    """A small PNG with a line of code on it, used to warm engines after loading."""
+    img = Image.new("L", (240, 40), color=255)
+    ImageDraw.Draw(img).text((8, 12), "def add(a, b): return a + b", fill=0)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+_default_engines: Optional[List[object]] = None
+_default_engines_lock = threading.Lock()
+
+
+def default_engines() -> List[object]:
+    """Engines used by in-process OCR, loaded once on first use."""
+    global _default_engines
+    with _default_engines_lock:
+        if _default_engines is None:
+            _default_engines = load_engines()
+        return _default_engines
+
+
+def image_to_text(file_bytes: bytes, engines: Optional[List[object]] = None,
+                  timings: Optional[Dict[str, Any]] = None, preprocess: str = "fast",
+                  max_pixels: int = MAX_PIXELS) -> str:
+    """OCR an image with the first engine that finds text.
+
+    ``preprocess`` is ``"fast"``, ``"full"`` or ``"none"`` (see the module docstring).
+    Images that cannot be decoded or have more than ``max_pixels`` pixels give ``""``.
+
+    When ``timings`` is given it is filled with per-stage seconds (``decode``,
+    ``preprocess`` and one entry per engine tried) and ``backend``, the engine that
+    answered (``"none"`` if none did).
+    """
+    # Try EasyOCR if available, then fall back to pytesseract. If no OCR available
+    # user can still supply `text` form field.
+    if timings is None:
+        timings = {}
+    timings["backend"] = "none"
+    started = time.perf_counter()
+    try:
+        if preprocess == "fast":
+            pil_image = decode_image(file_bytes, max_pixels=max_pixels)
+        else:
+            pil_image = open_image(file_bytes, max_pixels)
+            pil_image.load()
+    except Exception:
+        return ""
+    timings["decode"] = time.perf_counter() - started
+
+    # preprocessing
+    if preprocess != "none":
+        started = time.perf_counter()
+        pil_image = preprocess_fast(pil_image) if preprocess == "fast" else preprocess_image(pil_image)
+        timings["preprocess"] = time.perf_counter() - started
+
+    for engine in default_engines() if engines is None else engines:
+        started = time.perf_counter()
+        try:
+            text = engine.read(pil_image)
+        except Exception:
+            # fall through to the next engine for this image only
+            continue
+        finally:
+            timings[engine.name] = time.perf_counter() - started
+        if text:
+            timings["backend"] = engine.name
+            return text
+    return ""
@@ -0,0 +1,281 @@
+"""Pool of warm, recyclable OCR worker processes.
+
+Each worker loads its OCR engines (EasyOCR and/or Tesseract) once at startup and runs
+a warm-up image through them before it takes requests, so no user pays the model load.
+Workers are recycled after ``max_jobs`` images or when their RSS grows past
+``max_rss_mb``. A worker that crashes, hangs past ``job_timeout`` or reports an error is
+replaced on its own; the rest of the pool keeps serving. Replacements start in the
+background, and requests wait for the next idle worker meanwhile, for at most
+``acquire_timeout`` seconds. A request that gets no worker in time, or whose job hangs,
+raises ``OCRUnavailable``: the server is overloaded, not the image unreadable.
+
+``run_tiled`` spreads one tall image over several workers: it preprocesses the image
+here, splits it into overlapping bands (``ocr.split_bands``), reads the bands in
+parallel and stitches their texts back together.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from backend.app import metrics, ocr
+
+
+class OCRUnavailable(RuntimeError):
+    """No worker read the image in time (none went idle, or the job hung)."""
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MiB (0.0 when unknown)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # peak rather than current RSS, but good enough as a recycle signal
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def _worker_main(conn, backend: str, preprocess: str = "fast", max_pixels: int = ocr.MAX_PIXELS) -> None:
+    """Worker process loop: load + warm engines, then OCR images sent over ``conn``."""
+    started = time.perf_counter()
+    engines = ocr.load_engines(backend)
+    ocr.image_to_text(ocr.warmup_image(), engines, preprocess=preprocess)
+    conn.send(("ready", {
+        "backends": [e.name for e in engines],
+        "load_seconds": round(time.perf_counter() - started, 3),
+        "rss_mb": round(_rss_mb(), 1),
+    }))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        try:
+            timings = {}
+            file_bytes, mode = job
+            text = ocr.image_to_text(file_bytes, engines, timings, mode or preprocess, max_pixels)
+            conn.send(("ok", (text, timings), _rss_mb()))
+        except Exception as exc:
+            conn.send(("error", repr(exc), _rss_mb()))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, backend: str, preprocess: str, max_pixels: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, backend, preprocess, max_pixels),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.started_at = time.time()
+        self.state = "starting"
+        self.backends: List[str] = []
+        self.load_seconds: Optional[float] = None
+        self.jobs = 0
+        self.failures = 0
+        self.rss_mb = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": self.process.pid,
+            "state": self.state,
+            "backends": self.backends,
+            "load_seconds": self.load_seconds,
+            "jobs": self.jobs,
+            "failures": self.failures,
+            "rss_mb": round(self.rss_mb, 1),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+    def stop(self, timeout: float = 2.0) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+class OCRWorkerPool:
+    def __init__(self, size: int = 2, backend: str = "auto", max_jobs: int = 500,
+                 max_rss_mb: float = 2048, job_timeout: float = 60.0, start_timeout: float = 300.0,
+                 preprocess: str = "fast", max_pixels: int = ocr.MAX_PIXELS, acquire_timeout: float = 30.0):
+        self.size = max(1, size)
+        self.backend = backend
+        self.preprocess = preprocess
+        self.max_pixels = max_pixels
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.job_timeout = job_timeout
+        self.start_timeout = start_timeout
+        self.acquire_timeout = acquire_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._closed = False
+        self.recycled = metrics.counter("ocr_worker_recycled_total", "OCR workers retired after max jobs / RSS")
+        self.replaced = metrics.counter("ocr_worker_replaced_total", "OCR workers replaced after a failure")
+        self.acquire_timeouts = metrics.counter("ocr_acquire_timeout_total",
+                                                "OCR requests that found no idle worker in time")
+
+    def start(self) -> None:
+        """Spawn the workers; each joins the idle queue once loaded and warmed."""
+        with self._lock:
+            missing = self.size - len(self._workers)
+        for _ in range(missing):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        worker = _Worker(self._ctx, self.backend, self.preprocess, self.max_pixels)
+        with self._lock:
+            if self._closed:
+                worker.stop()
+                return
+            self._workers.append(worker)
+        threading.Thread(target=self._await_ready, args=(worker,), daemon=True).start()
+
+    def _await_ready(self, worker: _Worker) -> None:
+        try:
+            if not worker.conn.poll(self.start_timeout):
+                raise TimeoutError("OCR worker did not become ready")
+            kind, info = worker.conn.recv()
+        except Exception:
+            self._retire(worker, failed=True)
+            return
+        worker.backends = info["backends"]
+        worker.load_seconds = info["load_seconds"]
+        worker.rss_mb = info["rss_mb"]
+        worker.state = "idle"
+        self._idle.put(worker)
+
+    def _retire(self, worker: _Worker, failed: bool) -> None:
+        """Stop ``worker`` and start a replacement in the background."""
+        worker.state = "stopping"
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            closed = self._closed
+        (self.replaced if failed else self.recycled).inc()
+
+        def replace():
+            worker.stop()
+            if failed:
+                # back off a little so a worker that cannot start does not spin
+                time.sleep(1.0)
+            if not self._closed:
+                self._spawn()
+
+        if closed:
+            threading.Thread(target=worker.stop, daemon=True).start()
+        else:
+            threading.Thread(target=replace, daemon=True).start()
+
+    def run(self, file_bytes: bytes, retries: int = 1, timings: Optional[Dict[str, Any]] = None,
+            preprocess: Optional[str] = None) -> str:
+        """OCR one image on the next idle worker (blocking; call from a thread).
+
+        ``timings`` is filled with the worker's stage timings, as for
+        ``ocr.image_to_text``. ``preprocess`` overrides the pool's mode for this image.
+        Raises ``OCRUnavailable`` when no worker is free in time or the job hangs.
+        """
+        if self._closed:
+            raise RuntimeError("OCR worker pool is shut down")
+        if not self._workers:
+            self.start()
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            # every worker busy, starting or failing to start
+            self.acquire_timeouts.inc()
+            raise OCRUnavailable(f"no idle OCR worker within {self.acquire_timeout:g}s") from None
+        worker.state = "busy"
+        try:
+            worker.conn.send((file_bytes, preprocess))
+            if not worker.conn.poll(self.job_timeout):
+                raise TimeoutError("OCR job timed out")
+            kind, payload, rss_mb = worker.conn.recv()
+        except TimeoutError:
+            # hung: replace just this worker
+            worker.failures += 1
+            self._retire(worker, failed=True)
+            raise OCRUnavailable(f"OCR job timed out after {self.job_timeout:g}s") from None
+        except Exception:
+            # the worker died under us: replace it and retry on another worker
+            worker.failures += 1
+            self._retire(worker, failed=True)
+            return self.run(file_bytes, retries - 1, timings, preprocess) if retries > 0 else ""
+
+        worker.jobs += 1
+        worker.rss_mb = rss_mb
+        if kind != "ok":
+            worker.failures += 1
+            self._retire(worker, failed=True)
+            return ""
+        if worker.jobs >= self.max_jobs or (self.max_rss_mb and rss_mb > self.max_rss_mb):
+            self._retire(worker, failed=False)
+        else:
+            worker.state = "idle"
+            self._idle.put(worker)
+        text, worker_timings = payload
+        if timings is not None:
+            timings.update(worker_timings)
+        return text
+
+    def run_tiled(self, file_bytes: bytes, band_height: int = 1024, overlap: int = 64,
+                  timings: Optional[Dict[str, Any]] = None) -> str:
+        """OCR an image as bands read in parallel on up to ``size`` workers.
+
+        ``timings`` gets this process's ``decode`` (decode + preprocess) and ``split`` seconds, the
+        engine seconds summed over the bands and the first backend that answered.
+        """
+        if timings is None:
+            timings = {}
+        started = time.perf_counter()
+        try:
+            img = ocr.prepare_image(file_bytes, self.preprocess, self.max_pixels)
+        except Exception:
+            timings["backend"] = "none"
+            return ""
+        timings["decode"] = time.perf_counter() - started
+        started = time.perf_counter()
+        bands = ocr.split_bands(img, band_height, overlap)
+        timings["split"] = time.perf_counter() - started
+        payloads = [ocr.encode_band(img.crop((0, top, img.width, bottom))) for top, bottom, _ in bands]
+        per_band: List[Dict[str, Any]] = [{} for _ in bands]
+        with ThreadPoolExecutor(min(len(bands), self.size)) as executor:
+            texts = list(executor.map(lambda i: self.run(payloads[i], timings=per_band[i], preprocess="none"),
+                                      range(len(bands))))
+        timings["backend"] = next((t["backend"] for t in per_band if t.get("backend", "none") != "none"), "none")
+        for band in per_band:
+            for stage, seconds in band.items():
+                if stage not in ("backend", "decode"):
+                    timings[stage] = timings.get(stage, 0.0) + seconds
+        return ocr.stitch(texts, [shared for _, _, shared in bands])
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            workers = list(self._workers)
+        return [w.stats() for w in workers]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
@@ -2,9 +2,24 @@
 
 This module provides lightweight, human-readable syntax rules derived from `syntax.md`.
 It scores candidate languages by counting weighted regex matches.
+
+Patterns with an unbounded ``.*`` / ``.+`` or negated-class repeat (``[^;]+``) backtrack
+quadratically on one long line (a minified bundle, say). Negated classes in the rules
+exclude ``\n`` so that, like ``.``, they never run past the end of a line. On inputs with a line longer than ``RULE_MAX_LINE`` characters,
+those patterns run over bounded, overlapping chunks of the long lines instead of the
+whole text, and stop after ``RULE_MAX_SCAN`` characters of chunks. ``RuleSet.profile`` reports the time and matches of every rule over a corpus.
 """
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+import os
 import re
+import time
+
+import numpy as np
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
 
 
 RULES: Dict[str, List[Tuple[str, float]]] = {
@@ -97,7 +112,7 @@ RULES: Dict[str, List[Tuple[str, float]]] = {
     "CSS": [
         (r"[.#][\w-]+\s*\{", 1.0),
         # reduce property matching weight to avoid false positives with TS/JS type annotations
-        (r"[a-z-]{3,}\s*:\s*[^;]+;", 0.35),
+        (r"[a-z-]{3,}\s*:\s*[^;\n]+;", 0.35),
         (r"@media\b|@import\b", 0.6),
     ],
     "JSON": [
@@ -112,7 +127,7 @@ RULES: Dict[str, List[Tuple[str, float]]] = {
         (r"^\s*\[\w+\]|^\w+\s*=\s*\"", 1.0),
     ],
     "XML": [
-        (r"^\s*<\?xml\b|<\w+:?\w+\b[^>]*>", 1.0),
+        (r"^\s*<\?xml\b|<\w+:?\w+\b[^>\n]*>", 1.0),
     ],
     "JSX": [
         (r"<\w+\s+.*>.*<\/\w+>|return\s*\(|export\s+default\s+function", 0.9),
@@ -121,13 +136,13 @@ RULES: Dict[str, List[Tuple[str, float]]] = {
         (r"<\w+\s+.*:|<\w+\s+.*>.*<\/\w+>|:\s*React\.FC", 0.9),
     ],
     "SASS": [
-        (r"\$\w+\s*:\s*[^;]+;|@mixin\b|@include\b", 1.0),
+        (r"\$\w+\s*:\s*[^;\n]+;|@mixin\b|@include\b", 1.0),
     ],
     "SCSS": [
         (r"\.\w+\s*\{|\$\w+\s*:\s|@extend\b", 0.95),
     ],
     "LESS": [
-        (r"@[\w-]+\s*:\s*[^;]+;|\.mixin\b", 0.9),
+        (r"@[\w-]+\s*:\s*[^;\n]+;|\.mixin\b", 0.9),
     ],
     "CoffeeScript": [
         (r"->|\->|class\s+\w+|\bconsole\.log\b", 0.9),
@@ -159,7 +174,7 @@ RULES: Dict[str, List[Tuple[str, float]]] = {
     "Tcl": [(r"^proc\s+\w+|set\s+\w+\s+|puts\s+\"|\$\w+", 0.8)],
     # AWK: prefer explicit AWK features (numeric fields, BEGIN block) and explicit 'awk' mention
     "AWK": [(r"\$\d+\b|\bBEGIN\s*\{|\bFS=|\bawk\b", 1.0)],
-    "SED": [(r"s\/[^\/]+\/[^\/]+\/g|\/pattern\/[pg]*|^#\!\/bin\/(bash|sh)", 0.85)],
+    "SED": [(r"s\/[^\/\n]+\/[^\/\n]+\/g|\/pattern\/[pg]*|^#\!\/bin\/(bash|sh)", 0.85)],
     "Rexx": [(r"parse\s+arg|say\s+|call\s+\w+|pull\b", 0.7)],
     "PostScript": [(r"%\!|def\s+\w+|showpage|moveto|lineto|stroke", 0.8)],
     "GLSL": [(r"void\s+main\s*\(|uniform\s+\w+|vec[234]\b|gl_FragColor", 0.9)],
@@ -179,6 +194,305 @@ RULES: Dict[str, List[Tuple[str, float]]] = {
 }
 
 
+# Non-ASCII characters that IGNORECASE matching treats as an ASCII letter (the dotted and
+# dotless i, the long s and the Kelvin sign). They are mapped before lowercasing so that
+# a literal found by a regex is always found in the folded text as well.
+_FOLD_TABLE = {0x130: "i", 0x131: "i", 0x17F: "s", 0x212A: "k"}
+
+# Upper bound on alternatives kept while expanding a pattern's literal requirements.
+_MAX_ALTERNATIVES = 32
+
+# Longest line the backtracking-prone rules see whole (0 turns the guard off), and how
+# many characters of chunks they scan at most once an input has longer lines
+RULE_MAX_LINE = int(os.environ.get("RULE_MAX_LINE", "1000"))
+RULE_MAX_SCAN = int(os.environ.get("RULE_MAX_SCAN", "65536"))
+
+_REPEATS = tuple(
+    op for op in (getattr(sre_parse, name, None) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"))
+    if op is not None
+)
+
+
+def _fold(text: str) -> str:
+    if not text.isascii():
+        text = text.translate(_FOLD_TABLE)
+    return text.lower()
+
+
+def _and(left: List[FrozenSet[str]], right: List[FrozenSet[str]]) -> List[FrozenSet[str]]:
+    return [a | b for a in left for b in right]
+
+
+def _sequence_literals(items) -> List[FrozenSet[str]]:
+    """Literal requirements of a parsed regex sequence, in disjunctive normal form.
+
+    Each frozenset holds literals that must all occur; at least one of the sets has to
+    be satisfied for the sequence to match. ``[frozenset()]`` means "no requirement".
+    Constructs that cannot be reasoned about simply add no requirement, which keeps
+    the result a necessary (never too strict) condition.
+    """
+    dnf: List[FrozenSet[str]] = [frozenset()]
+    run: List[str] = []
+
+    def flush():
+        nonlocal dnf
+        if run:
+            dnf = _and(dnf, [frozenset(["".join(run).lower()])])
+            run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is sre_parse.AT:
+            # zero-width anchors do not split a literal run
+            continue
+        flush()
+        sub: Optional[List[FrozenSet[str]]] = None
+        if op is sre_parse.SUBPATTERN:
+            sub = _sequence_literals(av[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [_sequence_literals(b) for b in av[1]]
+            if all(frozenset() not in b for b in branches):
+                sub = [conj for b in branches for conj in b]
+        elif op in _REPEATS and av[0] >= 1:
+            sub = _sequence_literals(av[2])
+        if sub and frozenset() not in sub:
+            combined = _and(dnf, sub)
+            if len(combined) <= _MAX_ALTERNATIVES:
+                dnf = combined
+    flush()
+    return dnf
+
+
+def _matches_almost_anything(op, av) -> bool:
+    """True for ``.`` and negated classes such as ``[^;]``: they run on over ordinary text."""
+    if op is sre_parse.ANY or op is sre_parse.NOT_LITERAL:
+        return True
+    return op is sre_parse.IN and bool(av) and av[0][0] is sre_parse.NEGATE
+
+
+def _unbounded_any(items) -> bool:
+    """True if a parsed regex has an unbounded repeat of ANY or a negated class (``.*``, ``[^;]+``)."""
+    for op, av in items:
+        if op in _REPEATS:
+            if av[1] == sre_parse.MAXREPEAT and any(_matches_almost_anything(*sub) for sub in av[2]):
+                return True
+            if _unbounded_any(av[2]):
+                return True
+        elif op is sre_parse.SUBPATTERN and _unbounded_any(av[-1]):
+            return True
+        elif op is sre_parse.BRANCH and any(_unbounded_any(b) for b in av[1]):
+            return True
+    return False
+
+
+def _segments(text: str, limit: int, budget: int) -> Optional[List[str]]:
+    """``text`` with lines over ``limit`` chars cut into overlapping chunks, or None if none are.
+
+    Runs of short lines are kept together, so multi-line matches among them still work.
+    Chunks overlap by half, so a match up to ``limit // 2`` chars long is never split.
+    Segments stop once ``budget`` characters have been collected.
+    """
+    lines = text.split("\n")
+    if max(map(len, lines)) <= limit:
+        return None
+    step = max(1, limit // 2)
+    segments: List[str] = []
+    run: List[str] = []
+    size = 0
+    for line in lines:
+        if size >= budget:
+            break
+        if len(line) <= limit:
+            run.append(line)
+            size += len(line) + 1
+            continue
+        if run:
+            segments.append("\n".join(run))
+            run = []
+        for i in range(0, max(1, len(line) - step), step):
+            if size >= budget:
+                break
+            segments.append(line[i:i + limit])
+            size += limit
+    if run:
+        segments.append("\n".join(run))
+    return segments
+
+
+def literal_requirements(pattern: str, flags: int = 0) -> Optional[Tuple[Tuple[str, ...], ...]]:
+    """Lowercased literals a text must contain for ``pattern`` to possibly match.
+
+    Returns alternatives of literal groups (any group whose literals all appear in the
+    folded text lets the regex run), or None when the pattern has no usable literal.
+    """
+    dnf = _sequence_literals(sre_parse.parse(pattern, flags))
+    if frozenset() in dnf:
+        return None
+    # longest literals first: they are the most selective and fail fastest
+    return tuple(tuple(sorted(conj, key=len, reverse=True)) for conj in dnf)
+
+
+class RuleSet:
+    """Compiled, index-aligned form of a rule table.
+
+    All patterns are compiled once when the set is built, and every language gets a
+    fixed position in ``languages`` so scores can be returned as a dense vector that
+    lines up across calls (and across rows when scoring batches). ``max_line`` bounds
+    the line length seen by backtracking-prone rules (None or 0: no bound), and
+    ``max_scan`` how much of an input with long lines they look at.
+    """
+
+    def __init__(self, rules: Dict[str, List[Tuple[str, float]]] = RULES,
+                 flags: int = re.IGNORECASE | re.MULTILINE, prefilter: bool = True,
+                 max_line: Optional[int] = RULE_MAX_LINE, max_scan: int = RULE_MAX_SCAN):
+        self.languages: Tuple[str, ...] = tuple(rules)
+        self.index: Dict[str, int] = {lang: i for i, lang in enumerate(self.languages)}
+        self.prefilter = prefilter
+        self.max_line = max_line or None
+        self.max_scan = max_scan
+        # (language index, bound search method, weight, literal requirements, guarded)
+        # in table order; guarded rules contain .* / .+ / [^...]+ and only see bounded lines
+        self._rules: List[Tuple[int, Callable, float, Optional[Tuple[Tuple[str, ...], ...]], bool]] = []
+        self._patterns: List[str] = []
+        for i, lang in enumerate(self.languages):
+            for pat, weight in rules[lang]:
+                try:
+                    compiled = re.compile(pat, flags)
+                except re.error:
+                    # in case of a bad pattern, skip it
+                    continue
+                requires = literal_requirements(pat, flags) if prefilter else None
+                guarded = self.max_line is not None and _unbounded_any(sre_parse.parse(pat, flags))
+                self._rules.append((i, compiled.search, weight, requires, guarded))
+                self._patterns.append(pat)
+
+    def __len__(self) -> int:
+        return len(self.languages)
+
+    def raw_scores(self, text: str, stats: Optional[List[List[float]]] = None) -> List[float]:
+        """Sum of matched weights per language, aligned to ``languages``.
+
+        ``stats`` (used by ``profile``) gets [runs, skipped, matches, seconds] added per rule.
+        """
+        totals = [0.0] * len(self.languages)
+        if not text:
+            return totals
+
+        # Literal prefilter: a rule only runs its regex when one of its literal groups
+        # is present. Substring checks are memoized per call, so each literal is
+        # scanned for at most once however many rules share it.
+        folded = _fold(text) if self.prefilter else text
+        seen: Dict[str, bool] = {}
+
+        def has(lit: str) -> bool:
+            found = seen.get(lit)
+            if found is None:
+                found = seen[lit] = lit in folded
+            return found
+
+        segments: Any = False  # computed on the first guarded rule that runs
+        for n, (i, search, weight, requires, guarded) in enumerate(self._rules):
+            if requires is not None and not any(all(has(lit) for lit in group) for group in requires):
+                if stats is not None:
+                    stats[n][1] += 1
+                continue
+            if guarded and segments is False:
+                segments = _segments(text, self.max_line, self.max_scan)
+            started = time.perf_counter() if stats is not None else 0.0
+            if guarded and segments is not None:
+                matched = any(search(segment) for segment in segments)
+            else:
+                matched = search(text) is not None
+            if stats is not None:
+                stats[n][0] += 1
+                stats[n][2] += matched
+                stats[n][3] += time.perf_counter() - started
+            if matched:
+                totals[i] += weight
+        return totals
+
+    def profile(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Per-rule cost over ``texts``, most expensive first.
+
+        Each entry has the language, pattern, whether it is guarded, how often its regex
+        ran or was skipped by the prefilter, how many texts it matched and total seconds.
+        """
+        stats = [[0, 0, 0, 0.0] for _ in self._rules]
+        for text in texts:
+            self.raw_scores(text, stats)
+        report = [
+            {
+                "language": self.languages[rule[0]],
+                "pattern": pattern,
+                "guarded": rule[4],
+                "runs": runs,
+                "skipped": skipped,
+                "matches": matches,
+                "seconds": seconds,
+            }
+            for rule, pattern, (runs, skipped, matches, seconds) in zip(self._rules, self._patterns, stats)
+        ]
+        return sorted(report, key=lambda r: r["seconds"], reverse=True)
+
+    def _normalized(self, totals: List[float]) -> List[Tuple[int, float]]:
+        # normalize by maximum seen; languages without any match are left out
+        max_score = max(totals) if totals else 0.0
+        if max_score <= 0:
+            return []
+
+        # normalize to 0..1 and apply mild boost to very strong signals so they stand out
+        out = []
+        for i, score in enumerate(totals):
+            if score > 0:
+                norm = score / max_score
+                if norm >= 0.95:
+                    norm = min(1.0, norm + 0.05)
+                out.append((i, round(norm, 4)))
+        return out
+
+    @staticmethod
+    def lead(totals: List[float]) -> Tuple[int, float]:
+        """Index of the top language in ``raw_scores`` output and its lead over the runner-up."""
+        if not totals:
+            return 0, 0.0
+        top = max(range(len(totals)), key=totals.__getitem__)
+        runner_up = max((t for i, t in enumerate(totals) if i != top), default=0.0)
+        return top, totals[top] - runner_up
+
+    def score_vector(self, text: str) -> np.ndarray:
+        """Normalized scores (0..1) as a dense vector aligned to ``languages``."""
+        vec = np.zeros(len(self.languages), dtype=np.float64)
+        for i, norm in self._normalized(self.raw_scores(text)):
+            vec[i] = norm
+        return vec
+
+    def score_matrix(self, texts: List[str]) -> np.ndarray:
+        """Stacked ``score_vector`` rows, shape (len(texts), len(languages))."""
+        return self.normalize_rows([self.raw_scores(text) for text in texts])
+
+    def normalize_rows(self, rows: List[List[float]]) -> np.ndarray:
+        """``score_matrix`` for ``raw_scores`` rows that were already computed."""
+        mat = np.zeros((len(rows), len(self.languages)), dtype=np.float64)
+        for row, totals in enumerate(rows):
+            for i, norm in self._normalized(totals):
+                mat[row, i] = norm
+        return mat
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Normalized scores as a mapping of matched language -> score."""
+        return self.normalize(self.raw_scores(text))
+
+    def normalize(self, totals: List[float]) -> Dict[str, float]:
+        """``scores`` for ``raw_scores`` output that was already computed."""
+        return {self.languages[i]: norm for i, norm in self._normalized(totals)}
+
+
+# Compiled once at import; shared by the model and the API.
+DEFAULT_RULESET = RuleSet(RULES)
+
+
 def detect_by_syntax(text: str) -> Dict[str, float]:
     """Score languages using the RULES regexes.
 
@@ -186,38 +500,4 @@ def detect_by_syntax(text: str) -> Dict[str, float]:
     maximum matched weight so the top language tends to have a value close to 1.0
     when strong patterns exist.
     """
-    if not text:
-        return {}
-
-    scores: Dict[str, float] = {}
-    up_text = text
-
-    for lang, patterns in RULES.items():
-        total = 0.0
-        for pat, weight in patterns:
-            try:
-                if re.search(pat, up_text, flags=re.IGNORECASE | re.MULTILINE):
-                    total += weight
-            except re.error:
-                # in case of a bad pattern, skip it
-                continue
-
-        if total > 0:
-            scores[lang] = total
-
-    if not scores:
-        return {}
-
-    # normalize by maximum seen
-    max_score = max(scores.values())
-    if max_score <= 0:
-        return {lang: 0.0 for lang in scores}
-
-    # normalize to 0..1 and apply mild boost to very strong signals so they stand out
-    normalized = {}
-    for lang, score in scores.items():
-        norm = score / max_score
-        if norm >= 0.95:
-            norm = min(1.0, norm + 0.05)
-        normalized[lang] = round(norm, 4)
-    return normalized
+    return DEFAULT_RULESET.scores(text)
@@ -0,0 +1,100 @@
+"""Streaming readers for labeled code corpora.
+
+Supported layouts, all read lazily so a corpus never has to fit in memory:
+
+- a JSONL file (optionally gzipped), one ``{"text": ..., "language": ...}`` per line
+  (``label`` is accepted instead of ``language``)
+- a directory of JSONL shards (``*.jsonl`` / ``*.jsonl.gz``), read in sorted order
+- a directory of per-language folders, ``<root>/<Language>/...``, one snippet per file
+
+Malformed lines and records without text or label are skipped.
+"""
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+import gzip
+import json
+import random
+
+T = TypeVar("T")
+
+_SHARD_SUFFIXES = (".jsonl", ".jsonl.gz")
+
+
+def _open_text(path: Path):
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _iter_jsonl(path: Path) -> Iterator[Tuple[str, str]]:
+    with _open_text(path) as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(item, dict):
+                continue
+            text = item.get("text")
+            label = item.get("language", item.get("label"))
+            if isinstance(text, str) and text.strip() and isinstance(label, str) and label:
+                yield text, label
+
+
+def iter_labeled(path) -> Iterator[Tuple[str, str]]:
+    """(text, language) pairs from a JSONL file or a dataset directory, in a stable order."""
+    root = Path(path)
+    if root.is_file():
+        yield from _iter_jsonl(root)
+        return
+    if not root.is_dir():
+        raise FileNotFoundError(f"dataset not found: {root}")
+    for file in sorted(p for p in root.rglob("*") if p.is_file()):
+        if file.name.endswith(_SHARD_SUFFIXES):
+            yield from _iter_jsonl(file)
+            continue
+        parts = file.relative_to(root).parts
+        if len(parts) < 2 or parts[0].startswith("."):
+            continue  # loose files next to the language folders are not samples
+        text = file.read_text(encoding="utf-8", errors="replace")
+        if text.strip():
+            yield text, parts[0]
+
+
+def shuffled(items: Iterable[T], buffer_size: int, seed: Optional[int] = None) -> Iterator[T]:
+    """Approximate shuffle with a bounded buffer (sorted shards would bias SGD)."""
+    if buffer_size <= 1:
+        yield from items
+        return
+    rng = random.Random(seed)
+    buffer: List[T] = []
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        i = rng.randrange(buffer_size)
+        yield buffer[i]
+        buffer[i] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def batched(pairs: Iterable[Tuple[str, str]], size: int) -> Iterator[Tuple[List[str], List[str]]]:
+    """Group (text, label) pairs into (texts, labels) lists of at most ``size``."""
+    texts: List[str] = []
+    labels: List[str] = []
+    for text, label in pairs:
+        texts.append(text)
+        labels.append(label)
+        if len(texts) >= size:
+            yield texts, labels
+            texts, labels = [], []
+    if texts:
+        yield texts, labels
+
+
+def scan_labels(path) -> Sequence[str]:
+    """Sorted distinct labels of a dataset (one streaming pass)."""
+    return sorted({label for _, label in iter_labeled(path)})
@@ -0,0 +1,32 @@
+"""gunicorn settings for preload-then-fork serving.
+
+Run from the project root:
+
+    WEB_CONCURRENCY=4 gunicorn -c backend/gunicorn.conf.py backend.app.main:app
+
+``uvicorn --workers N`` spawns N fresh interpreters and each one loads its own copy of
+the model. Here the app and the model are loaded once in the gunicorn master, and the
+workers (including ones gunicorn restarts later) are forked from it, so they share the
+model's memory pages copy-on-write. ``gc.freeze()`` keeps the collector from writing to
+those objects, which would copy their pages into every worker. With the memory-mapped
+model layout (``backend/app/mmap_store.py``) the weights are shared through the page
+cache as well, by any process that maps the same files. The SQLite result cache
+(``CACHE_PATH``) is created in the master too, but each worker opens its own connection
+on first use; SQLite connections must not cross ``fork()``.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server):
+    # runs in the master before the first fork
+    from backend.app import main
+
+    main.ensure_detector()
+    gc.freeze()
+    server.log.info("model %s loaded before forking workers", main.detector.version)
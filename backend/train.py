@@ -2,6 +2,21 @@
 
 This is intentionally small and lightweight for the MVP — replace with a larger dataset or CodeBERT
 for production.
+
+``--stream PATH`` trains out of core instead: samples are streamed from a JSONL file or a
+dataset directory (see ``backend/dataset.py``), hashed into a fixed-size feature space and
+fed to an incremental ``SGDClassifier`` batch by batch, so memory stays flat however
+large the corpus is. Progress is checkpointed and ``--resume`` continues from the last
+checkpoint. The result is saved where ``load_detector`` finds it.
+
+``--search`` runs a cross-validated grid search over n-gram range, max_features and C on
+all cores. Each fold is tokenized once per n-gram range; every max_features / C setting
+reuses those cached counts, and ``--cache-dir`` keeps them on disk across runs. The
+best setting is then fitted as the calibrated model.
+
+``--hashed`` fits the vocabulary-free hashed model (``backend/app/hashed.py``) and saves
+it as ``lang_detector_hashed.npz`` (``--mmap``: a shared ``lang_detector_hashed.mmap``
+directory); point ``MODEL_PATH`` at it to serve it.
 """
 import sys
 from pathlib import Path
@@ -13,11 +28,17 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+import argparse
 import json
+import time
+
+import numpy as np
 from sklearn.model_selection import cross_val_predict, cross_val_score
 from sklearn.calibration import CalibratedClassifierCV
 
-from backend.app.model import save_detector
+from backend.app.mmap_store import MMAP_SUFFIX
+from backend.app.model import MODEL_PATH, save_detector
+from backend.dataset import batched, iter_labeled, scan_labels, shuffled
 from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
@@ -82,28 +103,334 @@ def build_sample_dataset():
     return X, y
 
 
+HASHED_MODEL_PATH = MODEL_PATH.parent / "lang_detector_hashed.npz"
+CHECKPOINT_PATH = MODEL_PATH.parent / "checkpoints" / "stream.joblib"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def build_streaming_pipeline(n_features=2 ** 20, alpha=1e-6, seed=0):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+
+    return Pipeline([
+        ("hash", HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm="l2")),
+        ("clf", SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)),
+    ])
+
+
+def train_streaming(source, epochs=1, batch_size=10000, n_features=2 ** 20, alpha=1e-6, classes=None,
+                    shuffle_buffer=100000, seed=0, checkpoint_path=CHECKPOINT_PATH, checkpoint_every=50,
+                    resume=False, out=MODEL_PATH, log=print):
+    """Fit a hashed-features SGD model on a streamed corpus; return training stats.
+
+    Each batch is scored before it is learned from, so ``progressive_accuracy`` is an
+    accuracy on data the model had not seen yet. Checkpoints record the pipeline and
+    the position in the stream; the shuffle is seeded per epoch, so resuming replays
+    the same order and skips the batches already learned.
+    """
+    import joblib
+
+    state = None
+    if resume and checkpoint_path.exists():
+        state = joblib.load(checkpoint_path)
+        log(f"resuming from {checkpoint_path}: epoch {state['epoch'] + 1}, batch {state['batch']}")
+    if state is None:
+        if classes is None:
+            classes = scan_labels(source)
+        state = {
+            "pipeline": build_streaming_pipeline(n_features, alpha, seed),
+            "classes": list(classes),
+            "epoch": 0,
+            "batch": 0,
+            "samples": 0,
+            "correct": 0,
+        }
+    pipeline = state["pipeline"]
+    vectorizer, clf = pipeline.named_steps["hash"], pipeline.named_steps["clf"]
+    known = set(state["classes"])
+
+    def save_checkpoint():
+        checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = checkpoint_path.with_suffix(".tmp")
+        joblib.dump(state, tmp)
+        tmp.replace(checkpoint_path)
+
+    started = time.perf_counter()
+    seen = 0
+    while state["epoch"] < epochs:
+        stream = shuffled(iter_labeled(source), shuffle_buffer, seed=seed + state["epoch"])
+        for n, (texts, labels) in enumerate(batched(stream, batch_size)):
+            if n < state["batch"]:
+                continue  # learned before the checkpoint
+            keep = [i for i, label in enumerate(labels) if label in known]
+            texts, labels = [texts[i] for i in keep], [labels[i] for i in keep]
+            if not texts:
+                continue
+            X = vectorizer.transform(texts)
+            if hasattr(clf, "coef_"):
+                state["correct"] += int((clf.predict(X) == labels).sum())
+            clf.partial_fit(X, labels, classes=state["classes"])
+            state["samples"] += len(texts)
+            state["batch"] = n + 1
+            seen += len(texts)
+            if checkpoint_every and state["batch"] % checkpoint_every == 0:
+                save_checkpoint()
+                elapsed = time.perf_counter() - started
+                log(f"epoch {state['epoch'] + 1} batch {state['batch']}: {state['samples']} samples, "
+                    f"{seen / elapsed:.0f} samples/s, peak RSS {peak_rss_mb()} MiB")
+        state["epoch"] += 1
+        state["batch"] = 0
+        if checkpoint_every:
+            save_checkpoint()
+    elapsed = time.perf_counter() - started
+
+    save_detector(pipeline, out)
+    return {
+        "mode": "stream",
+        "samples": state["samples"],
+        "classes": len(state["classes"]),
+        "epochs": epochs,
+        "seconds": round(elapsed, 2),
+        "samples_per_s": round(seen / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "progressive_accuracy": round(state["correct"] / state["samples"], 4) if state["samples"] else None,
+    }
+
+
+def _fold_counts(X, train_idx, val_idx, ngram_range):
+    """Term counts of one fold (fitted on its training part) and the training term totals."""
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vectorizer = CountVectorizer(ngram_range=ngram_range)
+    train_counts = vectorizer.fit_transform([X[i] for i in train_idx])
+    val_counts = vectorizer.transform([X[i] for i in val_idx])
+    return train_counts, val_counts, np.asarray(train_counts.sum(axis=0)).ravel()
+
+
+def _top_features(totals, max_features):
+    """Sorted column indices of the ``max_features`` most frequent terms.
+
+    Picked with the same (unstable) ``argsort`` that ``TfidfVectorizer(max_features=...)``
+    applies to the same totals, so terms tied at the cutoff are kept or dropped exactly
+    as a vectorizer fitted on those texts would.
+    """
+    return np.sort((-totals).argsort()[:max_features])
+
+
+def _score_fold(counts, y_train, y_val, max_features, Cs):
+    """Validation accuracy for each C in ``Cs``, with the vocabulary cut to ``max_features``.
+
+    The vocabulary is the one ``TfidfVectorizer(max_features=...)`` would fit on the
+    fold's training texts (see ``_top_features``), taken from the cached counts so they
+    do not have to be recomputed for every max_features value.
+    """
+    from sklearn.feature_extraction.text import TfidfTransformer
+
+    train_counts, val_counts, totals = counts
+    if max_features is not None and max_features < len(totals):
+        keep = _top_features(totals, max_features)
+        train_counts, val_counts = train_counts[:, keep], val_counts[:, keep]
+    tfidf = TfidfTransformer()
+    X_train = tfidf.fit_transform(train_counts)
+    X_val = tfidf.transform(val_counts)
+    # ascending C with warm starts: each fit starts from the previous, more regularized one
+    clf = LogisticRegression(max_iter=800, warm_start=True)
+    scores = {}
+    for C in sorted(Cs):
+        clf.set_params(C=C).fit(X_train, y_train)
+        scores[C] = float((clf.predict(X_val) == y_val).mean())
+    return [scores[C] for C in Cs]
+
+
+def grid_search(X, y, ngram_ranges=((1, 2), (1, 3)), max_features=(5000, 10000, None), Cs=(0.3, 1.0, 3.0),
+                cv=4, n_jobs=-1, cache_dir=None, seed=0):
+    """Cross-validated accuracy of every (ngram_range, max_features, C); best first.
+
+    Tokenization runs once per (fold, ngram_range), in parallel, and is cached in
+    ``cache_dir`` when given. Scoring runs in parallel per (fold, ngram_range,
+    max_features), trying every C on the same TF-IDF matrices.
+    """
+    from joblib import Memory, Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    y = np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(X, y))
+    fold_counts = Memory(cache_dir, verbose=0).cache(_fold_counts)
+    keys = [(f, ngram) for f in range(len(folds)) for ngram in ngram_ranges]
+    counts = dict(zip(keys, Parallel(n_jobs=n_jobs)(
+        delayed(fold_counts)(X, folds[f][0], folds[f][1], tuple(ngram)) for f, ngram in keys
+    )))
+    tasks = [(f, ngram, mf) for f, ngram in keys for mf in max_features]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_score_fold)(counts[f, ngram], y[folds[f][0]], y[folds[f][1]], mf, Cs) for f, ngram, mf in tasks
+    )
+    per_setting = {}
+    for (f, ngram, mf), fold_scores in zip(tasks, scores):
+        for C, score in zip(Cs, fold_scores):
+            per_setting.setdefault((tuple(ngram), mf, C), []).append(score)
+    results = [
+        {"ngram_range": list(ngram), "max_features": mf, "C": C, "accuracy": round(float(np.mean(s)), 4)}
+        for (ngram, mf, C), s in per_setting.items()
+    ]
+    return sorted(results, key=lambda r: r["accuracy"], reverse=True)
+
+
+def build_pipeline(ngram_range=(1, 3), max_features=10000, C=1.0):
+    return Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=tuple(ngram_range), max_features=max_features)),
+        ("clf", LogisticRegression(C=C, max_iter=800)),
+    ])
+
+
+def load_dataset(path=None):
+    """(texts, labels) from a dataset path (see ``backend/dataset.py``), or the built-in samples."""
+    if path is None:
+        return build_sample_dataset()
+    pairs = list(iter_labeled(path))
+    return [t for t, _ in pairs], [l for _, l in pairs]
+
+
+def main_search(args):
+    X, y = load_dataset(args.data)
+
+    def parse_max_features(v):
+        return None if v == "none" else int(v)
+
+    started = time.perf_counter()
+    results = grid_search(
+        X, y,
+        ngram_ranges=[tuple(int(n) for n in r.split("-")) for r in args.ngram_ranges.split(",")],
+        max_features=[parse_max_features(v) for v in args.max_features.split(",")],
+        Cs=[float(c) for c in args.C.split(",")],
+        cv=args.cv, n_jobs=args.jobs, cache_dir=args.cache_dir, seed=args.seed,
+    )
+    search_seconds = time.perf_counter() - started
+    print(f"{'ngrams':>7} {'max_features':>12} {'C':>6} {'accuracy':>9}")
+    for r in results:
+        print(f"{'-'.join(map(str, r['ngram_range'])):>7} {str(r['max_features']):>12} {r['C']:>6} {r['accuracy']:>9.4f}")
+
+    best = results[0]
+    calib = CalibratedClassifierCV(
+        build_pipeline(best["ngram_range"], best["max_features"], best["C"]), cv=3, method="isotonic", n_jobs=args.jobs
+    )
+    calib.fit(X, y)
+    save_detector(calib)
+    metrics_path = write_metrics({
+        f"accuracy_cv{args.cv}": best["accuracy"],
+        "best": best,
+        "search": results,
+        "search_seconds": round(search_seconds, 2),
+        "total_seconds": round(time.perf_counter() - started, 2),
+    })
+    print(f"Best {best} in {search_seconds:.1f}s; saved model at {MODEL_PATH}")
+    print("Saved training metrics at", metrics_path)
+
+
+def main_hashed(args):
+    from backend.app.hashed import save_hashed, train_hashed
+
+    X, y = load_dataset(args.data)
+    started = time.perf_counter()
+    model = train_hashed(X, y, C=args.hashed_C, config={"n_features": 2 ** (args.hash_bits or 18)})
+    path = HASHED_MODEL_PATH.with_suffix(MMAP_SUFFIX) if args.mmap else HASHED_MODEL_PATH
+    save_hashed(model, path)
+    files = sorted(path.iterdir()) if path.is_dir() else [path]
+    metrics_path = write_metrics({
+        "mode": "hashed",
+        "samples": len(X),
+        "n_features": model.config["n_features"],
+        "seconds": round(time.perf_counter() - started, 2),
+        "size_bytes": sum(f.stat().st_size for f in files),
+    })
+    print(f"Trained hashed model on {len(X)} samples; saved at {path}")
+    print("Saved training metrics at", metrics_path)
+
+
+def write_metrics(metrics):
+    metrics_path = Path(__file__).resolve().parents[1] / "models" / "metrics.json"
+    metrics_path.parent.mkdir(parents=True, exist_ok=True)
+    metrics_path.write_text(json.dumps(metrics, indent=2))
+    return metrics_path
+
+
+def main_stream(args):
+    classes = args.classes.split(",") if args.classes else None
+    stats = train_streaming(
+        args.stream, epochs=args.epochs, batch_size=args.batch_size, n_features=2 ** (args.hash_bits or 20),
+        alpha=args.alpha, classes=classes, shuffle_buffer=args.shuffle_buffer, seed=args.seed,
+        checkpoint_every=args.checkpoint_every, resume=args.resume,
+    )
+    metrics_path = write_metrics(stats)
+    print(f"Trained on {stats['samples']} samples in {stats['seconds']}s "
+          f"({stats['samples_per_s']} samples/s, peak RSS {stats['peak_rss_mb']} MiB)")
+    print("Saved model at", MODEL_PATH)
+    print("Saved training metrics at", metrics_path)
+
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stream", help="train out of core on a JSONL file or dataset directory")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--hash-bits", type=int, help="feature space size is 2**bits (default: 20 for --stream, "
+                                                      "18 for --hashed)")
+    parser.add_argument("--alpha", type=float, default=1e-6, help="SGD regularization strength")
+    parser.add_argument("--classes", help="comma-separated labels (default: scan the dataset once)")
+    parser.add_argument("--shuffle-buffer", type=int, default=100000)
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="batches between checkpoints (0: off)")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--search", action="store_true", help="grid search, then fit the best setting")
+    parser.add_argument("--data", help="dataset for --search / --hashed (default: built-in samples)")
+    parser.add_argument("--ngram-ranges", default="1-2,1-3", help="--search: comma-separated n-gram ranges")
+    parser.add_argument("--max-features", default="5000,10000,none", help="--search: comma-separated sizes")
+    parser.add_argument("--C", default="0.3,1,3", help="--search: comma-separated C values")
+    parser.add_argument("--cv", type=int, default=4, help="--search: folds")
+    parser.add_argument("--cache-dir", help="--search: keep tokenized folds here between runs")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel jobs for folds (-1: all cores)")
+    parser.add_argument("--hashed", action="store_true", help="fit the vocabulary-free hashed model")
+    parser.add_argument("--hashed-C", type=float, default=10.0, help="--hashed: inverse regularization")
+    parser.add_argument("--mmap", action="store_true",
+                        help="--hashed: save as a memory-mapped .mmap directory that workers share")
+    args = parser.parse_args()
+    if args.stream:
+        main_stream(args)
+        return
+    if args.search:
+        main_search(args)
+        return
+    if args.hashed:
+        main_hashed(args)
+        return
+
     X, y = build_sample_dataset()
 
     base_pipeline = Pipeline([
         ("tfidf", TfidfVectorizer(ngram_range=(1, 3), max_features=10000)),
-        ("clf", LogisticRegression(max_iter=800, solver="liblinear", multi_class="ovr")),
+        ("clf", LogisticRegression(max_iter=800)),
     ])
 
     # use a calibrated classifier to improve probability estimates
-    calib = CalibratedClassifierCV(base_pipeline, cv=3, method="isotonic")
+    calib = CalibratedClassifierCV(base_pipeline, cv=3, method="isotonic", n_jobs=args.jobs)
     calib.fit(X, y)
 
     # cross-validated accuracy and per-class scores for baseline
-    acc = float(sum(cross_val_score(base_pipeline, X, y, cv=4, scoring="accuracy")) / 4.0)
+    acc = float(sum(cross_val_score(base_pipeline, X, y, cv=4, scoring="accuracy", n_jobs=args.jobs)) / 4.0)
 
     # Save pipeline and metrics
     save_detector(calib)
 
-    metrics = {"accuracy_cv4": round(acc, 4)}
-    metrics_path = Path(__file__).resolve().parents[1] / "models" / "metrics.json"
-    metrics_path.parent.mkdir(parents=True, exist_ok=True)
-    metrics_path.write_text(json.dumps(metrics, indent=2))
+    metrics_path = write_metrics({"accuracy_cv4": round(acc, 4)})
 
     print("Trained, calibrated and saved model at backend/models/lang_detector.joblib")
     print("Saved training metrics at", metrics_path)
@@ -0,0 +1,47 @@
+"""Throughput of LanguageDetector.predict_batch vs. a predict_text loop.
+
+Run from the project root (uses the model at backend/models/lang_detector.joblib):
+
+    python scripts/bench_batch.py
+"""
+from pathlib import Path
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.model import load_detector
+from backend.evaluate import build_eval_dataset
+
+BATCH_SIZES = [1, 32, 256, 4096]
+
+
+def make_batch(size):
+    X, _ = build_eval_dataset()
+    return [X[i % len(X)] for i in range(size)]
+
+
+def items_per_second(fn, texts, budget=2.0):
+    fn(texts)
+    runs = 0
+    t0 = time.perf_counter()
+    while runs == 0 or time.perf_counter() - t0 < budget:
+        fn(texts)
+        runs += 1
+    return runs * len(texts) / (time.perf_counter() - t0)
+
+
+def main():
+    detector = load_detector()
+    print(f"{'batch':>6} {'predict_text loop':>18} {'predict_batch':>14} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        texts = make_batch(size)
+        loop = items_per_second(lambda b: [detector.predict_text(t) for t in b], texts)
+        batch = items_per_second(detector.predict_batch, texts)
+        print(f"{size:>6} {loop:>14.0f}/s {batch:>10.0f}/s {batch / loop:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
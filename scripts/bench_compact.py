@@ -0,0 +1,79 @@
+"""Latency and memory of the compact NumPy model vs. the sklearn CalibratedClassifierCV.
+
+Run from the project root (uses backend/models/lang_detector.joblib and exports the
+compact model in memory):
+
+    python scripts/bench_compact.py
+"""
+from pathlib import Path
+import io
+import sys
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import joblib
+import numpy as np
+
+from backend.app.compact import export_compact, load_compact, save_compact
+from backend.app.model import MODEL_PATH
+from backend.evaluate import build_eval_dataset
+
+BATCH_SIZES = [1, 32, 256]
+
+
+def make_batch(size):
+    X, _ = build_eval_dataset()
+    return [X[i % len(X)] for i in range(size)]
+
+
+def seconds_per_call(fn, texts, budget=2.0):
+    fn(texts)
+    runs = 0
+    t0 = time.perf_counter()
+    while runs == 0 or time.perf_counter() - t0 < budget:
+        fn(texts)
+        runs += 1
+    return (time.perf_counter() - t0) / runs
+
+
+def load_cost(load):
+    """(seconds, peak traced MiB) to load a model."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    model = load()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    sklearn_model, sk_load, sk_mem = load_cost(lambda: joblib.load(MODEL_PATH))
+    buf = io.BytesIO()
+    joblib.dump(sklearn_model, buf)
+
+    npz_path = Path("/tmp/bench_lang_detector.npz")
+    save_compact(export_compact(sklearn_model), npz_path)
+    compact, c_load, c_mem = load_cost(lambda: load_compact(npz_path))
+
+    print(f"{'':>8} {'file':>9} {'load':>9} {'load peak':>10}")
+    print(f"{'sklearn':>8} {len(buf.getvalue()) / 1024:>7.0f}KB {sk_load * 1000:>7.1f}ms {sk_mem:>8.1f}MB")
+    print(f"{'compact':>8} {npz_path.stat().st_size / 1024:>7.0f}KB {c_load * 1000:>7.1f}ms {c_mem:>8.1f}MB")
+
+    texts = make_batch(max(BATCH_SIZES))
+    assert np.allclose(compact.predict_proba(texts), sklearn_model.predict_proba(texts), rtol=0, atol=1e-12)
+
+    print(f"\n{'batch':>6} {'sklearn':>10} {'compact':>10} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        texts = make_batch(size)
+        sk = seconds_per_call(sklearn_model.predict_proba, texts)
+        fast = seconds_per_call(compact.predict_proba, texts)
+        print(f"{size:>6} {sk * 1000:>8.2f}ms {fast * 1000:>8.2f}ms {sk / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
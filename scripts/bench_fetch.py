@@ -0,0 +1,106 @@
+"""Cold start with MODEL_URL: downloading the model vs. reusing the shared artifact cache.
+
+Serves a model file from a local HTTP server throttled to ``--mbps`` (with
+``--latency-ms`` before the first byte), then times ``load_detector`` in fresh
+interpreters for three cases:
+
+- ``download``: empty cache and no model file, as on every new container before the
+  cache existed
+- ``cache``: no model file, but the artifact is in the shared cache (another worker or
+  container on the host fetched it)
+- ``local``: the model file is already in place with the expected digest
+
+Run from the project root (serves backend/models/lang_detector.joblib by default):
+
+    python scripts/bench_fetch.py [--model path] [--mbps 100] [--latency-ms 50] [--runs 3]
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import hashlib
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.model import MODEL_PATH
+
+COLD_START = """
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from pathlib import Path
+from backend.app.model import load_detector
+load_detector(Path({dest!r}))
+print(time.perf_counter() - t0)
+"""
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        time.sleep(srv.latency)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(srv.payload)))
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+        chunk = 64 * 1024
+        for start in range(0, len(srv.payload), chunk):
+            self.wfile.write(srv.payload[start:start + chunk])
+            time.sleep(chunk / srv.bytes_per_second)
+
+    def log_message(self, *args):
+        pass
+
+
+def cold_start(url: str, digest: str, dest: Path, cache_dir: Path) -> float:
+    env = dict(os.environ, MODEL_URL=url, MODEL_SHA256=digest, MODEL_CACHE_DIR=str(cache_dir))
+    out = subprocess.run([sys.executable, "-c", COLD_START.format(root=str(ROOT), dest=str(dest))],
+                         env=env, check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(MODEL_PATH), help="model file to serve")
+    parser.add_argument("--mbps", type=float, default=100.0, help="download bandwidth in Mbit/s")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="delay before the response")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    model = Path(args.model)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledHandler)
+    server.payload = model.read_bytes()
+    server.latency = args.latency_ms / 1000
+    server.bytes_per_second = args.mbps * 1e6 / 8
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/{model.name}"
+    digest = hashlib.sha256(server.payload).hexdigest()
+
+    timings = {"download": [], "cache": [], "local": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            cache_dir = Path(tmp) / f"cache{run}"
+            dest = Path(tmp) / f"run{run}" / model.name
+            timings["download"].append(cold_start(url, digest, dest, cache_dir))
+            shutil.rmtree(dest.parent)
+            timings["cache"].append(cold_start(url, digest, dest, cache_dir))
+            timings["local"].append(cold_start(url, digest, dest, cache_dir))
+    server.shutdown()
+
+    print(f"{model.name}: {len(server.payload) / 1e6:.1f} MB at {args.mbps:g} Mbit/s, "
+          f"{args.latency_ms:g} ms latency (median of {args.runs})")
+    for case, values in timings.items():
+        print(f"{case:>9}: {statistics.median(values) * 1000:>8.0f} ms to a loaded model")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Size, cold load and accuracy of the hashed model vs. the joblib TF-IDF model.
+
+Each model is loaded through ``load_detector`` in a fresh interpreter, so the load time
+includes the imports it needs (scikit-learn for the joblib file, NumPy / SciPy only for
+the ``.npz``) and the RSS is what a new worker would hold. Accuracy is measured on the
+built-in evaluation snippets, or on ``--data``.
+
+Run from the project root (uses backend/models/lang_detector.joblib; the hashed model is
+trained from the built-in samples into a temporary file unless ``--hashed`` is given):
+
+    python scripts/bench_hashed.py [--hashed path.npz] [--data corpus.jsonl] [--runs 5]
+"""
+from pathlib import Path
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.hashed import save_hashed, train_hashed
+from backend.app.model import MODEL_PATH, load_detector
+from backend.dataset import iter_labeled
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+COLD_LOAD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from backend.app.model import load_detector
+from pathlib import Path
+load_detector(Path({path!r}))
+seconds = time.perf_counter() - t0
+# VmHWM, not ru_maxrss: the latter keeps the parent's peak across fork + exec
+hwm = next(line for line in open("/proc/self/status") if line.startswith("VmHWM:"))
+print(json.dumps({{"seconds": seconds, "rss_mb": int(hwm.split()[1]) / 1024}}))
+"""
+
+
+def cold_load(path, runs):
+    """Best-of-``runs`` (seconds, peak RSS MiB) for import + load in a new process."""
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", COLD_LOAD.format(root=str(ROOT), path=str(path))],
+                             check=True, capture_output=True, text=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(r["seconds"] for r in results), min(r["rss_mb"] for r in results)
+
+
+def accuracy(detector, texts, labels):
+    probs, fused = detector.score_batch(texts)
+    classes = list(detector.pipeline.classes_)
+    raw = sum(classes[row.argmax()] == label for row, label in zip(probs, labels))
+    hits = sum(item["language"] == label for item, label in zip(fused, labels))
+    return raw / len(labels), hits / len(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hashed", help="hashed model to compare (default: train one on the built-in samples)")
+    parser.add_argument("--data", help="labeled corpus for accuracy (default: built-in evaluation snippets)")
+    parser.add_argument("--runs", type=int, default=5, help="cold loads per model; the best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hashed_path = Path(args.hashed) if args.hashed else Path(tmp) / "lang_detector_hashed.npz"
+        if not args.hashed:
+            save_hashed(train_hashed(*build_sample_dataset()), hashed_path)
+        if args.data:
+            texts, labels = map(list, zip(*iter_labeled(args.data)))
+        else:
+            texts, labels = build_eval_dataset()
+
+        print(f"{len(texts)} samples; load includes imports, in a new process (best of {args.runs})")
+        print(f"{'':>8} {'file':>9} {'load':>9} {'RSS':>8} {'raw acc':>8} {'fused acc':>10}")
+        for name, path in (("joblib", MODEL_PATH), ("hashed", hashed_path)):
+            seconds, rss = cold_load(path, args.runs)
+            raw, fused = accuracy(load_detector(path), texts, labels)
+            print(f"{name:>8} {path.stat().st_size / 1024:>7.0f}KB {seconds * 1000:>7.0f}ms {rss:>6.0f}MB "
+                  f"{raw:>8.3f} {fused:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""OCR preprocessing: fast decode + text crop vs. full-resolution preprocessing.
+
+Generates fixtures from the training and evaluation snippets (several snippets of one
+language per image):
+
+- ``screenshot``: 1920x1080 PNG of an editor window (title bar, file sidebar, code in
+  light or dark theme, mostly empty editor area)
+- ``photo``: 4032x3024 JPEG (12 MP phone photo) of a screen showing the code on a desk,
+  with uneven lighting, blur, noise and a slight tilt
+
+and runs each through ``ocr.image_to_text`` with every ``--modes`` entry, reporting per
+kind and mode the median decode, preprocess and OCR seconds, the pixels handed to the
+engine, the character similarity of the OCR text to the rendered code, and how often
+the detector names the right language from the OCR text alone.
+
+Uses the engines of ``OCR_BACKEND`` (``--backend``). Without them (e.g. no tesseract
+binary), ``--tessdata DIR`` runs libtesseract through ``tesserocr`` with the
+``eng.traineddata`` in DIR. Run from the project root:
+
+    python scripts/bench_ocr.py [--count 12] [--modes fast,full] [--tessdata DIR]
+"""
+from difflib import SequenceMatcher
+from pathlib import Path
+import argparse
+import io
+import random
+import statistics
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from backend.app import ocr
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+THEMES = [(250, 30), (30, 220)]  # (background, text): light and dark
+
+
+class TesserocrEngine:
+    """libtesseract through tesserocr, for hosts without the tesseract binary."""
+
+    name = "tesseract"
+
+    def __init__(self, tessdata: str):
+        import tesserocr
+        self.api = tesserocr.PyTessBaseAPI(path=tessdata, lang="eng")
+
+    def read(self, img: Image.Image) -> str:
+        self.api.SetImage(img)
+        return self.api.GetUTF8Text().strip()
+
+
+def font(size: int):
+    try:
+        return ImageFont.truetype(FONT, size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def snippets(rng: random.Random, count: int):
+    """``count`` (code, language) pairs, each joining up to four distinct snippets."""
+    X, y = build_sample_dataset()
+    eval_X, eval_y = build_eval_dataset()
+    by_language = {}
+    for text, label in zip(X + list(eval_X), y + list(eval_y)):
+        by_language.setdefault(label, set()).add(text)
+    languages = sorted(lang for lang, texts in by_language.items() if len(texts) >= 2)
+    out = []
+    for i in range(count):
+        language = languages[i % len(languages)]
+        texts = sorted(by_language[language])
+        out.append(("\n\n".join(rng.sample(texts, min(4, len(texts)))), language))
+    return out
+
+
+def screenshot(code: str, rng: random.Random) -> bytes:
+    background, ink = THEMES[rng.randrange(2)]
+    img = Image.new("L", (1920, 1080), background)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, 1920, 36), fill=60)
+    draw.text((16, 8), "main - editor", font=font(16), fill=230)
+    draw.rectangle((0, 36, 260, 1080), fill=(background + 128) % 256 // 2 + 40)
+    for i, name in enumerate(["src", "  app.py", "  util.js", "tests", "README.md"]):
+        draw.text((16, 56 + 26 * i), name, font=font(15), fill=ink)
+    draw.multiline_text((300, 60), code, font=font(20), fill=ink, spacing=8)
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def photo(code: str, rng: random.Random) -> bytes:
+    import numpy as np
+
+    w, h = 4032, 3024
+    # desk with a lighting gradient, then a screen showing the code
+    yy, xx = np.mgrid[0:h, 0:w]
+    desk = 90 + 60 * xx / w + 30 * yy / h
+    img = Image.fromarray(desk.astype(np.uint8)).convert("RGB")
+    screen = Image.new("RGB", (2600, 1700), (236, 238, 240))
+    ImageDraw.Draw(screen).multiline_text((80, 70), code, font=font(46), fill=(25, 25, 30), spacing=16)
+    screen = screen.rotate(rng.uniform(-1.0, 1.0), expand=True, fillcolor=(20, 20, 20))
+    img.paste(screen, (rng.randrange(200, w - screen.width - 200), rng.randrange(150, h - screen.height - 150)))
+    shade = np.linspace(1.0, 0.75, w)[None, :, None]
+    noise = np.random.default_rng(rng.randrange(1 << 30)).normal(0, 6, (h, w, 1))
+    pixels = np.clip(np.asarray(img, dtype=np.float32) * shade + noise, 0, 255).astype(np.uint8)
+    img = Image.fromarray(pixels).filter(ImageFilter.GaussianBlur(1.2))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def similarity(expected: str, actual: str) -> float:
+    return SequenceMatcher(None, " ".join(expected.split()), " ".join(actual.split()), autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=12, help="images per kind")
+    parser.add_argument("--modes", default=",".join(ocr.PREPROCESS_MODES), help="comma-separated modes")
+    parser.add_argument("--backend", default="auto", help="OCR_BACKEND to load")
+    parser.add_argument("--tessdata", help="directory with eng.traineddata, used through tesserocr")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engines = ocr.load_engines(args.backend)
+    if not engines and args.tessdata:
+        engines = [TesserocrEngine(args.tessdata)]
+    if not engines:
+        sys.exit("no OCR engine available (install tesseract / easyocr or pass --tessdata)")
+
+    from backend.app.model import load_detector
+    detector = load_detector()
+
+    rng = random.Random(args.seed)
+    fixtures = [("screenshot", screenshot(code, rng), code, lang) for code, lang in snippets(rng, args.count)]
+    fixtures += [("photo", photo(code, rng), code, lang) for code, lang in snippets(rng, args.count)]
+    for engine in engines:
+        # warm the engine outside the measurements
+        engine.read(Image.open(io.BytesIO(ocr.warmup_image())))
+
+    print(f"engine: {', '.join(e.name for e in engines)}; {args.count} images per kind, medians")
+    print(f"{'kind':<11} {'mode':<5} {'decode':>8} {'preproc':>8} {'ocr':>8} {'total':>8} "
+          f"{'OCR px':>7} {'chars':>6} {'lang':>5}")
+    for kind in ("screenshot", "photo"):
+        for mode in args.modes.split(","):
+            rows = []
+            for fixture_kind, data, code, language in fixtures:
+                if fixture_kind != kind:
+                    continue
+                timings = {}
+                text = ocr.image_to_text(data, engines, timings, preprocess=mode)
+                if mode == "fast":
+                    prepared = ocr.preprocess_fast(ocr.decode_image(data))
+                else:
+                    prepared = ocr.preprocess_image(Image.open(io.BytesIO(data)))
+                engine_seconds = sum(timings.get(e.name, 0.0) for e in engines)
+                rows.append({
+                    "decode": timings.get("decode", 0.0),
+                    "preprocess": timings.get("preprocess", 0.0),
+                    "ocr": engine_seconds,
+                    "total": timings.get("decode", 0.0) + timings.get("preprocess", 0.0) + engine_seconds,
+                    "pixels": prepared.width * prepared.height,
+                    "chars": similarity(code, text),
+                    "lang": detector.predict_text(text)["language"] == language,
+                })
+
+            def med(key):
+                return statistics.median(r[key] for r in rows)
+
+            print(f"{kind:<11} {mode:<5} {med('decode') * 1000:>6.0f}ms {med('preprocess') * 1000:>6.0f}ms "
+                  f"{med('ocr') * 1000:>6.0f}ms {med('total') * 1000:>6.0f}ms {med('pixels') / 1e6:>5.2f}MP "
+                  f"{statistics.mean(r['chars'] for r in rows):>6.3f} "
+                  f"{sum(r['lang'] for r in rows) / len(rows):>5.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Startup cost of the API: import time and time to first response.
+
+Measures, in fresh interpreters:
+
+- ``import backend.app.main`` (median of several runs)
+- for a uvicorn server started from scratch, the time until ``/health`` answers, until
+  ``/ready`` reports the model loaded and warm, and until a first ``/detect-language``
+  call returns
+
+Run from the project root:
+
+    python scripts/bench_startup.py [--runs N] [--max-import S] [--max-ready S]
+
+With ``--max-import`` / ``--max-ready`` the script exits non-zero when a measurement is
+over budget, so it can guard against startup regressions in CI.
+"""
+from pathlib import Path
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = Path(__file__).resolve().parents[1]
+
+IMPORT_SNIPPET = (
+    "import time; t0 = time.perf_counter(); import backend.app.main; "
+    "print(time.perf_counter() - t0)"
+)
+
+
+def import_seconds() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status(url: str, data: bytes = None) -> int:
+    try:
+        with urllib.request.urlopen(url, data=data, timeout=5) as resp:
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return 0
+
+
+def wait_for(url: str, started: float, timeout: float = 120.0, data: bytes = None) -> float:
+    while time.perf_counter() - started < timeout:
+        if status(url, data) == 200:
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not return 200 within {timeout}s")
+
+
+def server_timings() -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    # OCR workers start in the background and do not affect these timings
+    env = dict(os.environ, OCR_PROCESSES="0")
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        health = wait_for(base + "/health", started)
+        ready = wait_for(base + "/ready", started)
+        form = urllib.parse.urlencode({"text": "def add(a, b):\n    return a + b"}).encode()
+        detect = wait_for(base + "/detect-language", started, data=form)
+    finally:
+        server.terminate()
+        server.wait(10)
+    return {"health": health, "ready": ready, "first_detect": detect}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=None, help="import budget in seconds")
+    parser.add_argument("--max-ready", type=float, default=None, help="time-to-ready budget in seconds")
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    print(f"import backend.app.main: median {statistics.median(imports) * 1000:.0f} ms "
+          f"(min {min(imports) * 1000:.0f} ms, {args.runs} runs)")
+
+    timings = server_timings()
+    for name, seconds in timings.items():
+        print(f"server start -> {name:<13} {seconds * 1000:>6.0f} ms")
+
+    over = []
+    if args.max_import is not None and statistics.median(imports) > args.max_import:
+        over.append("import")
+    if args.max_ready is not None and timings["ready"] > args.max_ready:
+        over.append("ready")
+    if over:
+        sys.exit(f"over budget: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
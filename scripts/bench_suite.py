@@ -0,0 +1,205 @@
+"""Microbenchmark suite for the detection hot paths.
+
+Covers ``detect_by_syntax`` and ``LanguageDetector.predict_text`` on synthetic code
+from 50 B to 1 MB, ``preprocess_image`` and ``image_to_text`` on screenshots from
+320 px wide to 4K, and the ``/detect-language`` endpoint through ``TestClient`` for both
+text and images. OCR uses a stub engine by default, so the numbers measure this code
+rather than Tesseract; ``--ocr tesseract`` uses the real binary when it is installed.
+Caches are disabled and inference is unbatched, so every call does the full work.
+
+Run from the project root:
+
+    python scripts/bench_suite.py [--output bench_results.json] [--quick]
+    python scripts/bench_suite.py --compare baseline.json [--threshold 0.2]
+
+Results (median and p90 seconds per call) are written as JSON. With ``--compare`` each
+case is checked against a saved result file. The script exits non-zero when any case
+is slower than the baseline by more than ``--threshold`` (a fraction, default 20%).
+"""
+from pathlib import Path
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PIL import Image, ImageDraw
+
+from backend.app import executors, main, ocr
+from backend.app.syntax_rules import detect_by_syntax
+
+SNIPPETS = [
+    "def add(a, b):\n    return a + b\n",
+    "console.log('hello world');\nconst x = (a) => a * 2;\n",
+    "#include <stdio.h>\nint main(){ printf(\"hi\"); }\n",
+    "public class App { public static void main(String[] args){} }\n",
+    "package main\nfunc main() { fmt.Println(\"hi\") }\n",
+    "SELECT name FROM users WHERE id = 1;\n",
+    "body { display: flex; } .btn { color: #fff; }\n",
+    "Write-Host 'hello'\n",
+]
+
+TEXT_SIZES = [("50B", 50), ("1KB", 1024), ("10KB", 10 * 1024), ("100KB", 100 * 1024), ("1MB", 1024 * 1024)]
+IMAGE_SIZES = [("320px", (320, 240)), ("720p", (1280, 720)), ("1080p", (1920, 1080)), ("4K", (3840, 2160))]
+QUICK_TEXT_SIZES = TEXT_SIZES[:3]
+QUICK_IMAGE_SIZES = IMAGE_SIZES[:2]
+
+
+class StubEngine:
+    """Stands in for an OCR engine: returns fixed text without reading the image."""
+
+    name = "stub"
+
+    def read(self, img):
+        return SNIPPETS[0]
+
+
+def make_text(size):
+    corpus = "".join(SNIPPETS)
+    return (corpus * (size // len(corpus) + 1))[:size]
+
+
+def make_image(size):
+    """PNG bytes of a white screenshot with lines of code drawn on it."""
+    width, height = size
+    img = Image.new("RGB", size, color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    lines = "".join(SNIPPETS).splitlines()
+    for row, y in enumerate(range(8, height - 12, 14)):
+        draw.text((8, y), lines[row % len(lines)][: width // 6], fill=(20, 20, 20))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def measure(fn, budget, max_runs=500):
+    """Median and p90 seconds per call, spending roughly ``budget`` seconds."""
+    fn()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while not samples or (time.perf_counter() < deadline and len(samples) < max_runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "median_s": samples[len(samples) // 2],
+        "p90_s": samples[min(len(samples) - 1, int(len(samples) * 0.9))],
+        "runs": len(samples),
+    }
+
+
+def ocr_engines(kind):
+    if kind == "tesseract":
+        engines = ocr.load_engines("tesseract")
+        if not engines:
+            sys.exit("--ocr tesseract: the tesseract binary is not available")
+        return engines
+    return [StubEngine()]
+
+
+def configure_app(engines):
+    # full work on every call: no caches, no micro-batching, OCR in this process
+    main.prediction_cache = None
+    main.ocr_cache = None
+    main.MICROBATCH_MAX_SIZE = 1
+    executors.OCR_PROCESSES = 0
+    ocr._default_engines = engines
+
+
+def cases(args):
+    from fastapi.testclient import TestClient
+
+    text_sizes = QUICK_TEXT_SIZES if args.quick else TEXT_SIZES
+    image_sizes = QUICK_IMAGE_SIZES if args.quick else IMAGE_SIZES
+    engines = ocr_engines(args.ocr)
+    configure_app(engines)
+    detector = main.ensure_detector()
+    client = TestClient(main.app)
+
+    for label, size in text_sizes:
+        text = make_text(size)
+        yield f"syntax/{label}", lambda text=text: detect_by_syntax(text)
+        yield f"predict_text/{label}", lambda text=text: detector.predict_text(text)
+        yield f"endpoint_text/{label}", lambda text=text: client.post("/detect-language", data={"text": text})
+
+    for label, size in image_sizes:
+        png = make_image(size)
+        yield f"preprocess_image/{label}", lambda png=png: ocr.preprocess_image(Image.open(io.BytesIO(png)))
+        yield f"image_to_text/{label}", lambda png=png: ocr.image_to_text(png, engines)
+        yield f"endpoint_image/{label}", lambda png=png: client.post(
+            "/detect-language", files={"file": ("code.png", png, "image/png")}
+        )
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; return the names of cases that regressed."""
+    regressions = []
+    print(f"\n{'case':<28} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<28} {'-':>11} {current['median_s'] * 1000:>9.3f}ms {'new':>8}")
+            continue
+        ratio = current["median_s"] / base["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<28} {base['median_s'] * 1000:>9.3f}ms {current['median_s'] * 1000:>9.3f}ms "
+              f"{(ratio - 1) * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", default=None, help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds to spend per case")
+    parser.add_argument("--ocr", choices=["stub", "tesseract"], default="stub")
+    parser.add_argument("--quick", action="store_true", help="only the smaller inputs")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in cases(args):
+        results[name] = measure(fn, args.budget)
+        print(f"{name:<28} {results[name]['median_s'] * 1000:>9.3f}ms  (p90 "
+              f"{results[name]['p90_s'] * 1000:.3f}ms, {results[name]['runs']} runs)")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ocr": args.ocr,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            sys.exit(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,107 @@
+"""Micro-benchmark for syntax scoring.
+
+Compares the precompiled ``RuleSet`` used by ``detect_by_syntax`` (with and without the
+literal prefilter) against the previous per-call ``re.search`` loop over raw pattern
+strings, for 100 B, 10 KB and 1 MB inputs. "mixed" inputs interleave snippets of several
+languages; "python" inputs repeat a single-language paste, the common case in traffic.
+
+Run from the project root:
+
+    python scripts/bench_syntax.py [--reference-max-bytes N]
+
+Unfiltered scans are quadratic on some inputs (a 1 MB single-language paste takes
+minutes), so the reference columns are only measured up to ``--reference-max-bytes``.
+"""
+from pathlib import Path
+import argparse
+import re
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.syntax_rules import RULES, DEFAULT_RULESET, RuleSet
+
+SNIPPETS = [
+    "def add(a, b):\n    return a + b\n",
+    "console.log('hello world');\nconst x = (a) => a * 2;\n",
+    "#include <stdio.h>\nint main(){ printf(\"hi\"); }\n",
+    "public class App { public static void main(String[] args){} }\n",
+    "package main\nfunc main() { fmt.Println(\"hi\") }\n",
+    "SELECT name FROM users WHERE id = 1;\n",
+    "body { display: flex; } .btn { color: #fff; }\n",
+    "Write-Host 'hello'\n",
+]
+
+PYTHON_PASTE = (
+    "import os\nimport sys\n\n\nclass Loader:\n    def __init__(self, root):\n"
+    "        self.root = root\n\n    def load(self, name):\n"
+    "        path = os.path.join(self.root, name)\n        with open(path) as fh:\n"
+    "            return fh.read()\n\n"
+)
+
+SIZES = [("100B", 100), ("10KB", 10 * 1024), ("1MB", 1024 * 1024)]
+
+
+def legacy_detect(text):
+    """The pre-RuleSet loop: raw pattern strings searched on every call."""
+    scores = {}
+    for lang, patterns in RULES.items():
+        total = 0.0
+        for pat, weight in patterns:
+            try:
+                if re.search(pat, text, flags=re.IGNORECASE | re.MULTILINE):
+                    total += weight
+            except re.error:
+                continue
+        if total > 0:
+            scores[lang] = total
+    return scores
+
+
+def make_input(size, corpus=None):
+    corpus = corpus or "".join(SNIPPETS)
+    reps = size // len(corpus) + 1
+    return (corpus * reps)[:size]
+
+
+def per_call(fn, text, budget=1.0):
+    """Median per-call latency in seconds, spending roughly ``budget`` seconds."""
+    fn(text)
+    samples = []
+    deadline = time.perf_counter() + budget
+    while not samples or (time.perf_counter() < deadline and len(samples) < 2000):
+        t0 = time.perf_counter()
+        fn(text)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def _fmt(seconds):
+    return f"{seconds * 1e6:>10.1f}us" if seconds is not None else f"{'-':>12}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reference-max-bytes", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    compiled_only = RuleSet(RULES, prefilter=False)
+    print(f"{'corpus':>7} {'input':>6} {'legacy':>12} {'compiled':>12} {'prefilter':>12} {'speedup':>8}")
+    for corpus_name, corpus in (("mixed", None), ("python", PYTHON_PASTE)):
+        for label, size in SIZES:
+            text = make_input(size, corpus)
+            old = mid = None
+            if size <= args.reference_max_bytes:
+                old = per_call(legacy_detect, text)
+                mid = per_call(compiled_only.scores, text)
+            new = per_call(DEFAULT_RULESET.scores, text)
+            speedup = f"{old / new:>7.2f}x" if old else f"{'-':>8}"
+            print(f"{corpus_name:>7} {label:>6} {_fmt(old)} {_fmt(mid)} {_fmt(new)} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
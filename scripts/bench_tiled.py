@@ -0,0 +1,105 @@
+"""Tiled OCR of tall screenshots: one image per worker vs. bands read in parallel.
+
+Renders full-page captures of code (``--heights``, 1280 px wide, light background) and
+OCRs each through an ``OCRWorkerPool`` of ``--workers`` processes, both whole
+(``run``) and tiled (``run_tiled``, bands of ``--band-height`` rows). Reports the wall
+time of both and the character similarity of their text to the rendered code. For the
+tiled run it also shows the band count, the engine seconds summed over the bands (the
+total work, overlap and per-call overhead included) and those of the slowest band: the
+wall time tiling approaches with at least one free core per band.
+
+Needs an OCR engine in the workers (``OCR_BACKEND``, ``--backend``). Run from the
+project root:
+
+    python scripts/bench_tiled.py [--workers 4] [--heights 3000,6000,9000] [--band-height 1024]
+"""
+from pathlib import Path
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PIL import Image, ImageDraw
+
+from backend.app import ocr
+from backend.app.ocr_pool import OCRWorkerPool
+
+sys.path.insert(0, str(ROOT / "scripts"))
+from bench_ocr import font, similarity, snippets  # noqa: E402
+
+LINE_HEIGHT = 28
+
+
+def page(height: int, rng: random.Random):
+    """PNG bytes of a full-page capture ``height`` px tall, and the code on it."""
+    lines = []
+    while len(lines) * LINE_HEIGHT < height - 80:
+        code, _ = snippets(rng, 1 + len(lines) % 7)[-1]
+        lines.extend(code.splitlines() + [""])
+    code = "\n".join(lines[:(height - 80) // LINE_HEIGHT]).rstrip()
+    img = Image.new("L", (1280, height), 250)
+    ImageDraw.Draw(img).multiline_text((40, 40), code, font=font(20), fill=30, spacing=LINE_HEIGHT - 20)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue(), code
+
+
+def engine_seconds(timings) -> float:
+    return sum(v for k, v in timings.items() if k in ocr.ENGINES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--heights", default="3000,6000,9000", help="comma-separated page heights")
+    parser.add_argument("--band-height", type=int, default=1024)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument("--backend", default=os.environ.get("OCR_BACKEND", "auto"))
+    args = parser.parse_args()
+
+    pool = OCRWorkerPool(size=args.workers, backend=args.backend)
+    pool.start()
+    while sum(w["state"] == "idle" for w in pool.stats()) < args.workers:
+        time.sleep(0.2)
+    if not pool.stats()[0]["backends"]:
+        pool.shutdown()
+        sys.exit("no OCR engine loaded in the workers (install tesseract / easyocr)")
+
+    rng = random.Random(0)
+    print(f"{args.workers} workers ({pool.stats()[0]['backends'][0]}), {os.cpu_count()} cores, "
+          f"bands of {args.band_height} rows")
+    print(f"{'height':>6} {'whole':>8} {'chars':>6} {'tiled':>8} {'chars':>6} {'bands':>5} "
+          f"{'band sum':>9} {'slowest':>8}")
+    try:
+        for height in (int(h) for h in args.heights.split(",")):
+            data, code = page(height, rng)
+            started = time.perf_counter()
+            whole = pool.run(data)
+            whole_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            tiled = pool.run_tiled(data, args.band_height, args.overlap)
+            tiled_seconds = time.perf_counter() - started
+
+            # each band alone, for the work per band
+            img = ocr.prepare_image(data)
+            band_seconds = []
+            for top, bottom, _ in ocr.split_bands(img, args.band_height, args.overlap):
+                timings = {}
+                pool.run(ocr.encode_band(img.crop((0, top, img.width, bottom))), timings=timings, preprocess="none")
+                band_seconds.append(engine_seconds(timings))
+            print(f"{height:>6} {whole_seconds:>7.2f}s {similarity(code, whole):>6.3f} {tiled_seconds:>7.2f}s "
+                  f"{similarity(code, tiled):>6.3f} {len(band_seconds):>5} {sum(band_seconds):>8.2f}s "
+                  f"{max(band_seconds):>7.2f}s", flush=True)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Latency of predict_text vs. input size, with and without windowed classification.
+
+Inputs are synthetic code from 1 KB to 5 MB (the same snippets as ``bench_suite.py``).
+"Whole" classifies the full text in one call; "windowed" uses the default
+``WINDOW_THRESHOLD`` / ``WINDOW_CHARS`` / ``MAX_WINDOWS`` settings. The last column shows
+whether both give the same language.
+
+Run from the project root:
+
+    python scripts/bench_windowed.py [--budget 1.0]
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.model import LanguageDetector, load_detector
+from scripts.bench_suite import make_text
+
+SIZES = [("1KB", 1024), ("32KB", 32 * 1024), ("100KB", 100 * 1024), ("1MB", 1024 * 1024), ("5MB", 5 * 1024 * 1024)]
+
+
+def seconds_per_call(fn, budget):
+    fn()
+    runs = 0
+    t0 = time.perf_counter()
+    while runs == 0 or time.perf_counter() - t0 < budget:
+        fn()
+        runs += 1
+    return (time.perf_counter() - t0) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds to spend per case")
+    args = parser.parse_args()
+
+    windowed = load_detector()
+    whole = LanguageDetector(windowed.pipeline, version=windowed.version, window_threshold=None)
+    print(f"{'size':<7} {'whole':>11} {'windowed':>11} {'speedup':>8}  windows  same")
+    for label, size in SIZES:
+        text = make_text(size)
+        t_whole = seconds_per_call(lambda: whole.predict_text(text), args.budget)
+        t_windowed = seconds_per_call(lambda: windowed.predict_text(text), args.budget)
+        a, b = whole.predict_text(text), windowed.predict_text(text)
+        used = next((i.split(":")[1].split(" of")[0].strip() for i in b["indicators"] if i.startswith("windowed:")), "-")
+        print(f"{label:<7} {t_whole * 1000:>9.2f}ms {t_windowed * 1000:>9.2f}ms {t_whole / t_windowed:>7.1f}x"
+              f"  {used:>7}  {a['language'] == b['language']}")
+
+
+if __name__ == "__main__":
+    main()
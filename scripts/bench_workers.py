@@ -0,0 +1,172 @@
+"""Memory per API worker process: spawned workers vs. preload-then-fork, with and without mmap.
+
+For each worker count, starts the API with
+
+- ``uvicorn --workers N``: every worker is a fresh interpreter that loads its own model
+- ``gunicorn -c backend/gunicorn.conf.py``: the model is loaded once in the master and
+  the workers are forked from it
+
+each with the sklearn joblib model (``COMPACT_MODEL=0``) and with the compact export in
+its memory-mapped layout. Once every worker has loaded the model and served requests,
+it reads ``/proc/<pid>/smaps_rollup`` of each worker:
+
+- RSS: resident pages, shared ones included (what ``top`` shows)
+- PSS: shared pages divided among the processes that map them
+- USS: pages private to the worker (what stopping it would free)
+
+and the total PSS of the server (master and workers): the memory the box pays for it.
+Linux only. Run from the project root (uses backend/models/lang_detector.joblib, copied
+with its compact export into a temporary directory):
+
+    python scripts/bench_workers.py [--workers 1,4,16] [--requests 20]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+MODES = {
+    "uvicorn": ([sys.executable, "-m", "uvicorn", "backend.app.main:app", "--log-level", "warning"], "0"),
+    "uvicorn+mmap": ([sys.executable, "-m", "uvicorn", "backend.app.main:app", "--log-level", "warning"], "1"),
+    "gunicorn": ([sys.executable, "-m", "gunicorn", "-c", "backend/gunicorn.conf.py", "backend.app.main:app",
+                  "--log-level", "warning"], "0"),
+    "gunicorn+mmap": ([sys.executable, "-m", "gunicorn", "-c", "backend/gunicorn.conf.py", "backend.app.main:app",
+                       "--log-level", "warning"], "1"),
+}
+TEXTS = [
+    "def add(a, b):\n    return a + b",
+    "public static void main(String[] args) { System.out.println(1); }",
+    "fn main() { let v: Vec<i32> = Vec::new(); println!(\"{}\", v.len()); }",
+    "SELECT id, name FROM users WHERE id = 1;",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status(url: str, data: bytes = None) -> int:
+    try:
+        with urllib.request.urlopen(url, data=data, timeout=60) as resp:
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return 0
+
+
+def children(pid: int):
+    """Direct child processes of ``pid``, without multiprocessing helpers."""
+    found = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            cmdline = (entry / "cmdline").read_bytes()
+        except OSError:
+            continue
+        # the command may contain spaces and parentheses; ppid follows the last ")"
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid and b"resource_tracker" not in cmdline:
+            found.append(int(entry.name))
+    return found
+
+
+def worker_pids(server: subprocess.Popen, mode: str, workers: int):
+    # uvicorn with one worker serves from its own process
+    if mode.startswith("uvicorn") and workers == 1:
+        return [server.pid]
+    return children(server.pid)
+
+
+def memory(pid: int) -> dict:
+    """RSS / PSS / USS of a process in MiB."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+            fields[parts[0][:-1]] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def measure(mode: str, workers: int, model_path: Path, requests: int) -> dict:
+    command, compact = MODES[mode]
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, OCR_PROCESSES="0", MODEL_PATH=str(model_path), COMPACT_MODEL=compact,
+               PREDICTION_CACHE_SIZE="0", PORT=str(port), WEB_CONCURRENCY=str(workers))
+    if mode.startswith("uvicorn"):
+        command = command + ["--port", str(port), "--workers", str(workers)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        started = time.perf_counter()
+        while len(worker_pids(server, mode, workers)) < workers or status(base + "/ready") != 200:
+            if time.perf_counter() - started > 600:
+                raise TimeoutError(f"{mode} with {workers} workers did not start")
+            time.sleep(0.2)
+        forms = [urllib.parse.urlencode({"text": TEXTS[i % len(TEXTS)]}).encode() for i in range(requests * workers)]
+        with ThreadPoolExecutor(max(4, workers * 2)) as pool:
+            codes = list(pool.map(lambda form: status(base + "/detect-language", form), forms))
+        if any(code != 200 for code in codes):
+            raise RuntimeError(f"{mode}: {sum(code != 200 for code in codes)} failed requests")
+        # spawned workers load the model at startup; wait until all of them are done
+        previous = None
+        while True:
+            current = sum(memory(pid)["rss"] for pid in worker_pids(server, mode, workers))
+            if previous is not None and abs(current - previous) < 1.0:
+                break
+            previous = current
+            time.sleep(1.0)
+        pids = worker_pids(server, mode, workers)
+        per_worker = [memory(pid) for pid in pids]
+        master = memory(server.pid) if server.pid not in pids else {"pss": 0.0}
+    finally:
+        server.terminate()
+        server.wait(30)
+    n = len(per_worker)
+    return {
+        "rss": sum(m["rss"] for m in per_worker) / n,
+        "pss": sum(m["pss"] for m in per_worker) / n,
+        "uss": sum(m["uss"] for m in per_worker) / n,
+        "total_pss": master["pss"] + sum(m["pss"] for m in per_worker),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,4,16", help="comma-separated worker counts")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes")
+    parser.add_argument("--requests", type=int, default=20, help="requests per worker before measuring")
+    args = parser.parse_args()
+
+    import joblib
+
+    from backend.app.model import MODEL_PATH, save_detector
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = Path(tmp) / "lang_detector.joblib"
+        save_detector(joblib.load(MODEL_PATH), model_path)
+        print(f"{'mode':<14} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} {'total PSS':>10}")
+        for workers in (int(n) for n in args.workers.split(",")):
+            for mode in args.modes.split(","):
+                r = measure(mode, workers, model_path, args.requests)
+                print(f"{mode:<14} {workers:>7} {r['rss']:>9.0f}MB {r['pss']:>9.0f}MB {r['uss']:>9.0f}MB "
+                      f"{r['total_pss']:>8.0f}MB", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""HTTP load generator for a running API server.
+
+Drives ``/detect-language`` on a server started separately (e.g.
+``uvicorn backend.app.main:app --port 8000``) with a mix of text and image requests, and
+reports throughput, p50/p95/p99 latency and errors, overall and per request kind.
+
+Two ways to apply load:
+
+- ``--rate R``: open loop, R requests per second whatever the response times
+- ``--concurrency N``: closed loop, N requests in flight at all times
+
+Traffic is either synthetic (``--image-ratio`` sets the image share) or replayed from a
+JSONL corpus with ``--corpus``. Each corpus line is one request:
+
+    {"kind": "text", "text": "def f(): pass", "offset_s": 0.0}
+    {"kind": "image", "image_path": "shots/editor.png", "text": "optional extra text"}
+    {"kind": "image", "image_b64": "iVBORw0KGgo...", "offset_s": 0.25}
+    {"kind": "batch", "texts": ["puts 'hi'", "SELECT 1;"]}
+
+Lines that are not requests (e.g. other JSON records) are skipped and counted.
+``--replay-timing`` sends corpus requests at their recorded ``offset_s`` (seconds from
+the start) instead of at ``--rate`` / ``--concurrency``. ``--record FILE`` writes the
+requests that were sent in this format, so a synthetic run can be replayed exactly.
+
+Run from the project root:
+
+    python scripts/loadtest.py --concurrency 32 --requests 2000 --image-ratio 0.1
+    python scripts/loadtest.py --rate 50 --duration 30 --corpus traffic.jsonl [--json out.json]
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import base64
+import io
+import itertools
+import json
+import random
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+from PIL import Image, ImageDraw
+
+from backend.evaluate import build_eval_dataset
+
+IMAGE_SIZES = [(640, 360), (1280, 720), (1920, 1080)]
+
+
+def make_image(text, size):
+    img = Image.new("RGB", size, color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for row, line in enumerate(text.splitlines()):
+        draw.text((12, 12 + 16 * row), line, fill=(20, 20, 20))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def synthetic_requests(image_ratio, seed):
+    """Endless stream of synthetic requests from the evaluation snippets."""
+    rng = random.Random(seed)
+    texts, _ = build_eval_dataset()
+    images = {}
+    while True:
+        text = rng.choice(texts)
+        if rng.random() < image_ratio:
+            key = (text, rng.choice(IMAGE_SIZES))
+            if key not in images:
+                images[key] = make_image(*key)
+            yield {"kind": "image", "image": images[key]}
+        else:
+            yield {"kind": "text", "text": text}
+
+
+def load_corpus(path):
+    """Requests from a JSONL corpus, plus the number of lines that were skipped."""
+    requests, skipped = [], 0
+    base = Path(path).parent
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            skipped += 1
+            continue
+        kind = item.get("kind") if isinstance(item, dict) else None
+        if kind == "text" and isinstance(item.get("text"), str):
+            req = {"kind": "text", "text": item["text"]}
+        elif kind == "image" and ("image_b64" in item or "image_path" in item):
+            if "image_b64" in item:
+                image = base64.b64decode(item["image_b64"])
+            else:
+                image = (base / item["image_path"]).read_bytes()
+            req = {"kind": "image", "image": image}
+            if item.get("text"):
+                req["text"] = item["text"]
+        elif kind == "batch" and isinstance(item.get("texts"), list):
+            req = {"kind": "batch", "texts": item["texts"]}
+        else:
+            skipped += 1
+            continue
+        if "offset_s" in item:
+            req["offset_s"] = float(item["offset_s"])
+        requests.append(req)
+    return requests, skipped
+
+
+def to_record(req, offset_s):
+    out = {k: v for k, v in req.items() if k not in ("image", "offset_s")}
+    if "image" in req:
+        out["image_b64"] = base64.b64encode(req["image"]).decode("ascii")
+    out["offset_s"] = round(offset_s, 4)
+    return out
+
+
+async def send(client, req):
+    if req["kind"] == "batch":
+        return await client.post("/detect-language/batch", json=req["texts"])
+    data = {"text": req["text"]} if req.get("text") else None
+    files = {"file": ("image.png", req["image"], "image/png")} if "image" in req else None
+    return await client.post("/detect-language", data=data, files=files)
+
+
+class Recorder:
+    def __init__(self, record=None):
+        self.samples = []
+        # open --record file: each request is written as it is sent, so lines come out in
+        # offset order and no copy is kept
+        self.record = record
+        self.started = time.perf_counter()
+
+    async def run_one(self, client, req):
+        if self.record is not None:
+            # encoded before t0, so it never counts towards the request's latency
+            self.record.write(json.dumps(to_record(req, time.perf_counter() - self.started)) + "\n")
+        t0 = time.perf_counter()
+        try:
+            resp = await send(client, req)
+            outcome = resp.status_code
+        except httpx.HTTPError as exc:
+            outcome = type(exc).__name__
+        self.samples.append((req["kind"], outcome, time.perf_counter() - t0))
+
+
+async def run_rate(client, recorder, requests, rate, deadline):
+    tasks = []
+    for i, req in enumerate(requests):
+        due = recorder.started + (req["offset_s"] if rate is None else i / rate)
+        if due > deadline:
+            break
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(recorder.run_one(client, req)))
+    await asyncio.gather(*tasks)
+
+
+async def run_concurrency(client, recorder, requests, concurrency, deadline):
+    requests = iter(requests)
+
+    async def worker():
+        for req in requests:
+            if time.perf_counter() > deadline:
+                return
+            await recorder.run_one(client, req)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def summarize(samples, elapsed):
+    def stats(group):
+        latencies = sorted(lat for _, outcome, lat in group if outcome == 200)
+        errors = {}
+        for _, outcome, _ in group:
+            if outcome != 200:
+                errors[str(outcome)] = errors.get(str(outcome), 0) + 1
+        return {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": _ms(percentile(latencies, 0.50)),
+            "p95_ms": _ms(percentile(latencies, 0.95)),
+            "p99_ms": _ms(percentile(latencies, 0.99)),
+            "error_rate": round(sum(errors.values()) / len(group), 4) if group else 0.0,
+            "errors": errors,
+        }
+
+    kinds = sorted({kind for kind, _, _ in samples})
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "all": stats(samples),
+        **{kind: stats([s for s in samples if s[0] == kind]) for kind in kinds},
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def print_summary(summary):
+    print(f"elapsed {summary['elapsed_s']}s")
+    print(f"{'kind':<7} {'reqs':>6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for kind, s in summary.items():
+        if kind == "elapsed_s":
+            continue
+        cols = [f"{s[k]:>7.1f}ms" if s[k] is not None else f"{'-':>9}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{kind:<7} {s['requests']:>6} {s['throughput_rps']:>8.1f} {' '.join(cols)} {s['error_rate']:>7.2%}")
+        for outcome, count in sorted(s["errors"].items()):
+            print(f"{'':<7}   {outcome}: {count}")
+
+
+async def run(args):
+    if args.corpus:
+        requests, skipped = load_corpus(args.corpus)
+        print(f"corpus: {len(requests)} requests, {skipped} lines skipped")
+        if not requests:
+            sys.exit("no requests in corpus")
+        if args.replay_timing and any("offset_s" not in r for r in requests):
+            sys.exit("--replay-timing needs offset_s on every corpus request")
+        if args.loop and not args.replay_timing:
+            requests = itertools.cycle(requests)
+    else:
+        requests = synthetic_requests(args.image_ratio, args.seed)
+    if args.requests:
+        requests = itertools.islice(requests, args.requests)
+    if args.duration is None and args.requests is None and not args.corpus:
+        sys.exit("give --duration or --requests for synthetic traffic")
+
+    record = open(args.record, "w", encoding="utf-8") if args.record else None
+    recorder = Recorder(record)
+    deadline = recorder.started + args.duration if args.duration else float("inf")
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    try:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+            if args.replay_timing:
+                await run_rate(client, recorder, requests, None, deadline)
+            elif args.rate:
+                await run_rate(client, recorder, requests, args.rate, deadline)
+            else:
+                await run_concurrency(client, recorder, requests, args.concurrency, deadline)
+    finally:
+        if record is not None:
+            record.close()
+    elapsed = time.perf_counter() - recorder.started
+
+    summary = summarize(recorder.samples, elapsed)
+    print_summary(summary)
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="open loop: requests per second")
+    load.add_argument("--concurrency", type=int, default=16, help="closed loop: requests in flight")
+    load.add_argument("--replay-timing", action="store_true", help="send corpus requests at their offset_s")
+    parser.add_argument("--duration", type=float, help="stop sending after this many seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--image-ratio", type=float, default=0.0, help="share of synthetic image requests")
+    parser.add_argument("--corpus", help="JSONL corpus to replay instead of synthetic traffic")
+    parser.add_argument("--loop", action="store_true", help="repeat the corpus until --duration/--requests")
+    parser.add_argument("--record", help="write the requests sent as a replayable JSONL corpus")
+    parser.add_argument("--json", help="write the summary as JSON")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.replay_timing and not args.corpus:
+        parser.error("--replay-timing requires --corpus (synthetic requests have no recorded timing)")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Write a synthetic labeled corpus for training and evaluation benchmarks.
+
+Samples are the training and evaluation snippets with identifiers renamed and 1-3
+snippets of the same language joined together, written as JSONL (``text``,
+``language``). ``--shards N`` splits the output into a directory of N shard files.
+
+Run from the project root:
+
+    python scripts/make_corpus.py --samples 1000000 --out corpus.jsonl
+    python scripts/make_corpus.py --samples 200000 --shards 8 --out corpus/
+"""
+from pathlib import Path
+import argparse
+import json
+import random
+import re
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+_IDENTIFIERS = re.compile(r"\b(a|b|x|y|name|greet|add|foo|test|message|myfunc|users|age|id|Foo|App|Thing)\b")
+
+
+def templates():
+    by_language = {}
+    for X, y in (build_sample_dataset(), build_eval_dataset()):
+        for text, label in zip(X, y):
+            by_language.setdefault(label, set()).add(text)
+    return {label: sorted(texts) for label, texts in by_language.items()}
+
+
+def generate(n, seed=0):
+    rng = random.Random(seed)
+    by_language = templates()
+    languages = sorted(by_language)
+    for _ in range(n):
+        language = rng.choice(languages)
+        parts = [rng.choice(by_language[language]) for _ in range(rng.randint(1, 3))]
+        suffix = str(rng.randrange(1000))
+        text = _IDENTIFIERS.sub(lambda m: m.group(0) + suffix, "\n\n".join(parts))
+        yield {"text": text, "language": language}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--out", required=True, help="JSONL file, or directory with --shards")
+    parser.add_argument("--shards", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    if args.shards:
+        out.mkdir(parents=True, exist_ok=True)
+        files = [open(out / f"shard-{i:04d}.jsonl", "w", encoding="utf-8") for i in range(args.shards)]
+    else:
+        files = [open(out, "w", encoding="utf-8")]
+    try:
+        for i, item in enumerate(generate(args.samples, args.seed)):
+            files[i % len(files)].write(json.dumps(item) + "\n")
+    finally:
+        for fh in files:
+            fh.close()
+    print(f"wrote {args.samples} samples to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Per-rule cost of the syntax rules over a corpus.
+
+Reports, for every (language, pattern) in ``syntax_rules.RULES``, how often its regex ran
+or was skipped by the literal prefilter, how many texts it matched and the total time,
+most expensive first. Guarded rules (``.*`` / ``.+`` patterns) are marked with ``*``.
+
+The default corpus is the training and evaluation snippets plus a minified-JS style
+single line; pass files to profile real inputs instead. ``--unguarded`` turns the
+long-line guard off to see what it saves.
+
+Run from the project root:
+
+    python scripts/profile_rules.py [--top 15] [--unguarded] [files ...]
+"""
+from pathlib import Path
+import argparse
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.syntax_rules import DEFAULT_RULESET, RULES, RuleSet
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+
+def default_corpus():
+    X_train, _ = build_sample_dataset()
+    X_eval, _ = build_eval_dataset()
+    minified = "</b>" + "".join(f"<a href=x{i} class=y>{{v{i}}}" for i in range(300)) + " <p s"
+    return list(dict.fromkeys(X_train + X_eval)) + [minified]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="text files to profile (default: built-in corpus)")
+    parser.add_argument("--top", type=int, default=15, help="rules to print")
+    parser.add_argument("--unguarded", action="store_true", help="profile without the long-line guard")
+    args = parser.parse_args()
+
+    texts = [Path(f).read_text(encoding="utf-8", errors="replace") for f in args.files] or default_corpus()
+    rules = RuleSet(RULES, max_line=None) if args.unguarded else DEFAULT_RULESET
+    report = rules.profile(texts)
+    total = sum(r["seconds"] for r in report)
+    print(f"{len(texts)} texts, {sum(map(len, texts))} chars, {total * 1000:.1f}ms in rules")
+    print(f"{'ms':>9} {'share':>6} {'runs':>6} {'skip':>6} {'hits':>6}  language / pattern")
+    for r in report[:args.top]:
+        share = r["seconds"] / total if total else 0.0
+        mark = "*" if r["guarded"] else " "
+        print(f"{r['seconds'] * 1000:>9.2f} {share:>6.1%} {r['runs']:>6} {r['skipped']:>6} {r['matches']:>6} "
+              f"{mark} {r['language']}: {r['pattern']}")
+
+
+if __name__ == "__main__":
+    main()
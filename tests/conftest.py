@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sklearn.calibration import CalibratedClassifierCV
+
+from backend.app import main, model
+from backend.train import build_pipeline, build_sample_dataset
+
+
+@pytest.fixture(scope="session", autouse=True)
+def model_path(tmp_path_factory):
+    """The default model (as ``backend/train.py`` fits it), trained once and served from a temp dir."""
+    path = tmp_path_factory.mktemp("models") / "lang_detector.joblib"
+    X, y = build_sample_dataset()
+    model.save_detector(CalibratedClassifierCV(build_pipeline(), cv=3, method="isotonic").fit(X, y), path)
+    with pytest.MonkeyPatch.context() as mp:
+        # spawned workers (evaluate --jobs, the OCR pool) read it from the environment
+        mp.setenv("MODEL_PATH", str(path))
+        mp.setattr(model, "MODEL_PATH", path)
+        mp.setattr(main, "MODEL_PATH", path)
+        yield path
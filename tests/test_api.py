@@ -9,7 +9,9 @@ if str(ROOT) not in sys.path:
 
 from fastapi.testclient import TestClient
 
+from backend.app import executors, main
 from backend.app.main import app
+from backend.app.ocr_pool import OCRUnavailable
 
 
 client = TestClient(app)
@@ -111,3 +113,76 @@ def test_detect_language_html_css_json_yaml():
         assert r.status_code == 200
         body = r.json()
         assert expected.lower() in body["language"].lower()
+
+
+def test_busy_ocr_answers_503_with_retry_after(monkeypatch):
+    async def busy(file_bytes):
+        raise OCRUnavailable("no idle OCR worker within 30s")
+
+    monkeypatch.setattr(executors, "run_ocr", busy)
+    r = client.post("/detect-language", files={"file": ("code.png", b"image bytes", "image/png")})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == str(main.OCR_RETRY_AFTER)
+    assert "retry later" in r.json()["detail"]
+
+
+def test_detect_language_batch_keeps_order():
+    texts = [
+        "package main\nfunc main() { fmt.Println(\"hi\") }",
+        "def add(a, b):\n    return a + b",
+        "SELECT name FROM users WHERE id = 1;",
+    ]
+    r = client.post("/detect-language/batch", json=texts)
+    assert r.status_code == 200
+    body = r.json()
+    assert [b["language"].lower() for b in body] == ["go", "python", "sql"]
+    for text, item in zip(texts, body):
+        assert item == client.post("/detect-language", data={"text": text}).json()
+
+
+def test_detect_language_stream_ndjson():
+    lines = [
+        json.dumps("package main\nfunc main() { fmt.Println(\"hi\") }"),
+        json.dumps({"text": "def add(a, b):\n    return a + b"}),
+        "not json",
+        "",
+        json.dumps({"text": "SELECT name FROM users WHERE id = 1;"}),
+    ]
+    r = client.post(
+        "/detect-language/stream",
+        content="\n".join(lines).encode(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    out = [json.loads(line) for line in r.text.splitlines()]
+    # one result line per input line, blank lines included
+    assert len(out) == 5
+    assert out[0]["language"].lower() == "go"
+    assert out[1]["language"].lower() == "python"
+    assert "error" in out[2]
+    assert out[3] == {"error": "empty line"}
+    assert out[4]["language"].lower() == "sql"
+
+
+def test_detect_language_stream_rejects_oversized_lines(monkeypatch):
+    monkeypatch.setattr(main, "STREAM_MAX_LINE_BYTES", 100)
+    sql = json.dumps("SELECT name FROM users WHERE id = 1;")
+
+    def body():
+        yield (json.dumps("x" * 40) + "\n").encode()
+        # an unterminated line keeps growing past the limit across chunks
+        for _ in range(50):
+            yield b"y" * 64
+        yield b"\n" + sql.encode() + b"\n"
+        yield ("z" * 300 + "\n" + sql).encode()
+
+    r = client.post("/detect-language/stream", content=body(), headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 200
+    out = [json.loads(line) for line in r.text.splitlines()]
+    assert len(out) == 5
+    assert "language" in out[0]
+    assert out[1] == {"error": "line longer than 100 bytes"}
+    assert out[2]["language"].lower() == "sql"
+    assert out[3] == {"error": "line longer than 100 bytes"}
+    assert out[4]["language"].lower() == "sql"
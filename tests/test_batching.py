@@ -0,0 +1,70 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.batching import MicroBatcher
+
+
+def test_concurrent_submits_are_coalesced():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=50, name="test_coalesce")
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+
+    assert asyncio.run(run()) == [i * 2 for i in range(20)]
+    assert [len(c) for c in calls] == [8, 8, 4]
+    snap = batcher.batch_size.snapshot()
+    assert snap["count"] == 3 and snap["sum"] == 20
+    assert batcher.queue_delay.snapshot()["count"] == 20
+
+
+def test_single_request_waits_at_most_max_wait():
+    gate = threading.Event()
+
+    def fn(items):
+        gate.set()
+        return items
+
+    batcher = MicroBatcher(fn, max_batch_size=64, max_wait_ms=5, name="test_wait")
+
+    async def run():
+        return await asyncio.wait_for(batcher.submit("x"), timeout=2)
+
+    assert asyncio.run(run()) == "x"
+    assert gate.is_set()
+
+
+def test_errors_propagate_to_every_caller_and_worker_survives():
+    def fn(items):
+        if "boom" in items:
+            raise ValueError("bad batch")
+        return items
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=20, name="test_errors")
+
+    async def run():
+        failed = await asyncio.gather(batcher.submit("boom"), batcher.submit("ok"), return_exceptions=True)
+        after = await batcher.submit("fine")
+        return failed, after
+
+    failed, after = asyncio.run(run())
+    assert all(isinstance(f, ValueError) for f in failed)
+    assert after == "fine"
+
+
+def test_batcher_rebinds_to_new_event_loop():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=4, max_wait_ms=1, name="test_rebind")
+    assert asyncio.run(batcher.submit(1)) == 1
+    assert asyncio.run(batcher.submit(2)) == 2
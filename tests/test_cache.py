@@ -0,0 +1,140 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi.testclient import TestClient
+
+from backend.app import cache, main
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+def _caches(tmp_path, name, **kwargs):
+    # one name per test: hit / miss counters are shared by caches with the same name
+    yield cache.MemoryCache(f"{name}_mem", **kwargs)
+    yield cache.SQLiteCache(f"{name}_disk", str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_content_key_depends_on_namespace_and_content():
+    assert cache.content_key("print(1)", "v1") == cache.content_key(b"print(1)", "v1")
+    assert cache.content_key("print(1)", "v1") != cache.content_key("print(1)", "v2")
+    assert cache.content_key("print(1)", "v1") != cache.content_key("print(2)", "v1")
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path):
+    for c in _caches(tmp_path, "test_lru", max_entries=2, clock=FakeClock()):
+        c.set("a", {"v": 1})
+        c.set("b", {"v": 2})
+        assert c.get("a") == {"v": 1}  # "b" is now least recently used
+        c.set("c", {"v": 3})
+        assert c.get("b") is None
+        assert c.get("a") == {"v": 1} and c.get("c") == {"v": 3}
+
+    for c in _caches(tmp_path, "test_bytes", max_entries=100, max_bytes=20, clock=FakeClock()):
+        c.set("a", "x" * 10)
+        c.set("b", "y" * 10)
+        assert c.stats()["entries"] == 1 and c.get("b") == "y" * 10
+        c.set("huge", "z" * 100)  # larger than the whole cache: not stored, nothing evicted
+        assert c.get("huge") is None and c.get("b") == "y" * 10
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    for c in _caches(tmp_path, "test_ttl", ttl=10, clock=FakeClock()):
+        c.set("k", [1, 2])
+        assert c.get("k") == [1, 2]
+        c.clock.now += 11
+        assert c.get("k") is None
+        stats = c.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_ratio"] == 0.5
+
+
+def test_sqlite_cache_survives_restart_until_version_changes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    c = cache.SQLiteCache("test_restart", path)
+    c.bind_version("model-a")
+    c.set("k", {"language": "Python"})
+    c.close()
+
+    c = cache.SQLiteCache("test_restart", path)
+    c.bind_version("model-a")
+    assert c.get("k") == {"language": "Python"}
+    c.bind_version("model-b")
+    assert c.get("k") is None and c.stats()["entries"] == 0
+    c.close()
+
+
+def _use_inherited_cache(c, parent_db):
+    # the forked child must not reuse the parent's connection
+    ok = c._db is not parent_db and c.get("parent") == 1
+    c.set("child", 2)
+    sys.exit(0 if ok else 1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork (not on Windows)")
+def test_sqlite_cache_reconnects_after_fork(tmp_path):
+    c = cache.SQLiteCache("test_fork", str(tmp_path / "cache.db"))
+    c.set("parent", 1)
+    parent_db = c._db
+    child = multiprocessing.get_context("fork").Process(target=_use_inherited_cache, args=(c, parent_db))
+    child.start()
+    child.join(30)
+    assert child.exitcode == 0
+    assert c._db is parent_db and c.get("child") == 2
+    c.close()
+
+
+def test_detect_language_serves_repeats_from_cache(monkeypatch):
+    monkeypatch.setattr(main, "prediction_cache", cache.MemoryCache("test_api_prediction"))
+    client = TestClient(main.app)
+    text = "package main\nfunc main() { fmt.Println(\"cached\") }"
+
+    first = client.post("/detect-language", data={"text": text}).json()
+    second = client.post("/detect-language", data={"text": text}).json()
+    assert first == second
+    batch = client.post("/detect-language/batch", json=[text, "puts 'cached'"]).json()
+    assert batch[0] == first
+
+    stats = client.get("/stats").json()["caches"]["test_api_prediction"]
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["entries"] == 2
+
+
+def test_result_of_a_model_swapped_in_mid_request_is_cached_under_its_version(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    old, new = SimpleNamespace(version="old"), SimpleNamespace(version="new")
+    c = cache.MemoryCache("test_swap_prediction")
+    monkeypatch.setattr(main, "prediction_cache", c)
+    monkeypatch.setattr(main, "MICROBATCH_MAX_SIZE", 8)
+    monkeypatch.setattr(main, "detector", old)
+
+    async def submit(text):
+        # the batch runs after a reload: it uses the new model
+        main.detector = new
+        return {"language": "Python", "model_version": "new"}
+
+    monkeypatch.setattr(main.batcher, "submit", submit)
+    result = asyncio.run(main._predict_one("x = 1"))
+    assert result["model_version"] == "new"
+    assert c.version == "new"
+    assert c.get(main._prediction_key("x = 1", "new")) == result
+    assert c.get(main._prediction_key("x = 1", "old")) is None
+
+    # a result from a model that is no longer live is not cached, and does not rebind
+    main.detector = old
+    main._cache_result("y = 2", {"language": "Python", "model_version": "new"})
+    assert c.version == "new" and c.get(main._prediction_key("y = 2", "new")) is None
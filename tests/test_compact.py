@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from backend.app.compact import CompactModel, export_compact, load_compact, save_compact
+from backend.app.mmap_store import remove
+from backend.app.model import LanguageDetector, compact_path, load_detector, save_detector
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+
+def _corpus():
+    X_train, _ = build_sample_dataset()
+    X_eval, _ = build_eval_dataset()
+    texts = list(dict.fromkeys(X_train + X_eval))
+    return texts + ["", "plain words only", "ÜNÏCÖDÉ wörds", "\n".join(texts[:5])]
+
+
+@pytest.fixture(scope="module")
+def calibrated():
+    # same model shape as backend/train.py
+    X, y = build_sample_dataset()
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 3), max_features=10000)),
+        ("clf", LogisticRegression(max_iter=800)),
+    ])
+    return CalibratedClassifierCV(pipeline, cv=3, method="isotonic").fit(X, y)
+
+
+def test_compact_matches_sklearn(calibrated):
+    compact = export_compact(calibrated)
+    texts = _corpus()
+    np.testing.assert_allclose(compact.predict_proba(texts), calibrated.predict_proba(texts), rtol=0, atol=1e-12)
+    assert list(compact.classes_) == list(calibrated.classes_)
+    assert list(compact.predict(texts)) == list(calibrated.predict(texts))
+
+    sk, fast = LanguageDetector(calibrated), LanguageDetector(compact)
+    assert fast.predict_batch(texts) == sk.predict_batch(texts)
+    assert [fast.predict_text(t) for t in texts[:20]] == sk.predict_batch(texts[:20])
+
+
+def test_saved_export_is_loaded_only_for_its_model(calibrated, tmp_path):
+    path = tmp_path / "lang_detector.joblib"
+    save_detector(calibrated, path)
+    assert compact_path(path).exists()
+    detector = load_detector(path)
+    assert isinstance(detector.pipeline, CompactModel)
+    # the weights are mapped from the export, not copied into the process
+    assert isinstance(detector.pipeline.coef, np.memmap)
+    texts = _corpus()
+    assert detector.predict_batch(texts) == LanguageDetector(calibrated).predict_batch(texts)
+
+    # a different model at the same path makes the old export stale
+    X, y = build_sample_dataset()
+    plain = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression(max_iter=200))]).fit(X, y)
+    save_detector(plain, path)
+    assert not compact_path(path).exists()
+    assert isinstance(load_detector(path).pipeline, Pipeline)
+
+
+def test_export_rejects_unsupported_models(calibrated):
+    X, y = build_sample_dataset()
+    plain = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression(max_iter=200))]).fit(X, y)
+    with pytest.raises(ValueError):
+        export_compact(plain)
+    sigmoid = CalibratedClassifierCV(plain, cv=3, method="sigmoid").fit(X, y)
+    with pytest.raises(ValueError):
+        export_compact(sigmoid)
+
+
+def test_legacy_npz_export_is_still_used(calibrated, tmp_path):
+    path = tmp_path / "lang_detector.joblib"
+    save_detector(calibrated, path)
+    compact = load_compact(compact_path(path))
+    remove(compact_path(path))
+    save_compact(compact, path.with_suffix(".npz"))
+    detector = load_detector(path)
+    assert isinstance(detector.pipeline, CompactModel)
+    assert not isinstance(detector.pipeline.coef, np.memmap)
+    texts = _corpus()
+    assert detector.predict_batch(texts) == LanguageDetector(calibrated).predict_batch(texts)
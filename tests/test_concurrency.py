@@ -0,0 +1,59 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import executors, main, ocr
+
+OCR_SECONDS = 1.0
+
+
+def _slow_ocr(file_bytes, engines=None, timings=None, preprocess="fast", max_pixels=None):
+    # stands in for a multi-second EasyOCR / Tesseract call
+    time.sleep(OCR_SECONDS)
+    return "def slow(x):\n    return x"
+
+
+def test_health_and_text_requests_not_blocked_by_ocr(monkeypatch):
+    # in-process OCR threads, so the slow stand-in does not need to be importable by workers
+    monkeypatch.setattr(executors, "OCR_PROCESSES", 0)
+    monkeypatch.setattr(ocr, "image_to_text", _slow_ocr)
+    monkeypatch.setattr(executors, "_ocr_executor", executors.ThreadPoolExecutor(max_workers=2))
+
+    async def timed(coro):
+        t0 = time.perf_counter()
+        r = await coro
+        return r, time.perf_counter() - t0
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            images = [
+                asyncio.ensure_future(
+                    timed(client.post("/detect-language", files={"file": ("a.png", b"fake", "image/png")}))
+                )
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0.1)
+            health, health_s = await timed(client.get("/health"))
+            text, text_s = await timed(client.post("/detect-language", data={"text": "SELECT a FROM t;"}))
+            images_pending = not any(f.done() for f in images)
+            image_results = await asyncio.gather(*images)
+        return health, health_s, text, text_s, images_pending, image_results
+
+    health, health_s, text, text_s, images_pending, image_results = asyncio.run(run())
+    executors.shutdown()
+
+    assert health.status_code == 200 and text.status_code == 200
+    assert images_pending
+    assert health_s < OCR_SECONDS / 2 and text_s < OCR_SECONDS / 2
+    for r, elapsed in image_results:
+        assert r.status_code == 200 and r.json()["language"] == "Python"
+        assert elapsed >= OCR_SECONDS
@@ -0,0 +1,72 @@
+import json
+import sys
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from backend.app.model import LanguageDetector, load_detector, save_detector
+from backend.dataset import iter_labeled
+from backend.evaluate import Tally, build_eval_dataset, evaluate, evaluate_cascade
+from backend.train import build_sample_dataset
+
+
+def test_tally_report():
+    tally = Tally()
+    for truth, predicted, confidence in [("Go", "Go", 0.95), ("Go", "C", 0.55), ("C", "C", 0.9), ("C", "C", 0.91)]:
+        tally.add(truth, predicted, confidence)
+    other = Tally()
+    other.add("Go", "Go", 0.25)
+    tally.merge(other)
+    report = tally.report()
+    assert report["accuracy"] == 0.8
+    assert report["per_class"]["Go"] == {"precision": 1.0, "recall": 0.6667, "f1-score": 0.8, "support": 3}
+    assert report["per_class"]["C"]["precision"] == 0.6667
+    assert sum(b["count"] for b in report["reliability"]) == 5
+    assert 0.0 <= report["ece"] <= 1.0
+
+
+def test_evaluate_scores_raw_and_fused_in_one_pass():
+    X, y = build_eval_dataset()
+    detector = load_detector()
+    out = evaluate(zip(X, y), batch_size=16, latency_rate=0.2)
+
+    probs = detector.pipeline.predict_proba(X)
+    raw = detector.pipeline.classes_[probs.argmax(axis=1)]
+    assert out["samples"] == len(X)
+    assert out["raw"]["accuracy"] == round(float((raw == y).mean()), 4) == out["accuracy"]
+    fused = [r["language"] for r in detector.predict_batch(X)]
+    assert out["fused"]["accuracy"] == round(sum(p == t for p, t in zip(fused, y)) / len(y), 4)
+    assert set(out["latency"]) <= set(y) and all(v["n"] > 0 for v in out["latency"].values())
+
+    parallel = evaluate(zip(X, y), jobs=2, batch_size=16, latency_rate=0.0)
+    assert parallel["raw"] == out["raw"] and parallel["fused"] == out["fused"]
+
+
+def test_evaluate_cascade_scores_the_given_corpus_and_model(tmp_path):
+    X, y = build_sample_dataset()
+    pipeline = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression(max_iter=200))])
+    pipeline.fit(X, y)
+    model_path = tmp_path / "model.joblib"
+    save_detector(pipeline, model_path)
+    data = tmp_path / "corpus.jsonl"
+    data.write_text("".join(json.dumps({"text": text, "language": label}) + "\n"
+                            for text, label in zip(*build_eval_dataset())))
+    texts, labels = zip(*iter_labeled(data))
+
+    rows = evaluate_cascade(iter_labeled(data), [0.5, 100.0], batch_size=4, model_path=model_path)
+    assert [row["margin"] for row in rows] == [None, 0.5, 100.0]
+    for row in rows:
+        detector = LanguageDetector(pipeline, cascade_margin=row["margin"])
+        results = detector.predict_batch(list(texts))
+        skipped = [r["indicators"][-1].startswith("cascade:") for r in results]
+        assert row["accuracy"] == round(sum(r["language"] == t for r, t in zip(results, labels)) / len(texts), 4)
+        assert row["syntax_share"] == round(sum(skipped) / len(texts), 4)
+    assert rows[0]["syntax_accuracy"] is None and rows[2]["syntax_share"] == 0.0
+    assert rows[1]["syntax_share"] > 0
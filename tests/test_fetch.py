@@ -0,0 +1,135 @@
+import hashlib
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import model
+from backend.app.fetch import fetch_model
+from backend.app.hashed import HashedModel, save_hashed, train_hashed
+from backend.train import build_sample_dataset
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves ``server.payload`` with an ETag and byte ranges; can drop a response midway."""
+
+    def do_GET(self):
+        srv = self.server
+        srv.ranges.append(self.headers.get("Range"))
+        data, start, status = srv.payload, 0, 200
+        if self.headers.get("Range") and self.headers.get("If-Range") == srv.etag:
+            start, status = int(self.headers["Range"].split("=")[1].split("-")[0]), 206
+        body = data[start:]
+        self.send_response(status)
+        self.send_header("ETag", srv.etag)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+        if srv.cut_after is not None:
+            # send part of the body, then close the connection
+            self.wfile.write(body[:srv.cut_after])
+            srv.cut_after = None
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.payload, srv.etag, srv.cut_after, srv.ranges = PAYLOAD, '"v1"', None, []
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/lang_detector.joblib"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_download_is_verified_cached_and_reused(server, tmp_path):
+    digest = hashlib.sha256(PAYLOAD).hexdigest()
+    first = fetch_model(server.url, tmp_path / "a" / "model.joblib", tmp_path / "cache", sha256=digest)
+    assert first.read_bytes() == PAYLOAD
+    assert (tmp_path / "cache" / "sha256" / digest).read_bytes() == PAYLOAD
+    assert server.ranges == [None]
+
+    # another worker / container sharing the cache: no second download, with or without the digest
+    fetch_model(server.url, tmp_path / "b" / "model.joblib", tmp_path / "cache", sha256=digest)
+    fetch_model(server.url, tmp_path / "c" / "model.joblib", tmp_path / "cache")
+    assert (tmp_path / "c" / "model.joblib").read_bytes() == PAYLOAD
+    assert server.ranges == [None]
+    assert not list((tmp_path / "cache" / "partial").iterdir())
+
+
+def test_digest_mismatch_is_rejected(server, tmp_path):
+    dest = tmp_path / "model.joblib"
+    with pytest.raises(ValueError, match="sha256"):
+        fetch_model(server.url, dest, tmp_path / "cache", sha256="0" * 64)
+    assert not dest.exists()
+    assert not (tmp_path / "cache" / "sha256").exists()
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    server.cut_after = 300_000
+    dest = fetch_model(server.url, tmp_path / "model.joblib", tmp_path / "cache",
+                       sha256=hashlib.sha256(PAYLOAD).hexdigest())
+    assert dest.read_bytes() == PAYLOAD
+    assert len(server.ranges) == 2 and server.ranges[0] is None
+    # resumed after the bytes received before the cut
+    assert 0 < int(server.ranges[1].split("=")[1].rstrip("-")) <= 300_000
+
+
+def test_changed_artifact_restarts_from_zero(server, tmp_path):
+    server.cut_after = 300_000
+    with pytest.raises(OSError):
+        fetch_model(server.url, tmp_path / "model.joblib", tmp_path / "cache", attempts=1)
+    # the artifact was replaced between the two attempts: If-Range no longer matches
+    server.payload, server.etag = PAYLOAD[::-1], '"v2"'
+    dest = fetch_model(server.url, tmp_path / "model.joblib", tmp_path / "cache")
+    assert dest.read_bytes() == PAYLOAD[::-1]
+    assert len(server.ranges) == 2 and server.ranges[1].startswith("bytes=")
+
+
+def test_concurrent_fetches_download_once(server, tmp_path):
+    errors = []
+
+    def fetch(i):
+        try:
+            fetch_model(server.url, tmp_path / str(i) / "model.joblib", tmp_path / "cache")
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=fetch, args=(i,)) for i in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert not errors
+    assert server.ranges == [None]
+    assert all((tmp_path / str(i) / "model.joblib").read_bytes() == PAYLOAD for i in range(4))
+
+
+def test_load_detector_fetches_model_url(server, tmp_path, monkeypatch):
+    X, y = build_sample_dataset()
+    artifact = tmp_path / "served.npz"
+    save_hashed(train_hashed(X, y, config={"n_features": 2 ** 12}), artifact)
+    server.payload = artifact.read_bytes()
+    monkeypatch.setattr(model, "MODEL_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setenv("MODEL_URL", server.url)
+    monkeypatch.setenv("MODEL_SHA256", hashlib.sha256(server.payload).hexdigest())
+
+    detector = model.load_detector(tmp_path / "models" / "lang_detector_hashed.npz")
+    assert isinstance(detector.pipeline, HashedModel)
+    # a file with the right digest is used without asking the server again
+    model.load_detector(tmp_path / "models" / "lang_detector_hashed.npz")
+    assert server.ranges == [None]
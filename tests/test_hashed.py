@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.hashed import HashedModel, load_hashed, save_hashed, train_hashed
+from backend.app.model import load_detector
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+
+@pytest.fixture(scope="module")
+def hashed():
+    X, y = build_sample_dataset()
+    return train_hashed(X, y, config={"n_features": 2 ** 16})
+
+
+@pytest.mark.parametrize("name", ["model.npz", "model.mmap"])
+def test_save_load_round_trip(hashed, tmp_path, name):
+    path = tmp_path / name
+    save_hashed(hashed, path)
+    loaded = load_hashed(path)
+    X_eval, y_eval = build_eval_dataset()
+    texts = X_eval + ["", "plain words only", "ÜNÏCÖDÉ wörds"]
+    np.testing.assert_array_equal(loaded.predict_proba(texts), hashed.predict_proba(texts))
+    assert list(loaded.classes_) == list(hashed.classes_)
+    assert loaded.config == hashed.config
+    # probabilities, and good enough to be a replacement
+    np.testing.assert_allclose(loaded.predict_proba(texts).sum(axis=1), 1.0)
+    assert np.mean(loaded.predict(X_eval) == np.array(y_eval)) > 0.8
+
+
+def test_binary_scores_both_classes(hashed):
+    X, y = build_sample_dataset()
+    labels = ["Python" if label == "Python" else "Other" for label in y]
+    model = train_hashed(X, labels, config={"n_features": 2 ** 12})
+    proba = model.predict_proba(X)
+    assert proba.shape == (len(X), 2)
+    assert np.mean(model.predict(X) == np.array(labels)) > 0.9
+
+
+@pytest.mark.parametrize("name", ["lang_detector_hashed.npz", "lang_detector_hashed.mmap"])
+def test_load_detector_serves_numpy_models(hashed, tmp_path, name):
+    path = tmp_path / name
+    save_hashed(hashed, path)
+    detector = load_detector(path)
+    assert isinstance(detector.pipeline, HashedModel)
+    assert detector.version
+    result = detector.predict_text("def main():\n    import os\n    print(os.getcwd())\n")
+    assert result["language"] == "Python"
+
+
+def test_other_npz_is_rejected(tmp_path):
+    # e.g. the compact export that sits next to a joblib model
+    path = tmp_path / "lang_detector.npz"
+    np.savez(path, classes=np.array(["Python"]), coef=np.zeros((1, 1)))
+    with pytest.raises(ValueError):
+        load_hashed(path)
+
+
+def test_n_features_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        train_hashed(["a b"], ["x"], config={"n_features": 1000})
+
+
+def test_mmap_layout_is_shared_and_replaced_atomically(hashed, tmp_path):
+    path = tmp_path / "model.mmap"
+    save_hashed(hashed, path)
+    first = load_hashed(path)
+    assert isinstance(first.idf, np.memmap) and not first.idf.flags.writeable
+    texts, _ = build_eval_dataset()
+    before = first.predict_proba(texts)
+
+    X, y = build_sample_dataset()
+    save_hashed(train_hashed(X, y, C=1.0, config={"n_features": 2 ** 16}), path)
+    # the old maps still read the old files; a new load sees the new model
+    np.testing.assert_array_equal(first.predict_proba(texts), before)
+    assert not np.array_equal(load_hashed(path).predict_proba(texts), before)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model.mmap"]
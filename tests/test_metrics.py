@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi.testclient import TestClient
+
+from backend.app import executors, main, metrics, ocr
+
+
+def test_prometheus_text_format():
+    requests = metrics.counter("test_requests_total", "Requests", ("method",))
+    requests.labels(method="GET").inc()
+    requests.labels(method="POST").inc(2)
+    latency = metrics.histogram("test_latency_seconds", "Latency", [0.1, 1.0])
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = metrics.render_prometheus()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{method="GET"} 1.0\n' in text
+    assert 'test_requests_total{method="POST"} 2.0\n' in text
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 2\n' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "test_latency_seconds_sum 0.55\n" in text and "test_latency_seconds_count 2\n" in text
+    assert metrics.snapshot()["test_requests_total"] == {"method=GET": 1.0, "method=POST": 2.0}
+
+
+def test_stage_timings_in_server_timing_and_metrics(monkeypatch):
+    # unbatched, uncached inference so the model stages run in the request's context
+    monkeypatch.setattr(main, "MICROBATCH_MAX_SIZE", 1)
+    monkeypatch.setattr(main, "prediction_cache", None)
+    monkeypatch.setattr(main, "ocr_cache", None)
+    monkeypatch.setattr(executors, "OCR_PROCESSES", 0)
+    monkeypatch.setattr(ocr, "_default_engines", [])
+    client = TestClient(main.app)
+
+    r = client.post(
+        "/detect-language",
+        data={"text": "def add(a, b):\n    return a + b"},
+        files={"file": ("code.png", ocr.warmup_image(), "image/png")},
+    )
+    assert r.status_code == 200 and r.json()["language"] == "Python"
+    stages = {entry.split(";")[0].strip() for entry in r.headers["server-timing"].split(",")}
+    assert {"parse", "ocr", "ocr_decode", "ocr_preprocess", "inference",
+            "predict_proba", "syntax", "indicators", "fusion", "total"} <= stages
+
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for line in (
+        'detect_stage_seconds_count{stage="syntax"}',
+        'detect_stage_seconds_count{stage="ocr_preprocess"}',
+        'detect_language_total{language="Python"}',
+        'ocr_backend_total{backend="none"}',
+        "detect_input_chars_count",
+        "detect_image_bytes_count",
+    ):
+        assert line in r.text
+    assert "server-timing" not in client.get("/health").headers
@@ -0,0 +1,150 @@
+import sys
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from backend.app.model import LanguageDetector, _window_order, load_detector
+from backend.evaluate import build_eval_dataset
+from backend.train import build_sample_dataset
+
+
+def _corpus():
+    X_train, _ = build_sample_dataset()
+    X_eval, _ = build_eval_dataset()
+    texts = list(dict.fromkeys(X_train + X_eval))
+    texts += ["", "   ", "plain words only", "\n".join(texts[:5])]
+    return texts
+
+
+def test_predict_batch_matches_predict_text():
+    detector = load_detector()
+    texts = _corpus()
+    assert detector.predict_batch(texts) == [detector.predict_text(t) for t in texts]
+
+
+def test_predict_batch_with_plain_pipeline():
+    X, y = build_sample_dataset()
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2))),
+        ("clf", LogisticRegression(max_iter=200)),
+    ])
+    pipeline.fit(X, y)
+    detector = LanguageDetector(pipeline)
+    texts = _corpus()
+    assert detector.predict_batch(texts) == [detector.predict_text(t) for t in texts]
+    assert detector.predict_batch([]) == []
+
+
+class CountingPipeline:
+    """Wraps a pipeline and records how many texts and characters it classified."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.classes_ = pipeline.classes_
+        self.lengths = []
+
+    def predict_proba(self, texts):
+        self.lengths.extend(len(t) for t in texts)
+        return self.pipeline.predict_proba(texts)
+
+
+def test_large_input_is_classified_from_bounded_windows():
+    snippet = "def add(a, b):\n    return a + b\n\nimport os\nprint(os.getcwd())\n"
+    text = snippet * 20000  # ~1.2 MB
+    pipeline = CountingPipeline(load_detector().pipeline)
+    detector = LanguageDetector(pipeline, version="test", window_threshold=8192, window_chars=1024, max_windows=16)
+
+    result = detector.predict_text(text)
+    assert result["language"] == "Python"
+    assert result["raw_text"] == text[:1024]
+    assert max(pipeline.lengths) <= 1024
+    # a uniform input is stable after two rounds past the first
+    assert len(pipeline.lengths) < 16
+    assert result["indicators"][-1].startswith(f"windowed: {len(pipeline.lengths)} of ")
+
+    assert detector.predict_batch(["puts 'hi'", text]) == [detector.predict_text("puts 'hi'"), result]
+
+
+def test_windowing_can_be_disabled():
+    text = "SELECT id FROM users WHERE name = 'x';\n" * 500
+    pipeline = CountingPipeline(load_detector().pipeline)
+    detector = LanguageDetector(pipeline, version="test", window_threshold=None)
+    result = detector.predict_text(text)
+    assert pipeline.lengths == [len(text)]
+    assert result["raw_text"] == text
+    assert not any(i.startswith("windowed:") for i in result["indicators"])
+
+
+class LabelessPipeline:
+    """A pipeline that exposes no ``classes_``, like some third-party wrappers."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def predict_proba(self, texts):
+        return self.pipeline.predict_proba(texts)
+
+    def predict(self, texts):
+        return self.pipeline.predict(texts)
+
+
+def test_windowed_input_without_class_labels_reads_the_first_window():
+    text = "SELECT id FROM users WHERE name = 'x';\n" * 100
+    pipeline = LabelessPipeline(load_detector().pipeline)
+    # windows wider than the threshold are clamped to it
+    detector = LanguageDetector(pipeline, version="test", window_threshold=512, window_chars=4096)
+    assert detector.window_chars == 512
+
+    result = detector.predict_text(text)
+    assert result["raw_text"] == text[:512]
+    assert result["indicators"][-1] == f"windowed: 1 of {-(-len(text) // 512)} windows of 512 chars"
+
+    # and the first window is never windowed again, whatever window_chars is set to
+    detector.window_chars = 4096
+    result = detector.predict_text(text)
+    assert result["raw_text"] == text
+    assert result["indicators"][-1] == "windowed: 1 of 1 windows of 4096 chars"
+
+
+def test_window_order_covers_ends_then_middle():
+    assert _window_order(1) == [0]
+    assert _window_order(9)[:5] == [0, 8, 4, 2, 6]
+    assert sorted(_window_order(9)) == list(range(9))
+    assert sorted(_window_order(100)) == list(range(100))
+
+
+def test_cascade_skips_model_when_rules_are_decisive():
+    pipeline = CountingPipeline(load_detector().pipeline)
+    detector = LanguageDetector(pipeline, version="test", cascade_margin=0.5)
+    decisive = "#include <stdio.h>\nint main(){ printf(\"hi\"); }"
+    close = "def foo(a,b):\n    return a+b"
+
+    result = detector.predict_text(decisive)
+    assert pipeline.lengths == []
+    assert result["language"] == "C" and 0 < result["confidence"] <= 0.999
+    assert result["indicators"][-1].startswith("cascade: rule lead=")
+
+    assert detector.predict_text(close) == LanguageDetector(pipeline.pipeline, version="test").predict_text(close)
+    assert pipeline.lengths == [len(close)]
+
+    texts = _corpus()
+    assert detector.predict_batch(texts) == [detector.predict_text(t) for t in texts]
+
+
+def test_cascade_confidence_grows_with_matched_rule_weight():
+    from backend.app.syntax_rules import DEFAULT_RULESET
+
+    detector = LanguageDetector(load_detector().pipeline, version="test", cascade_margin=0.25)
+    totals = [0.0] * len(DEFAULT_RULESET.languages)
+    totals[0] = 0.3  # one weak rule, nothing else matched
+    weak = detector._cascade("x", totals)["confidence"]
+    totals[0] = 6.0
+    strong = detector._cascade("x", totals)["confidence"]
+    assert weak < 0.3 < 0.8 < strong <= 0.999
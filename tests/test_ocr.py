@@ -0,0 +1,163 @@
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import ocr
+
+CODE = "def add(a, b):\n    return a + b\n\nprint(add(1, 2))"
+
+
+def _encode(img, fmt, **kwargs):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+def _page(size, origin, background=245, ink=20, font_size=40):
+    img = Image.new("RGB", size, (background,) * 3)
+    font = ImageFont.load_default(size=font_size)
+    ImageDraw.Draw(img).multiline_text(origin, CODE, font=font, fill=(ink,) * 3, spacing=10)
+    return img
+
+
+class _Recorder:
+    name = "recorder"
+
+    def __init__(self):
+        self.images = []
+
+    def read(self, img):
+        self.images.append(img)
+        return "text"
+
+
+def test_large_jpeg_is_decoded_at_reduced_size_in_grayscale():
+    data = _encode(_page((4000, 3000), (100, 100)), "JPEG", quality=90)
+    img = ocr.decode_image(data)
+    assert img.mode == "L"
+    assert ocr.MAX_WIDTH <= img.width < 2 * ocr.MAX_WIDTH
+    assert abs(img.width / img.height - 4 / 3) < 0.01
+
+
+def test_decode_applies_exif_orientation():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # stored landscape, displayed portrait
+    data = _encode(_page((3000, 2000), (100, 100)), "JPEG", exif=exif)
+    img = ocr.decode_image(data)
+    assert img.height > img.width >= ocr.MAX_WIDTH
+
+
+def test_pixel_limit_rejects_before_decoding():
+    data = _encode(Image.new("L", (3000, 3000), 255), "PNG")
+    engine = _Recorder()
+    for mode in ocr.PREPROCESS_MODES:
+        assert ocr.image_to_text(data, [engine], preprocess=mode, max_pixels=1_000_000) == ""
+    assert engine.images == []
+    assert ocr.image_to_text(data, [engine], max_pixels=10_000_000) == "text"
+
+
+def test_text_bbox_finds_the_code_block():
+    for background, ink in ((245, 20), (30, 220)):  # light and dark themes
+        img = _page((1600, 1200), (900, 700), background, ink, font_size=24).convert("L")
+        left, top, right, bottom = ocr.text_bbox(img)
+        assert 840 <= left <= 900 and 640 <= top <= 700
+        assert right > 1050 and bottom > 800
+        assert (right - left) * (bottom - top) < 0.25 * img.width * img.height
+
+
+def test_no_crop_for_blank_or_full_images():
+    assert ocr.text_bbox(Image.new("L", (800, 600), 255)) is None
+    page = _page((600, 400), (10, 10), font_size=30)
+    _, _, right, bottom = ImageDraw.Draw(page).multiline_textbbox(
+        (10, 10), CODE, font=ImageFont.load_default(size=30), spacing=10)
+    full = page.crop((8, 14, right + 2, bottom + 2)).convert("L")
+    assert ocr.crop_to_text(full).size == full.size
+
+
+def test_fast_mode_hands_only_the_text_region_to_the_engine():
+    data = _encode(_page((1920, 1080), (1200, 700), font_size=20), "PNG")
+    fast, full = _Recorder(), _Recorder()
+    ocr.image_to_text(data, [fast], preprocess="fast")
+    ocr.image_to_text(data, [full], preprocess="full")
+    (fast_img,), (full_img,) = fast.images, full.images
+    assert full_img.width == ocr.MAX_WIDTH
+    assert fast_img.width * fast_img.height < 0.2 * full_img.width * full_img.height
+
+
+def _bars(n, line_height=30):
+    """A tall image of ``n`` dashed bars, bar ``i`` having ``i + 4`` dashes."""
+    img = Image.new("L", (1000, 20 + n * line_height), 255)
+    draw = ImageDraw.Draw(img)
+    for i in range(n):
+        y = 20 + i * line_height
+        for d in range(i + 4):
+            draw.rectangle((20 + 8 * d, y, 23 + 8 * d, y + 15), fill=0)
+    return img
+
+
+def _read_bars(img):
+    """Stand-in engine for ``_bars``: one ``line <i>`` per bar, from its length."""
+    import numpy as np
+
+    ink = np.asarray(img) < 128
+    rows = ink.any(axis=1)
+    out, y = [], 0
+    while y < len(rows):
+        if rows[y]:
+            end = y
+            while end < len(rows) and rows[end]:
+                end += 1
+            right = np.flatnonzero(ink[y:end].any(axis=0))[-1]
+            out.append(f"line {(right - 23) // 8 - 3}")
+            y = end
+        y += 1
+    return "\n".join(out)
+
+
+def test_split_bands_cuts_on_blank_rows_with_overlap():
+    img = _bars(100)
+    bands = ocr.split_bands(img, band_height=400, overlap=64)
+    assert len(bands) >= 5 and bands[0][0] == 0 and bands[-1][1] == img.height
+    for (top, bottom, _), (next_top, _, shared) in zip(bands, bands[1:]):
+        assert next_top < bottom and bottom - next_top <= 64 + 1
+        # cut between bars: the row is blank
+        assert img.crop((0, next_top, img.width, next_top + 1)).getextrema() == (255, 255)
+        assert shared == 2
+    assert ocr.split_bands(img, band_height=10_000) == [(0, img.height, 0)]
+
+
+def test_stitch_drops_repeated_overlap_lines_only():
+    assert ocr.stitch(["a = 1\nb = 2\nc = 3", "b = 2\nc = 3\nd = 4"], [0, 2]) == "a = 1\nb = 2\nc = 3\nd = 4"
+    # OCR may read the repeated line slightly differently
+    assert ocr.stitch(["x = foo(1)\nreturn bar", "return bar;\ny = 2"], [0, 1]) == "x = foo(1)\nreturn bar\ny = 2"
+    # a repeated line is kept when the overlap had no text
+    assert ocr.stitch(["  }\n}", "}\nmain()"], [0, 0]) == "}\n}\n}\nmain()"
+
+
+def test_run_tiled_reads_bands_in_parallel_and_stitches_in_order():
+    from backend.app.ocr_pool import OCRWorkerPool
+
+    img = _bars(60)
+    pool = OCRWorkerPool(size=3, preprocess="none")
+    seen = []
+
+    def run(file_bytes, retries=1, timings=None, preprocess=None):
+        band = Image.open(io.BytesIO(file_bytes))
+        seen.append((band.height, preprocess))
+        timings.update({"backend": "recorder", "recorder": 0.5})
+        return _read_bars(band)
+
+    pool.run = run
+    timings = {}
+    text = pool.run_tiled(_encode(img, "PNG"), band_height=400, overlap=64, timings=timings)
+    assert text == "\n".join(f"line {i}" for i in range(60))
+    assert len(seen) > 3 and all(h < 600 and mode == "none" for h, mode in seen)
+    assert timings["backend"] == "recorder" and timings["recorder"] == 0.5 * len(seen)
+    assert {"decode", "split"} <= set(timings)
@@ -0,0 +1,90 @@
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.ocr_pool import OCRUnavailable, OCRWorkerPool
+
+
+def _wait_for(predicate, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _ready(pool, n):
+    return lambda: sum(w["state"] == "idle" for w in pool.stats()) == n
+
+
+def test_workers_warm_up_and_report_stats():
+    # tesseract is optional here: without the binary workers load no engine and return ""
+    pool = OCRWorkerPool(size=2, backend="tesseract")
+    try:
+        pool.start()
+        assert _wait_for(_ready(pool, 2))
+        stats = pool.stats()
+        assert len({w["pid"] for w in stats}) == 2
+        assert all(w["load_seconds"] is not None and w["jobs"] == 0 for w in stats)
+
+        assert pool.run(b"not an image") == ""
+        assert sum(w["jobs"] for w in pool.stats()) == 1
+    finally:
+        pool.shutdown()
+
+
+def test_worker_is_recycled_after_max_jobs():
+    pool = OCRWorkerPool(size=1, backend="tesseract", max_jobs=2)
+    try:
+        pool.start()
+        assert _wait_for(_ready(pool, 1))
+        first_pid = pool.stats()[0]["pid"]
+        pool.run(b"x")
+        pool.run(b"x")
+        assert _wait_for(lambda: [w["pid"] for w in pool.stats()] not in ([], [first_pid]))
+        assert pool.run(b"x") == ""
+        assert pool.recycled.value >= 1
+    finally:
+        pool.shutdown()
+
+
+def test_crashed_worker_is_replaced_without_touching_others():
+    pool = OCRWorkerPool(size=2, backend="tesseract")
+    try:
+        pool.start()
+        assert _wait_for(_ready(pool, 2))
+        pids = [w["pid"] for w in pool.stats()]
+        os.kill(pids[0], signal.SIGKILL)
+
+        # whichever worker picks these up, every call still returns and the dead one is replaced
+        for _ in range(3):
+            assert pool.run(b"x") == ""
+        assert _wait_for(lambda: pids[0] not in [w["pid"] for w in pool.stats()] and _ready(pool, 2)())
+        assert pids[1] in [w["pid"] for w in pool.stats()]
+    finally:
+        pool.shutdown()
+
+
+def test_request_without_an_idle_worker_times_out():
+    pool = OCRWorkerPool(size=1, backend="tesseract", acquire_timeout=0.2)
+    # no worker ever becomes ready
+    pool._spawn = lambda: None
+    before = pool.acquire_timeouts.value
+    try:
+        started = time.time()
+        with pytest.raises(OCRUnavailable):
+            pool.run(b"x")
+        assert time.time() - started < 5
+        assert pool.acquire_timeouts.value == before + 1
+    finally:
+        pool.shutdown()
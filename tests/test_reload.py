@@ -0,0 +1,158 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi.testclient import TestClient
+
+from backend.app import executors, main
+from backend.app.hashed import save_hashed, train_hashed
+from backend.train import build_sample_dataset
+
+TOKEN = {"X-Admin-Token": "secret"}
+
+
+def _save_model(path, C=10.0, shift=0):
+    X, y = build_sample_dataset()
+    labels = sorted(set(y))
+    # shift > 0 trains a model that names the wrong language for everything
+    y = [labels[(labels.index(label) + shift) % len(labels)] for label in y]
+    save_hashed(train_hashed(X, y, C=C, config={"n_features": 2 ** 16}), path)
+
+
+@pytest.fixture
+def serving(monkeypatch, tmp_path):
+    path = tmp_path / "lang_detector_hashed.npz"
+    _save_model(path)
+    monkeypatch.setattr(main, "MODEL_PATH", path)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(main, "detector", None)
+    monkeypatch.setattr(main, "_startup", {"status": "loading"})
+    monkeypatch.setattr(executors, "OCR_PROCESSES", 0)
+    main.ensure_detector()
+    return path
+
+
+def _detect(client):
+    r = client.post("/detect-language", data={"text": "def add(a, b):\n    return a + b"})
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_reload_swaps_model_and_reports_version(serving):
+    client = TestClient(main.app)
+    before = main.detector
+    assert _detect(client)["model_version"] == before.version
+
+    _save_model(serving, C=30.0)
+    r = client.post("/admin/reload-model", headers=TOKEN)
+    assert r.status_code == 200 and r.json()["status"] == "reloaded"
+    assert r.json()["previous_version"] == before.version
+    after = main.detector
+    assert after is not before and r.json()["model_version"] == after.version
+    # requests holding the old detector can still finish on it
+    assert before.predict_text("print(1)")["language"]
+
+    assert _detect(client)["model_version"] == after.version
+    batch = client.post("/detect-language/batch", json=["print(1)", "SELECT 1;"]).json()
+    assert {item["model_version"] for item in batch} == {after.version}
+    assert client.get("/ready").json()["model_version"] == after.version
+    text = client.get("/metrics").text
+    assert f'model_info{{version="{after.version}"}} 1.0' in text
+    assert before.version not in text
+    assert 'model_reload_total{result="reloaded"}' in text
+
+    r = client.post("/admin/reload-model", headers=TOKEN)
+    assert r.status_code == 200 and r.json()["status"] == "unchanged"
+
+
+@pytest.mark.parametrize("broken", ["garbage", "wrong_labels"])
+def test_failed_reload_keeps_current_model(serving, broken):
+    client = TestClient(main.app)
+    before = main.detector
+    if broken == "garbage":
+        serving.write_bytes(b"not a model")
+    else:
+        _save_model(serving, shift=1)
+    r = client.post("/admin/reload-model", headers=TOKEN)
+    assert r.status_code == 422 and r.json()["status"] == "failed"
+    assert r.json()["model_version"] == before.version
+    assert main.detector is before
+    assert _detect(client)["model_version"] == before.version
+
+
+def test_admin_endpoint_requires_token(serving, monkeypatch):
+    client = TestClient(main.app)
+    assert client.post("/admin/reload-model").status_code == 403
+    assert client.post("/admin/reload-model", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    with main._reload_lock:
+        assert client.post("/admin/reload-model", headers=TOKEN).status_code == 409
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload-model", headers=TOKEN).status_code == 404
+
+
+def test_watcher_reloads_changed_file(serving, monkeypatch):
+    monkeypatch.setattr(main, "MODEL_WATCH_INTERVAL", 0.05)
+    before = main.detector
+    stop = threading.Event()
+    watcher = threading.Thread(target=main._watch_model, args=(stop,), daemon=True)
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        assert main.detector is before
+        _save_model(serving, C=30.0)
+        deadline = time.time() + 30
+        while main.detector is before and time.time() < deadline:
+            time.sleep(0.05)
+        assert main.detector is not before
+    finally:
+        stop.set()
+        watcher.join(5)
+
+
+def test_watcher_waits_for_the_compact_sidecar(serving, monkeypatch, tmp_path):
+    import hashlib
+
+    import joblib
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    from backend.app.compact import CompactModel, export_compact, save_compact
+    from backend.app.model import compact_path
+
+    X, y = build_sample_dataset()
+    pipeline = CalibratedClassifierCV(Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 3), max_features=10000)),
+        ("clf", LogisticRegression(max_iter=800)),
+    ]), cv=3, method="isotonic").fit(X, y)
+    path = tmp_path / "lang_detector.joblib"
+    monkeypatch.setattr(main, "MODEL_PATH", path)
+    monkeypatch.setattr(main, "MODEL_WATCH_INTERVAL", 0.05)
+    stop = threading.Event()
+    watcher = threading.Thread(target=main._watch_model, args=(stop,), daemon=True)
+    watcher.start()
+    try:
+        # save_detector's order: the joblib first, its compact export after
+        joblib.dump(pipeline, path)
+        deadline = time.time() + 30
+        while not isinstance(main.detector.pipeline, CalibratedClassifierCV) and time.time() < deadline:
+            time.sleep(0.05)
+        assert isinstance(main.detector.pipeline, CalibratedClassifierCV)
+        source = hashlib.sha256(path.read_bytes()).hexdigest()
+        save_compact(export_compact(pipeline, source=source), compact_path(path))
+        while not isinstance(main.detector.pipeline, CompactModel) and time.time() < deadline:
+            time.sleep(0.05)
+        # the same model file is reloaded once its sidecar appears
+        assert isinstance(main.detector.pipeline, CompactModel)
+    finally:
+        stop.set()
+        watcher.join(5)
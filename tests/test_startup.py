@@ -0,0 +1,53 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi.testclient import TestClient
+
+from backend.app import executors, main
+
+HEAVY_MODULES = ["easyocr", "pytesseract", "sklearn", "torch"]
+
+
+def test_import_does_not_load_model_or_heavy_modules():
+    code = (
+        "import sys, backend.app.main as m; "
+        "assert m.detector is None; "
+        f"print([name for name in {HEAVY_MODULES!r} if name in sys.modules])"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_ready_after_model_load_and_warmup(monkeypatch):
+    monkeypatch.setattr(executors, "OCR_PROCESSES", 0)
+    monkeypatch.setattr(main, "detector", None)
+    monkeypatch.setattr(main, "_startup", {"status": "loading"})
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        deadline = time.time() + 60
+        while client.get("/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.05)
+        body = client.get("/ready").json()
+        assert body["status"] == "ready"
+        assert body["model_version"] == main.detector.version and body["load_seconds"] >= 0
+
+
+def test_ready_reports_load_failure(monkeypatch):
+    def broken(*args):
+        raise RuntimeError("model file is corrupt")
+
+    monkeypatch.setattr(main, "detector", None)
+    monkeypatch.setattr(main, "_startup", {"status": "loading"})
+    monkeypatch.setattr(main, "load_detector", broken)
+    client = TestClient(main.app, raise_server_exceptions=False)
+    assert client.get("/ready").status_code == 503
+    assert client.post("/detect-language", data={"text": "print(1)"}).status_code == 500
+    r = client.get("/ready")
+    assert r.status_code == 503 and "corrupt" in r.json()["error"]
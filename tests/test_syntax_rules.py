@@ -0,0 +1,141 @@
+import re
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.syntax_rules import RULES, DEFAULT_RULESET, RuleSet, detect_by_syntax, literal_requirements
+from backend.train import build_sample_dataset
+from backend.evaluate import build_eval_dataset
+
+
+SAMPLES = [
+    "def add(a, b):\n    return a + b",
+    "console.log('hello')",
+    "#include <stdio.h>\nint main(){ printf(\"hi\"); }",
+    "SELECT name FROM users WHERE id = 1;",
+    "<html><body>Hello</body></html>",
+    "Write-Host 'hello'",
+    "plain prose without much code in it",
+]
+
+
+def _reference_scores(text):
+    # the original per-call loop over raw pattern strings
+    scores = {}
+    for lang, patterns in RULES.items():
+        total = 0.0
+        for pat, weight in patterns:
+            if re.search(pat, text, flags=re.IGNORECASE | re.MULTILINE):
+                total += weight
+        if total > 0:
+            scores[lang] = total
+    if not scores:
+        return {}
+    max_score = max(scores.values())
+    out = {}
+    for lang, score in scores.items():
+        norm = score / max_score
+        if norm >= 0.95:
+            norm = min(1.0, norm + 0.05)
+        out[lang] = round(norm, 4)
+    return out
+
+
+def test_detect_by_syntax_matches_reference():
+    for text in SAMPLES:
+        assert detect_by_syntax(text) == _reference_scores(text)
+
+
+def test_score_vector_is_aligned_to_language_index():
+    text = "package main\nfunc main() { fmt.Println(\"hi\") }"
+    vec = DEFAULT_RULESET.score_vector(text)
+    assert vec.shape == (len(RULES),)
+    scores = detect_by_syntax(text)
+    for lang, score in scores.items():
+        assert vec[DEFAULT_RULESET.index[lang]] == score
+    assert int((vec > 0).sum()) == len(scores)
+
+
+def test_empty_text_and_bad_patterns():
+    assert detect_by_syntax("") == {}
+    rs = RuleSet({"Broken": [(r"(unclosed", 1.0)], "Ok": [(r"ok", 1.0)]})
+    assert rs.languages == ("Broken", "Ok")
+    assert rs.scores("ok") == {"Ok": 1.0}
+
+
+def _equivalence_corpus():
+    X_train, _ = build_sample_dataset()
+    X_eval, _ = build_eval_dataset()
+    corpus = list(dict.fromkeys(SAMPLES + X_train + X_eval))
+    # mixed pastes and case / unicode edge cases that IGNORECASE matching folds
+    corpus.append("\n".join(corpus))
+    corpus += [
+        "CONSOLE.LOG('x')",
+        "\u017felect name from users",  # long s matches 's' under IGNORECASE
+        "\u0130MPORT os",  # dotted capital I
+        "std::cout \u212a",
+        "<xsl:template match='/'>",
+        "pragma solidity ^0.8.0;",
+        "",
+        "   ",
+    ]
+    return corpus
+
+
+def test_prefilter_output_identical_to_unfiltered_scorer():
+    unfiltered = RuleSet(RULES, prefilter=False)
+    for text in _equivalence_corpus():
+        expected = unfiltered.scores(text)
+        assert DEFAULT_RULESET.scores(text) == expected
+        assert expected == _reference_scores(text)
+
+
+def test_literal_requirements_extraction():
+    assert literal_requirements(r"console\.log\s*\(|\bconsole\.info\b") == (("console.log", "("), ("console.info",))
+    assert literal_requirements(r"\b(function|var)\s+\w+") == (("function",), ("var",))
+    # optional parts add no requirement
+    assert literal_requirements(r"(abc)?\w+") is None
+
+
+def test_guard_keeps_scores_on_ordinary_inputs():
+    unguarded = RuleSet(RULES, max_line=None)
+    for text in _equivalence_corpus():
+        assert DEFAULT_RULESET.scores(text) == unguarded.scores(text)
+
+
+def test_guard_bounds_backtracking_on_long_lines():
+    guarded = [p for p, rule in zip(DEFAULT_RULESET._patterns, DEFAULT_RULESET._rules) if rule[4]]
+    assert r"\bSELECT\b.*\bFROM\b" in guarded and r"#include\s*<\w+\.h>" not in guarded
+
+    # every "<a b" start scans to the end of the line: quadratic without the guard
+    adversarial = "</x> : " + "<a b " * 40000
+    started = time.perf_counter()
+    DEFAULT_RULESET.raw_scores(adversarial)
+    assert time.perf_counter() - started < 1.0
+
+    # negated classes too: every "aaa:" runs [^;]+ to the end, on one line or across many
+    assert r"[a-z-]{3,}\s*:\s*[^;\n]+;" in guarded
+    for adversarial in [";" + ("a" * 30 + ":") * 3300, ";\n" + ("a" * 30 + ":\n") * 3300]:
+        started = time.perf_counter()
+        DEFAULT_RULESET.raw_scores(adversarial)
+        assert time.perf_counter() - started < 1.0
+
+    # matches on long lines are still found, including past the first chunk
+    minified = "var a=1;" * 500 + "SELECT id FROM t" + ";x=2" * 500
+    assert "SQL" in DEFAULT_RULESET.scores(minified)
+
+
+def test_profile_reports_every_rule():
+    texts = ["SELECT name FROM users", "def f(x):\n    return x", "plain words"]
+    report = DEFAULT_RULESET.profile(texts)
+    assert len(report) == len(DEFAULT_RULESET._rules)
+    sql = next(r for r in report if r["pattern"] == r"\bSELECT\b.*\bFROM\b")
+    assert sql["language"] == "SQL" and sql["guarded"]
+    assert sql["matches"] == 1 and sql["runs"] + sql["skipped"] == len(texts)
+    assert all(r["seconds"] >= 0 for r in report)
+    assert [r["seconds"] for r in report] == sorted((r["seconds"] for r in report), reverse=True)
@@ -0,0 +1,93 @@
+import gzip
+import json
+import sys
+from pathlib import Path
+
+# Ensure project root is in sys.path when running tests
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.model import load_detector
+from backend.dataset import batched, iter_labeled, scan_labels, shuffled
+from backend.train import _fold_counts, _top_features, build_sample_dataset, grid_search, train_streaming
+
+
+def _write_jsonl(path, pairs, opener=open):
+    with opener(path, "wt", encoding="utf-8") as fh:
+        for text, label in pairs:
+            fh.write(json.dumps({"text": text, "language": label}) + "\n")
+
+
+def test_dataset_layouts(tmp_path):
+    pairs = list(zip(*build_sample_dataset()))[:12]
+    _write_jsonl(tmp_path / "one.jsonl", pairs)
+    with open(tmp_path / "one.jsonl", "a", encoding="utf-8") as fh:
+        fh.write("not json\n" + json.dumps({"text": "", "language": "Go"}) + "\n")
+    assert list(iter_labeled(tmp_path / "one.jsonl")) == pairs
+
+    shards = tmp_path / "shards"
+    shards.mkdir()
+    _write_jsonl(shards / "b.jsonl.gz", pairs[6:], opener=gzip.open)
+    _write_jsonl(shards / "a.jsonl", pairs[:6])
+    (shards / "Go").mkdir()
+    (shards / "Go" / "main.go").write_text("package main\nfunc main() {}\n")
+    (shards / "README.md").write_text("not a sample")
+    # files are read in sorted path order
+    assert list(iter_labeled(shards)) == [("package main\nfunc main() {}\n", "Go")] + pairs
+    assert scan_labels(shards) == sorted({label for _, label in pairs} | {"Go"})
+
+
+def test_shuffle_and_batches_keep_every_item():
+    items = list(range(1000))
+    mixed = list(shuffled(items, buffer_size=50, seed=1))
+    assert sorted(mixed) == items and mixed != items
+    assert list(shuffled(items, buffer_size=50, seed=1)) == mixed
+    sizes = [len(texts) for texts, _ in batched(((str(i), "x") for i in items), 300)]
+    assert sizes == [300, 300, 300, 100]
+
+
+def test_streaming_training_checkpoints_and_loads(tmp_path):
+    X, y = build_sample_dataset()
+    corpus = tmp_path / "corpus.jsonl"
+    _write_jsonl(corpus, list(zip(X, y)) * 4)
+    checkpoint = tmp_path / "ckpt" / "stream.joblib"
+    out = tmp_path / "model.joblib"
+    kwargs = dict(batch_size=64, n_features=2 ** 16, shuffle_buffer=500, checkpoint_path=checkpoint,
+                  checkpoint_every=5, out=out, log=lambda msg: None)
+
+    stats = train_streaming(corpus, epochs=2, **kwargs)
+    assert stats["samples"] == 2 * 4 * len(X) and stats["classes"] == len(set(y))
+    assert checkpoint.exists() and stats["samples_per_s"] > 0
+
+    detector = load_detector(out)
+    assert detector.predict_text("package main\nimport \"fmt\"\nfunc main() { fmt.Println(\"hi\") }")["language"] == "Go"
+
+    # a finished run resumes to a no-op; one more epoch continues from the checkpoint
+    resumed = train_streaming(corpus, epochs=3, resume=True, **kwargs)
+    assert resumed["samples"] == 3 * 4 * len(X)
+
+
+def test_grid_search_reuses_cached_fold_counts(tmp_path):
+    X, y = build_sample_dataset()
+    kwargs = dict(ngram_ranges=[(1, 1), (1, 2)], max_features=[50, None], Cs=[1.0, 0.3], cv=3, n_jobs=2,
+                  cache_dir=str(tmp_path / "cache"))
+    results = grid_search(X, y, **kwargs)
+    assert len(results) == 2 * 2 * 2
+    assert [r["accuracy"] for r in results] == sorted((r["accuracy"] for r in results), reverse=True)
+    assert all(0.0 <= r["accuracy"] <= 1.0 for r in results)
+    assert any((tmp_path / "cache").rglob("output.pkl"))
+    # a second run reads the tokenized folds from the cache and scores the same
+    assert grid_search(X, y, **kwargs) == results
+
+
+def test_search_vocabulary_matches_tfidf_max_features():
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+    # the samples repeat, so many terms tie at the cutoff
+    X, _ = build_sample_dataset()
+    names = CountVectorizer(ngram_range=(1, 3)).fit(X).get_feature_names_out()
+    _, _, totals = _fold_counts(X, range(len(X)), [], (1, 3))
+    for max_features in (20, 100, 300):
+        expected = TfidfVectorizer(ngram_range=(1, 3), max_features=max_features).fit(X).vocabulary_
+        assert sorted(names[_top_features(totals, max_features)]) == sorted(expected)